@@ -1,5 +1,11 @@
 from __future__ import division
 
+import collections as _collections
+import logging as _logging
+import multiprocessing as _mp
+
+import numpy
+
 from .base import io as _base_io
 from . import decoder as _dec
 from . import fstext as _fst
@@ -8,13 +14,17 @@ from .gmm import am as _gmm_am
 from . import hmm as _hmm
 from .lat import align as _lat_align
 from .lat import functions as _lat_funcs
+from . import matrix as _mat
 from .matrix import _kaldi_matrix
 from . import nnet3 as _nnet3
 from . import tree as _tree
 from .util import io as _util_io
+from .util._parallel import run_tasks as _run_tasks
+from .util import table as _util_table
 
 
-__all__ = ['Aligner', 'MappedAligner', 'GmmAligner', 'NnetAligner']
+__all__ = ['Aligner', 'MappedAligner', 'GmmAligner', 'NnetAligner',
+           'align_corpus']
 
 
 class Aligner(object):
@@ -38,10 +48,16 @@ class Aligner(object):
         self_loop_scale (float): The scale on self-loop transition
             probabilities.
         acoustic_scale (float): Acoustic score scale.
+        graph_cache_size (int): Maximum number of compiled alignment graphs
+            cached for reuse across calls to :meth:`align`. Graphs are keyed
+            by transcript, transition probability scales and decoder options,
+            and the least recently used graph is evicted first. 0 disables
+            caching.
     """
     def __init__(self, transition_model, tree, lexicon, symbols=None,
                  disambig_symbols=None, graph_compiler_opts=None, beam=200.0,
-                 transition_scale=1.0, self_loop_scale=1.0, acoustic_scale=0.1):
+                 transition_scale=1.0, self_loop_scale=1.0, acoustic_scale=0.1,
+                 graph_cache_size=100):
         self.transition_model = transition_model
         self.symbols = symbols
         if not graph_compiler_opts:
@@ -54,6 +70,11 @@ class Aligner(object):
         self.transition_scale = transition_scale
         self.self_loop_scale = self_loop_scale
         self.acoustic_scale = acoustic_scale
+        if graph_cache_size < 0:
+            raise ValueError("graph_cache_size should be non-negative")
+        self.graph_cache_size = graph_cache_size
+        self._graph_cache = _collections.OrderedDict()
+        self._transition_tables = None
 
     @staticmethod
     def read_tree(tree_rxfilename):
@@ -115,7 +136,8 @@ class Aligner(object):
     def from_files(cls, model_rxfilename, tree_rxfilename, lexicon_rxfilename,
                    symbols_filename=None, disambig_rxfilename=None,
                    graph_compiler_opts=None, beam=200.0, transition_scale=1.0,
-                   self_loop_scale=1.0, acoustic_scale=0.1):
+                   self_loop_scale=1.0, acoustic_scale=0.1,
+                   graph_cache_size=100):
         """Constructs a new GMM aligner from given files.
 
         Args:
@@ -138,6 +160,8 @@ class Aligner(object):
             self_loop_scale (float): The scale on self-loop transition
                 probabilities.
             acoustic_scale (float): Acoustic score scale.
+            graph_cache_size (int): Maximum number of compiled alignment
+                graphs cached for reuse.
 
         Returns:
             A new aligner object.
@@ -149,7 +173,8 @@ class Aligner(object):
         disambig_symbols = cls.read_disambig_symbols(disambig_rxfilename)
         return cls(transition_model, tree, lexicon, symbols,
                    disambig_symbols, graph_compiler_opts, beam,
-                   transition_scale, self_loop_scale, acoustic_scale)
+                   transition_scale, self_loop_scale, acoustic_scale,
+                   graph_cache_size)
 
     def _make_decodable(self, loglikes):
         """Constructs a new decodable object from input log-likelihoods.
@@ -182,7 +207,9 @@ class Aligner(object):
         If :attr:`symbols` is ``None``, the "text" input should be a
         string of space separated integer indices. Otherwise it should be a
         string of space separated symbols. The "weight" output is a lattice
-        weight consisting of (graph-score, acoustic-score).
+        weight consisting of (graph-score, acoustic-score). Alignment graphs
+        are cached by transcript, hence repeated texts are aligned without
+        compiling the graph again.
 
         Args:
             input (object): Input to align.
@@ -194,23 +221,110 @@ class Aligner(object):
         Raises:
             RuntimeError: If alignment fails.
         """
+        return self._align(self._get_decoder(self._text_to_indices(text)),
+                           input)
+
+    def _text_to_indices(self, text):
+        """Converts reference text to a list of word indices."""
         if self.symbols:
-            words = _fst.symbols_to_indices(self.symbols, text.split())
-        else:
-            words = text.split()
+            return _fst.symbols_to_indices(self.symbols, text.split())
+        return list(map(int, text.split()))
+
+    def _make_decoder(self, graph):
+        """Adds transition probabilities to graph and wraps it in a decoder.
 
-        graph = self.graph_compiler.compile_graph_from_text(words)
+        Args:
+            graph (StdVectorFst): Alignment graph compiled from a transcript.
+
+        Returns:
+            FasterDecoder: A decoder for the graph. It can be reused for
+            aligning any input with the transcript.
+        """
         _hmm.add_transition_probs(self.transition_model, [],
                                   self.transition_scale, self.self_loop_scale,
                                   graph)
-        decoder = _dec.FasterDecoder(graph, self.decoder_opts)
+        return _dec.FasterDecoder(graph, self.decoder_opts)
+
+    def _graph_key(self, words):
+        """Returns the graph cache key of a transcript.
+
+        Decoders are built with the current transition probability scales and
+        decoder options, hence these are part of the key.
+        """
+        opts = self.decoder_opts
+        return (tuple(words), self.transition_scale, self.self_loop_scale,
+                opts.beam, opts.max_active, opts.min_active, opts.beam_delta,
+                opts.hash_ratio)
+
+    def _cache_decoder(self, key, decoder):
+        """Adds a decoder to the graph cache, evicting LRU entries if full."""
+        if self.graph_cache_size == 0:
+            return
+        # Re-inserted keys move to the end, i.e. become most recently used.
+        self._graph_cache.pop(key, None)
+        self._graph_cache[key] = decoder
+        while len(self._graph_cache) > self.graph_cache_size:
+            self._graph_cache.popitem(last=False)
+
+    def _get_decoder(self, words):
+        """Returns the decoder for a transcript, compiling the graph if needed.
+
+        Args:
+            words (List[int]): Transcript as a list of word indices.
+
+        Returns:
+            FasterDecoder: A decoder for the alignment graph of the transcript.
+        """
+        key = self._graph_key(words)
+        decoder = self._graph_cache.pop(key, None)
+        if decoder is not None:
+            self._graph_cache[key] = decoder
+            return decoder
+        decoder = self._make_decoder(
+            self.graph_compiler.compile_graph_from_text(words))
+        self._cache_decoder(key, decoder)
+        return decoder
+
+    def _get_decoders(self, transcripts):
+        """Returns decoders for a batch of transcripts.
+
+        Graphs for transcripts that are not in the cache are compiled with a
+        single call to :meth:`TrainingGraphCompiler.compile_graphs_from_text`.
+        Repeated transcripts share the same decoder.
+
+        Args:
+            transcripts (List[List[int]]): Transcripts as lists of word indices.
+
+        Returns:
+            List[FasterDecoder]: Decoders for the alignment graphs of the
+            transcripts.
+        """
+        keys = [self._graph_key(words) for words in transcripts]
+        decoders = {}
+        for key in keys:
+            if key not in decoders and key in self._graph_cache:
+                decoders[key] = self._graph_cache.pop(key)
+                self._graph_cache[key] = decoders[key]
+        missing = [key for key in _collections.OrderedDict.fromkeys(keys)
+                   if key not in decoders]
+        if missing:
+            graphs = self.graph_compiler.compile_graphs_from_text(
+                [list(key[0]) for key in missing])
+            for key, graph in zip(missing, graphs):
+                decoders[key] = self._make_decoder(graph)
+                self._cache_decoder(key, decoders[key])
+        return [decoders[key] for key in keys]
+
+    def _align(self, decoder, input, require_final=True):
+        """Aligns input using a decoder constructed for the reference text."""
         decoder.decode(self._make_decodable(input))
 
-        if not decoder.reached_final():
+        reached_final = decoder.reached_final()
+        if require_final and not reached_final:
             raise RuntimeError("No final state was active on the last frame.")
 
         try:
-            best_path = decoder.get_best_path()
+            best_path = decoder.get_best_path(reached_final)
         except RuntimeError:
             raise RuntimeError("Empty alignment output.")
 
@@ -230,6 +344,265 @@ class Aligner(object):
             "weight": weight
         }
 
+    def align_table(self, input_rspecifier, transcript_rspecifier,
+                    batch_size=100):
+        """Aligns all inputs in a table with their transcripts.
+
+        This is a batch version of :meth:`align`. Inputs are read as matrices
+        in table order. Transcripts are read as integer vectors of word
+        indices, e.g. the output of `utils/sym2int.pl`. Alignment graphs for a
+        batch of utterances are compiled together and decoders are reused
+        across utterances sharing the same transcript::
+
+            for key, out in aligner.align_table("scp:feats.scp",
+                                                "ark:text.int"):
+                if out is not None:
+                    ali_writer[key] = out["alignment"]
+
+        Args:
+            input_rspecifier (str): Rspecifier for reading inputs to align.
+            transcript_rspecifier (str): Rspecifier for reading transcripts.
+                This table is opened for random access.
+            batch_size (int): Number of utterances whose graphs are compiled
+                together.
+
+        Yields:
+            Tuple[str, dict]: Utterance key and the alignment output for the
+            utterance as returned by :meth:`align`. If there is no transcript
+            for the utterance or alignment fails, a warning is logged and the
+            output is ``None``.
+        """
+        with _util_table.SequentialMatrixReader(input_rspecifier) as inputs, \
+             _util_table.RandomAccessIntVectorReader(
+                 transcript_rspecifier) as transcripts:
+            batch = []
+            for key, input in inputs:
+                if key not in transcripts:
+                    _logging.warning("No transcript found for utterance {}"
+                                     .format(key))
+                    batch.append((key, None, None))
+                else:
+                    batch.append((key, input, transcripts[key]))
+                if len(batch) == batch_size:
+                    for result in self._align_batch(batch):
+                        yield result
+                    batch = []
+            for result in self._align_batch(batch):
+                yield result
+
+    def _align_batch(self, batch):
+        """Aligns a batch of `(key, input, transcript)` triplets."""
+        found = [(key, input, transcript)
+                 for key, input, transcript in batch if transcript is not None]
+        decoders = self._get_decoders([transcript
+                                       for _, _, transcript in found])
+        decoders = dict(zip([key for key, _, _ in found], decoders))
+        for key, input, _ in batch:
+            if key not in decoders:
+                yield key, None
+                continue
+            try:
+                yield key, self._align(decoders[key], input)
+            except (RuntimeError, ValueError) as e:
+                _logging.warning("Alignment failed for utterance {}: {}"
+                                 .format(key, e))
+                yield key, None
+
+    def _num_frames(self, input):
+        """Returns the number of frames in the alignment of input."""
+        return input.num_rows
+
+    def _slice_input(self, input, begin, end):
+        """Returns the part of input aligned to frames `[begin, end)`."""
+        return input.row_range(begin, end - begin)
+
+    def _make_prefix_decoder(self, words):
+        """Returns a decoder for aligning input with any prefix of words."""
+        acceptor = _fst.StdVectorFst()
+        state = acceptor.add_state()
+        acceptor.set_start(state)
+        acceptor.set_final(state)
+        for word in words:
+            next_state = acceptor.add_state()
+            acceptor.add_arc(state, _fst.StdArc(word, word,
+                                                _fst.TropicalWeight.one(),
+                                                next_state))
+            acceptor.set_final(next_state)
+            state = next_state
+        return self._make_decoder(self.graph_compiler.compile_graph(acceptor))
+
+    def _find_anchor(self, input, words, word_boundary_info, window, margin,
+                     granularity=1):
+        """Finds the last confident split point in a window of input.
+
+        Input is aligned with the longest matching prefix of words. A partial
+        word at the end of the window is ignored. Words ending at least
+        `margin` frames before the end of the window are considered
+        confident. The split point is placed in the middle of the silence
+        following the last confident word if there is one, or at the end of
+        that word otherwise. The split point is then moved to a
+        multiple of `granularity`, staying inside the silence if possible.
+
+        Returns:
+            Tuple[int, int]: Split point in frames and the number of words
+            before it, or ``None`` if there are no confident words.
+        """
+        out = self._align(self._make_prefix_decoder(words), input,
+                          require_final=False)
+        try:
+            labels, starts, durations = self._word_alignment_arrays(
+                out["best_path"], word_boundary_info, partial=True)
+        except RuntimeError:
+            return None
+        ends = starts + durations
+        confident = numpy.flatnonzero((labels != 0)
+                                      & (ends <= window - margin))
+        if len(confident) == 0:
+            return None
+        last = confident[-1]
+        low = high = ends[last]
+        if last + 1 < len(labels) and labels[last + 1] == 0:
+            high += durations[last + 1]
+        split = low + (high - low) // 2
+        if granularity > 1:
+            first = -(-low // granularity) * granularity
+            if first <= high:
+                split = min(max(int(round(split / granularity)) * granularity,
+                                first), high // granularity * granularity)
+            else:
+                split = low // granularity * granularity
+        num_words = numpy.count_nonzero((labels != 0) & (ends <= split))
+        if split == 0 or num_words == 0:
+            return None
+        return split, num_words
+
+    def _split_granularity(self, input):
+        """Returns the number of frames segment boundaries are aligned to."""
+        return 1
+
+    def align_long(self, input, text, word_boundary_info, window=3000,
+                   margin=500, max_window=12000, num_workers=1):
+        """Aligns long input with text.
+
+        This is meant for inputs that are too long to be aligned in one go,
+        e.g. audiobook chapters. Alignment is done in two passes:
+
+        1. Input is split into segments of about `window` frames. Going
+           over the input from left to right, each window is aligned with
+           the longest matching prefix of the remaining text. The window is
+           split after the last word that ends well before the window end,
+           preferably in the middle of the following silence, and the next
+           window starts at the split point.
+        2. The segments and corresponding parts of the text are aligned
+           independently, optionally in parallel, and the outputs are merged.
+
+        Memory use is bounded by the window size and run time is linear in
+        the input length. If the input includes online ivectors, segment
+        boundaries are placed on frames that start an ivector period.
+
+        Output is a dictionary with the following `(key, value)` pairs:
+
+        ================ =========================== ===========================
+        key              value                       value type
+        ================ =========================== ===========================
+        "alignment"      Frame-level alignment       `List[int]`
+        "word_alignment" Word-level alignment        `Tuple[numpy.ndarray, ...]`
+        "likelihood"     Log-likelihood of alignment `float`
+        "segments"       Aligned segments            `numpy.ndarray`
+        ================ =========================== ===========================
+
+        Word alignment is given as (word indices/symbols, begin times, durations)
+        arrays, as returned by :meth:`to_word_alignment_arrays`. Segments are
+        given as an `N x 4` array where each row holds the begin frame, the end
+        frame, the index of the first word and the index one past the last
+        word of a segment.
+
+        Args:
+            input (object): Input to align.
+            text (str): Reference text to align, given as in :meth:`align`.
+            word_boundary_info (WordBoundaryInfo): Word boundary information.
+            window (int): Number of frames in a segmentation window.
+            margin (int): Number of frames at the end of a window in which
+                words are not considered confident.
+            max_window (int): Maximum number of frames in a segmentation
+                window. Windows without confident words are enlarged up to
+                this size.
+            num_workers (int): Number of worker processes used for aligning
+                the segments. If 1, segments are aligned in the calling
+                process.
+
+        Returns:
+            A dictionary representing alignment output.
+
+        Raises:
+            RuntimeError: If alignment fails.
+        """
+        if not 0 <= margin < window <= max_window:
+            raise ValueError("Invalid window configuration: window = {}, "
+                             "margin = {}, max_window = {}"
+                             .format(window, margin, max_window))
+        words = self._text_to_indices(text)
+        num_words, num_frames = len(words), self._num_frames(input)
+        if num_frames == 0:
+            raise ValueError("Empty input.")
+        # Number of words considered for each window. Speaking rate is allowed
+        # to be twice the average.
+        words_per_frame = num_words / num_frames
+        granularity = self._split_granularity(input)
+
+        segments = []
+        begin, word_begin, size = 0, 0, window
+        while num_frames - begin > size and word_begin < num_words:
+            max_words = int(2 * size * words_per_frame) + 10
+            anchor = self._find_anchor(
+                self._slice_input(input, begin, begin + size),
+                words[word_begin:word_begin + max_words],
+                word_boundary_info, size, margin, granularity)
+            if anchor is None:
+                if size == max_window:
+                    raise RuntimeError("No confident words found in frames "
+                                       "[{}, {})".format(begin, begin + size))
+                size = min(2 * size, max_window)
+                continue
+            split, num_split_words = anchor
+            segments.append((begin, begin + split, word_begin,
+                             word_begin + num_split_words))
+            begin += split
+            word_begin += num_split_words
+            size = window
+        if word_begin == num_words:
+            # Frames left after the last word are aligned with silence in
+            # windows of bounded size.
+            step = max(window // granularity, 1) * granularity
+            while num_frames - begin > step:
+                segments.append((begin, begin + step, num_words, num_words))
+                begin += step
+        segments.append((begin, num_frames, word_begin, num_words))
+        segments = numpy.array(segments, dtype=numpy.int64)
+
+        tasks = [((b, e, words[wb:we]),)
+                 for b, e, wb, we in segments.tolist()]
+        # Workers are forked so that they inherit the models and the input.
+        outputs = list(_run_tasks(_align_segment_task, tasks, num_workers,
+                                  _init_long_alignment_worker,
+                                  (self, input, word_boundary_info),
+                                  len(tasks)))
+
+        alignment, likelihood = [], 0.0
+        for segment_alignment, segment_likelihood, _ in outputs:
+            alignment.extend(segment_alignment)
+            likelihood += segment_likelihood
+        labels, starts, durations = (numpy.concatenate(x) for x in zip(
+            *[word_alignment for _, _, word_alignment in outputs]))
+        if self.symbols:
+            labels = _fst.symbol_table_view(self.symbols).symbols_array(labels)
+        return {
+            "alignment": alignment,
+            "word_alignment": (labels, starts, durations),
+            "likelihood": likelihood,
+            "segments": segments,
+        }
+
     def to_phone_alignment(self, alignment, phones=None):
         """Converts frame-level alignment to phone-level alignment.
 
@@ -243,19 +616,9 @@ class Aligner(object):
             each phone in the input, the phone index/symbol, the begin time (in
             frames) and the duration (in frames).
         """
-        success, split_ali = _hmm.split_to_phones(self.transition_model,
-                                                  alignment)
-        if not success:
-            raise RuntimeError("Alignment phone split failed.")
-        phone_start, phone_alignment = 0, []
-        for entry in split_ali:
-            phone = self.transition_model.transition_id_to_phone(entry[0])
-            if phones:
-                phone = phones.find_symbol(phone)
-            phone_duration = len(entry)
-            phone_alignment.append((phone, phone_start, phone_duration))
-            phone_start += phone_duration
-        return phone_alignment
+        labels, starts, durations = self.to_phone_alignment_arrays(alignment,
+                                                                   phones)
+        return list(zip(labels.tolist(), starts.tolist(), durations.tolist()))
 
     def to_word_alignment(self, best_path, word_boundary_info):
         """Converts best alignment path to word-level alignment.
@@ -281,6 +644,252 @@ class Aligner(object):
             mapper = lambda x: x
         return list(map(mapper, zip(*word_alignment)))
 
+    def _get_transition_tables(self):
+        """Returns transition-id lookup arrays used for phone alignment.
+
+        Arrays are indexed by transition-id and computed on first use.
+
+        Returns:
+            Tuple[numpy.ndarray, ...]: (transition-state, phone, is-final,
+            is-self-loop, is-bad-phone-start) arrays.
+        """
+        if self._transition_tables is None:
+            tm = self.transition_model
+            topo = tm.get_topo()
+            num_tids = tm.num_transition_ids() + 1
+            tstate = numpy.zeros(num_tids, dtype=numpy.int32)
+            phone = numpy.zeros(num_tids, dtype=numpy.int32)
+            final = numpy.zeros(num_tids, dtype=bool)
+            self_loop = numpy.zeros(num_tids, dtype=bool)
+            bad_start = numpy.zeros(num_tids, dtype=bool)
+            emitting_start = {}
+            for tid in range(1, num_tids):
+                tstate[tid] = tm.transition_id_to_transition_state(tid)
+                phone[tid] = tm.transition_state_to_phone(tstate[tid])
+                final[tid] = tm.is_final(tid)
+                self_loop[tid] = tm.is_self_loop(tid)
+                if phone[tid] not in emitting_start:
+                    entry = topo.topology_for_phone(phone[tid])[0]
+                    emitting_start[phone[tid]] = entry.forward_pdf_class != -1
+                # A phone cannot start in a non-initial state if its initial
+                # state is emitting.
+                bad_start[tid] = (emitting_start[phone[tid]]
+                                  and tm.transition_id_to_hmm_state(tid) != 0)
+            self._transition_tables = (tstate, phone, final, self_loop,
+                                       bad_start)
+        return self._transition_tables
+
+    def to_phone_alignment_arrays(self, alignment, phones=None):
+        """Converts frame-level alignment to phone-level alignment arrays.
+
+        This is a vectorized version of :meth:`to_phone_alignment`. Phones are
+        split using transition-id lookup arrays, following the same rules as
+        :meth:`kaldi.hmm.split_to_phones`.
+
+        Args:
+            alignment (List[int] or numpy.ndarray): Frame-level alignment.
+            phones (SymbolTable): The phone symbol table. If provided, output
+                labels are symbols instead of integer indices.
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: Phone
+            indices/symbols, begin times (in frames) and durations (in
+            frames).
+
+        Raises:
+            RuntimeError: If alignment phone split fails.
+        """
+        output = self.to_phone_alignment_arrays_batch([alignment], phones)[0]
+        if output is None:
+            raise RuntimeError("Alignment phone split failed.")
+        return output
+
+    def to_phone_alignment_arrays_batch(self, alignments, phones=None):
+        """Converts a batch of frame-level alignments to phone-level alignments.
+
+        All alignments in the batch are processed together with array
+        operations over their concatenation.
+
+        Args:
+            alignments (List[List[int]]): Frame-level alignments.
+            phones (SymbolTable): The phone symbol table. If provided, output
+                labels are symbols instead of integer indices.
+
+        Returns:
+            List[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]]: Phone
+            indices/symbols, begin times and durations for each alignment, as
+            returned by :meth:`to_phone_alignment_arrays`. Entries for which
+            phone split fails are ``None``.
+        """
+        tstate_of, phone_of, final_of, self_loop_of, bad_start_of = (
+            self._get_transition_tables())
+        if len(alignments) == 0:
+            return []
+        alignments = [numpy.asarray(ali, dtype=numpy.int32).reshape(-1)
+                      for ali in alignments]
+        lengths = numpy.array(list(map(len, alignments)), dtype=numpy.int64)
+        num_utts = len(lengths)
+        utt_ends = numpy.cumsum(lengths)
+        utt_starts = utt_ends - lengths
+        ali = numpy.concatenate(alignments)
+        n = len(ali)
+        utt = numpy.repeat(numpy.arange(num_utts), lengths)
+        tstate, phone = tstate_of[ali], phone_of[ali]
+        final, self_loop = final_of[ali], self_loop_of[ali]
+
+        # Positions i such that frames i and i + 1 are in the same utterance
+        # and belong to different transition states.
+        last = numpy.zeros(n, dtype=bool)
+        last[utt_ends[lengths > 0] - 1] = True
+        change = numpy.zeros(n, dtype=bool)
+        change[:-1] = (tstate[:-1] != tstate[1:]) & ~last[:-1]
+
+        # An alignment is reordered if self-loops come after forward
+        # transitions. This is decided at the first transition state change
+        # involving a self-loop, or by the first and last frames otherwise.
+        reordered = numpy.zeros(num_utts, dtype=bool)
+        nonempty = numpy.flatnonzero(lengths > 0)
+        front, back = utt_starts[nonempty], utt_ends[nonempty] - 1
+        reordered[nonempty] = ~self_loop[front] & self_loop[back]
+        decisive = numpy.flatnonzero(change)
+        decisive = decisive[self_loop[decisive] | self_loop[decisive + 1]]
+        decided_utts, first = numpy.unique(utt[decisive], return_index=True)
+        reordered[decided_utts] = self_loop[decisive[first]]
+        # Phone split fails if self-loops of different transition states are
+        # adjacent at that transition state change.
+        failed = numpy.zeros(num_utts, dtype=bool)
+        failed[decided_utts] = (self_loop[decisive[first]]
+                                & self_loop[decisive[first] + 1])
+
+        # In reordered alignments a phone ends after the self-loops following
+        # its final transition. Otherwise it ends at the final transition.
+        frame_reordered = reordered[utt]
+        breaks = numpy.flatnonzero(~self_loop | last)
+        final_pos = numpy.flatnonzero(final)
+        ends = final_pos + 1
+        reordered_final = frame_reordered[final_pos] & ~last[final_pos]
+        next_break = breaks[numpy.searchsorted(
+            breaks, final_pos[reordered_final] + 1)]
+        # Non-self-loop frames and last frames are never skipped, hence the
+        # run after a final transition ends at the next break or after the
+        # last frame of the utterance if that is a self-loop.
+        run_ends = numpy.where(self_loop[next_break], next_break + 1,
+                               next_break)
+        ends[reordered_final] = run_ends
+        skipped = numpy.zeros(n, dtype=bool)
+        if len(run_ends):
+            marks = numpy.zeros(n + 1, dtype=numpy.int64)
+            numpy.add.at(marks, final_pos[reordered_final] + 1, 1)
+            numpy.add.at(marks, run_ends, -1)
+            skipped = numpy.cumsum(marks)[:n] > 0
+
+        # It also fails if a non-final frame is the last frame of its
+        # utterance or is followed by a different phone, or if a phone starts
+        # in a non-initial emitting state.
+        checked = ~final & ~skipped
+        phone_change = numpy.zeros(n, dtype=bool)
+        phone_change[:-1] = change[:-1] & (phone[:-1] != phone[1:])
+        failed[utt[checked & (last | phone_change)]] = True
+        # Self-loops following a final transition should be of the same
+        # transition state.
+        after_change = numpy.zeros(n, dtype=bool)
+        after_change[1:] = change[:-1]
+        failed[utt[skipped & after_change]] = True
+        starts = numpy.concatenate((utt_starts[lengths > 0], ends[ends < n]))
+        starts = numpy.unique(starts)
+        failed[utt[starts[bad_start_of[ali[starts]]]]] = True
+
+        labels = phone[starts]
+        if phones:
+            labels = _fst.symbol_table_view(phones).symbols_array(labels)
+        durations = numpy.diff(numpy.append(starts, n))
+        bounds = numpy.searchsorted(starts, utt_ends)
+        output, begin = [], 0
+        for i in range(num_utts):
+            end = bounds[i]
+            if failed[i]:
+                output.append(None)
+            else:
+                output.append((labels[begin:end],
+                               starts[begin:end] - utt_starts[i],
+                               durations[begin:end]))
+            begin = end
+        return output
+
+    def to_word_alignment_arrays(self, best_path, word_boundary_info):
+        """Converts best alignment path to word-level alignment arrays.
+
+        This is a version of :meth:`to_word_alignment` returning arrays.
+
+        Args:
+            best_path (CompactLattice): Best alignment path.
+            word_boundary_info (WordBoundaryInfo): Word boundary information.
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: Word
+            indices/symbols, begin times (in frames) and durations (in frames).
+            The zero/epsilon words correspond to optional silences.
+
+        Raises:
+            RuntimeError: If lattice word alignment fails.
+        """
+        words, starts, durations = self._word_alignment_arrays(
+            best_path, word_boundary_info)
+        if self.symbols:
+            words = _fst.symbol_table_view(self.symbols).symbols_array(words)
+        return words, starts, durations
+
+    def _word_alignment_arrays(self, best_path, word_boundary_info,
+                               partial=False):
+        """Returns word indices, begin times and durations as arrays.
+
+        If `partial` is ``True``, paths ending inside a word are accepted and
+        the trailing partial word is dropped from the output.
+        """
+        success, aligned = _lat_align.word_align_lattice(
+            best_path, self.transition_model, word_boundary_info, 0)
+        if not success and (not partial
+                            or aligned.start() == _fst.NO_STATE_ID):
+            raise RuntimeError("Lattice word alignment failed.")
+        arrays = tuple(numpy.array(x, dtype=numpy.int32) for x in
+                       _lat_funcs.compact_lattice_to_word_alignment(aligned))
+        if not success:
+            arrays = tuple(x[:-1] for x in arrays)
+        return arrays
+
+    def to_word_alignment_arrays_batch(self, best_paths, word_boundary_info):
+        """Converts a batch of best alignment paths to word-level alignments.
+
+        Args:
+            best_paths (List[CompactLattice]): Best alignment paths.
+            word_boundary_info (WordBoundaryInfo): Word boundary information.
+
+        Returns:
+            List[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]]: Word
+            indices/symbols, begin times and durations for each path, as
+            returned by :meth:`to_word_alignment_arrays`. Entries for which
+            word alignment fails are ``None``.
+        """
+        outputs = []
+        for best_path in best_paths:
+            try:
+                outputs.append(self._word_alignment_arrays(best_path,
+                                                           word_boundary_info))
+            except (RuntimeError, ValueError):
+                outputs.append(None)
+        if not self.symbols:
+            return outputs
+        # Map word indices to symbols for the whole batch at once.
+        found = [out for out in outputs if out is not None]
+        if not found:
+            return outputs
+        words = numpy.concatenate([out[0] for out in found])
+        words = _fst.symbol_table_view(self.symbols).symbols_array(words)
+        bounds = numpy.cumsum([len(out[0]) for out in found])
+        words = iter(numpy.split(words, bounds[:-1]))
+        return [None if out is None else (next(words), out[1], out[2])
+                for out in outputs]
+
 
 class MappedAligner(Aligner):
     """Mapped speech aligner.
@@ -303,6 +912,11 @@ class MappedAligner(Aligner):
         self_loop_scale (float): The scale on self-loop transition
             probabilities.
         acoustic_scale (float): Acoustic score scale.
+        graph_cache_size (int): Maximum number of compiled alignment graphs
+            cached for reuse across calls to :meth:`align`. Graphs are keyed
+            by transcript, transition probability scales and decoder options,
+            and the least recently used graph is evicted first. 0 disables
+            caching.
     """
 
     def _make_decodable(self, loglikes):
@@ -342,11 +956,16 @@ class GmmAligner(Aligner):
         self_loop_scale (float): The scale on self-loop transition
             probabilities.
         acoustic_scale (float): Acoustic score scale.
+        graph_cache_size (int): Maximum number of compiled alignment graphs
+            cached for reuse across calls to :meth:`align`. Graphs are keyed
+            by transcript, transition probability scales and decoder options,
+            and the least recently used graph is evicted first. 0 disables
+            caching.
     """
     def __init__(self, transition_model, acoustic_model, tree, lexicon,
                  symbols=None, disambig_symbols=None, graph_compiler_opts=None,
                  beam=200.0, transition_scale=1.0, self_loop_scale=1.0,
-                 acoustic_scale=0.1):
+                 acoustic_scale=0.1, graph_cache_size=100):
         if not isinstance(acoustic_model, _gmm_am.AmDiagGmm):
             raise TypeError("acoustic_model should be a AmDiagGmm object")
         self.acoustic_model = acoustic_model
@@ -354,7 +973,7 @@ class GmmAligner(Aligner):
                                          symbols, disambig_symbols,
                                          graph_compiler_opts, beam,
                                          transition_scale, self_loop_scale,
-                                         acoustic_scale)
+                                         acoustic_scale, graph_cache_size)
 
     @staticmethod
     def read_model(model_rxfilename):
@@ -374,7 +993,8 @@ class GmmAligner(Aligner):
     def from_files(cls, model_rxfilename, tree_rxfilename, lexicon_rxfilename,
                    symbols_filename=None, disambig_rxfilename=None,
                    graph_compiler_opts=None, beam=200.0, transition_scale=1.0,
-                   self_loop_scale=1.0, acoustic_scale=0.1):
+                   self_loop_scale=1.0, acoustic_scale=0.1,
+                   graph_cache_size=100):
         """Constructs a new GMM aligner from given files.
 
         Args:
@@ -396,6 +1016,8 @@ class GmmAligner(Aligner):
             self_loop_scale (float): The scale on self-loop transition
                 probabilities.
             acoustic_scale (float): Acoustic score scale.
+            graph_cache_size (int): Maximum number of compiled alignment
+                graphs cached for reuse.
 
         Returns:
             A new aligner object.
@@ -407,7 +1029,8 @@ class GmmAligner(Aligner):
         disambig_symbols = cls.read_disambig_symbols(disambig_rxfilename)
         return cls(transition_model, acoustic_model, tree, lexicon, symbols,
                    disambig_symbols, graph_compiler_opts, beam,
-                   transition_scale, self_loop_scale, acoustic_scale)
+                   transition_scale, self_loop_scale, acoustic_scale,
+                   graph_cache_size)
 
     def _make_decodable(self, features):
         """Constructs a new decodable object from input features.
@@ -450,11 +1073,17 @@ class NnetAligner(Aligner):
             simple nnet3 am decodable objects.
         online_ivector_period (int): Onlne ivector period. Relevant only if
             online ivectors are used.
+        graph_cache_size (int): Maximum number of compiled alignment graphs
+            cached for reuse across calls to :meth:`align`. Graphs are keyed
+            by transcript, transition probability scales and decoder options,
+            and the least recently used graph is evicted first. 0 disables
+            caching.
     """
     def __init__(self, transition_model, acoustic_model, tree, lexicon,
                  symbols=None, disambig_symbols=None, graph_compiler_opts=None,
                  beam=200.0, transition_scale=1.0, self_loop_scale=1.0,
-                 decodable_opts=None, online_ivector_period=10):
+                 decodable_opts=None, online_ivector_period=10,
+                 graph_cache_size=100):
         if not isinstance(acoustic_model, _nnet3.AmNnetSimple):
             raise TypeError("acoustic_model should be a AmNnetSimple object")
         self.acoustic_model = acoustic_model
@@ -477,7 +1106,8 @@ class NnetAligner(Aligner):
                                           symbols, disambig_symbols,
                                           graph_compiler_opts, beam,
                                           transition_scale, self_loop_scale,
-                                          self.decodable_opts.acoustic_scale)
+                                          self.decodable_opts.acoustic_scale,
+                                          graph_cache_size)
 
     @staticmethod
     def read_model(model_rxfilename):
@@ -498,7 +1128,7 @@ class NnetAligner(Aligner):
                    symbols_filename=None, disambig_rxfilename=None,
                    graph_compiler_opts=None, beam=200.0, transition_scale=1.0,
                    self_loop_scale=1.0, decodable_opts=None,
-                   online_ivector_period=10):
+                   online_ivector_period=10, graph_cache_size=100):
         """Constructs a new nnet3 aligner from given files.
 
         Args:
@@ -523,6 +1153,8 @@ class NnetAligner(Aligner):
                 for simple nnet3 am decodable objects.
             online_ivector_period (int): Onlne ivector period. Relevant only if
                 online ivectors are used.
+            graph_cache_size (int): Maximum number of compiled alignment
+                graphs cached for reuse.
 
         Returns:
             A new aligner object.
@@ -535,7 +1167,61 @@ class NnetAligner(Aligner):
         return cls(transition_model, acoustic_model, tree, lexicon, symbols,
                    disambig_symbols, graph_compiler_opts, beam,
                    transition_scale, self_loop_scale, decodable_opts,
-                   online_ivector_period)
+                   online_ivector_period, graph_cache_size)
+
+    @staticmethod
+    def _split_input(input):
+        """Splits input into features, ivector and online ivectors."""
+        ivector, online_ivectors = None, None
+        if isinstance(input, tuple):
+            input, ivector_features = input
+            if isinstance(ivector_features, _kaldi_matrix.MatrixBase):
+                online_ivectors = ivector_features
+            else:
+                ivector = ivector_features
+        return input, ivector, online_ivectors
+
+    def _num_frames(self, input):
+        """Returns the number of frames in the alignment of input.
+
+        This takes frame subsampling into account.
+        """
+        features, _, _ = self._split_input(input)
+        factor = self.decodable_opts.frame_subsampling_factor
+        return (features.num_rows + factor - 1) // factor
+
+    def _slice_input(self, input, begin, end):
+        """Returns the part of input aligned to frames `[begin, end)`.
+
+        Online ivectors are sliced to the rows covering the selected features.
+        """
+        features, ivector, online_ivectors = self._split_input(input)
+        factor = self.decodable_opts.frame_subsampling_factor
+        begin, end = begin * factor, min(end * factor, features.num_rows)
+        features = features.row_range(begin, end - begin)
+        if online_ivectors is not None:
+            period = self.online_ivector_period
+            first = min(begin // period, online_ivectors.num_rows - 1)
+            last = min(-(-end // period), online_ivectors.num_rows)
+            return features, online_ivectors.row_range(first, last - first)
+        if ivector is not None:
+            return features, ivector
+        return features
+
+    def _split_granularity(self, input):
+        """Returns the number of frames segment boundaries are aligned to.
+
+        Online ivectors are sliced at period boundaries, so segments with
+        online ivectors need to start on a multiple of the ivector period.
+        """
+        _, _, online_ivectors = self._split_input(input)
+        if online_ivectors is None:
+            return 1
+        factor = self.decodable_opts.frame_subsampling_factor
+        granularity = 1
+        while granularity * factor % self.online_ivector_period:
+            granularity += 1
+        return granularity
 
     def _make_decodable(self, features):
         """Constructs a new decodable object from input features.
@@ -551,16 +1237,219 @@ class NnetAligner(Aligner):
             DecodableAmNnetSimple: A decodable object for computing scaled
             log-likelihoods.
         """
-        ivector, online_ivectors = None, None
-        if isinstance(features, tuple):
-            features, ivector_features = features
-            if isinstance(ivector_features, _kaldi_matrix.MatrixBase):
-                online_ivectors = ivector_features
-            else:
-                ivector = ivector_features
+        features, ivector, online_ivectors = self._split_input(features)
         if features.num_rows == 0:
             raise ValueError("Empty feature matrix.")
         return _nnet3.DecodableAmNnetSimple(
             self.decodable_opts, self.transition_model, self.acoustic_model,
             features, ivector, online_ivectors, self.online_ivector_period,
             self.compiler)
+
+
+# Per-process alignment options used by align_corpus workers.
+_worker_aligner = None
+_worker_phones = False
+_worker_word_boundary_info = None
+
+
+def _init_alignment_worker(aligner, phones, word_boundary_info):
+    global _worker_aligner, _worker_phones, _worker_word_boundary_info
+    _worker_aligner = aligner
+    _worker_phones = phones
+    _worker_word_boundary_info = word_boundary_info
+
+
+def _align_task(key, feats, ivectors, text):
+    """Aligns a single utterance.
+
+    Returns:
+        Tuple[str, dict]: Utterance key and alignment output with NumPy array
+        values, or ``None`` if there are no features or alignment fails.
+    """
+    if feats is None:
+        return key, None
+    aligner = _worker_aligner
+    input = _mat.Matrix(feats)
+    if ivectors is not None:
+        input = (input, _mat.Matrix(ivectors))
+    try:
+        out = aligner.align(input, text)
+        result = {
+            "alignment": numpy.array(out["alignment"], dtype=numpy.int32),
+            "likelihood": out["likelihood"],
+        }
+        if _worker_phones:
+            result["phone_alignment"] = numpy.stack(
+                aligner.to_phone_alignment_arrays(result["alignment"]), 1)
+        if _worker_word_boundary_info is not None:
+            result["word_alignment"] = numpy.stack(
+                aligner._word_alignment_arrays(out["best_path"],
+                                               _worker_word_boundary_info), 1)
+    except (RuntimeError, ValueError) as e:
+        _logging.warning("Alignment failed for utterance {}: {}"
+                         .format(key, e))
+        return key, None
+    return key, result
+
+
+# Per-process state used by Aligner.align_long workers.
+_worker_long_aligner = None
+_worker_long_input = None
+_worker_long_word_boundary_info = None
+
+
+def _init_long_alignment_worker(aligner, input, word_boundary_info):
+    global _worker_long_aligner, _worker_long_input
+    global _worker_long_word_boundary_info
+    _worker_long_aligner = aligner
+    _worker_long_input = input
+    _worker_long_word_boundary_info = word_boundary_info
+
+
+def _align_segment_task(task):
+    """Aligns a segment of long input.
+
+    Returns:
+        Tuple[List[int], float, Tuple[numpy.ndarray, ...]]: Frame-level
+        alignment, log-likelihood and word alignment arrays with begin times
+        relative to the beginning of the input.
+
+    Raises:
+        RuntimeError: If alignment fails.
+    """
+    begin, end, words = task
+    aligner = _worker_long_aligner
+    decoder = aligner._make_decoder(
+        aligner.graph_compiler.compile_graph_from_text(words))
+    try:
+        out = aligner._align(decoder, aligner._slice_input(_worker_long_input,
+                                                           begin, end))
+    except RuntimeError as e:
+        raise RuntimeError("Alignment failed for frames [{}, {}): {}"
+                           .format(begin, end, e))
+    labels, starts, durations = aligner._word_alignment_arrays(
+        out["best_path"], _worker_long_word_boundary_info)
+    return (out["alignment"], out["likelihood"],
+            (labels, starts + begin, durations))
+
+
+def _read_text(text_rxfilename):
+    """Reads a Kaldi text file into a dictionary."""
+    texts = {}
+    with _util_io.xopen(text_rxfilename, "rt") as ki:
+        for line in ki:
+            parts = line.strip().split(None, 1)
+            if parts:
+                texts[parts[0]] = parts[1] if len(parts) > 1 else ""
+    return texts
+
+
+def align_corpus(aligner, feats_rspecifier, text_rxfilename,
+                 alignment_wspecifier=None, ivectors_rspecifier=None,
+                 phones=False, word_boundary_info=None, num_workers=None,
+                 max_pending=None):
+    """Aligns all utterances in a feature table in parallel.
+
+    This is a table-level version of :meth:`Aligner.align`. Features are read
+    sequentially in the calling process, joined with the reference texts by
+    utterance key and aligned by a pool of forked worker processes. Workers
+    share the transition model, tree, lexicon and acoustic model of `aligner`
+    with the calling process, so they are not serialized or copied upfront.
+    Frame-level alignments are written in table order::
+
+        aligner = GmmAligner.from_files("final.mdl", "tree", "L.fst",
+                                        "words.txt", "disambig.int")
+        for key, out in align_corpus(aligner, feats_rspec, "data/text",
+                                     "ark:ali.ark", phones=True,
+                                     num_workers=16):
+            if out is not None:
+                phones, starts, durations = out["phone_alignment"].T
+
+    Outputs are dictionaries with the following `(key, value)` pairs:
+
+    ================= =============================== ==========================
+    key               value                           value type
+    ================= =============================== ==========================
+    "alignment"       Frame-level alignment           `numpy.ndarray`
+    "likelihood"      Log-likelihood of best path     `float`
+    "phone_alignment" Phone-level alignment           `numpy.ndarray`
+    "word_alignment"  Word-level alignment            `numpy.ndarray`
+    ================= =============================== ==========================
+
+    Phone and word alignments are included only if requested. They are `N x 3`
+    integer arrays where each row holds the phone/word index, the begin time
+    (in frames) and the duration (in frames).
+
+    Args:
+        aligner (Aligner): The aligner.
+        feats_rspecifier (str): Rspecifier for reading inputs to align.
+        text_rxfilename (str): Extended filename for reading reference texts
+            in Kaldi `text` format. Texts should be given as described in
+            :meth:`Aligner.align`.
+        alignment_wspecifier (str): Wspecifier for writing frame-level
+            alignments as integer vectors. If ``None``, alignments are not
+            written.
+        ivectors_rspecifier (str): Rspecifier for reading online i-vectors for
+            an :class:`NnetAligner`. This table is opened for random access.
+        phones (bool): Whether to compute phone alignments.
+        word_boundary_info (WordBoundaryInfo): Word boundary information. If
+            provided, word alignments are computed.
+        num_workers (int): Number of worker processes. If ``None``, the number
+            of CPUs is used. If 1, utterances are aligned in the calling
+            process.
+        max_pending (int): Maximum number of utterances read but not yet
+            returned. This bounds memory use. If ``None``, it is set to twice
+            the number of workers.
+
+    Yields:
+        Tuple[str, dict]: Utterance key and alignment output in table order.
+        If there is no text for the utterance or alignment fails, a warning is
+        logged and the output is ``None``.
+    """
+    if num_workers is None:
+        num_workers = _mp.cpu_count()
+    if max_pending is None:
+        max_pending = 2 * num_workers
+    texts = _read_text(text_rxfilename)
+
+    def tasks(reader, ivector_reader):
+        for key, feats in reader:
+            if key not in texts:
+                _logging.warning("No text found for utterance {}"
+                                 .format(key))
+                yield key, None, None, None
+                continue
+            ivectors = None
+            if ivector_reader is not None:
+                if key not in ivector_reader:
+                    _logging.warning("No i-vectors found for utterance {}"
+                                     .format(key))
+                    yield key, None, None, None
+                    continue
+                ivectors = ivector_reader[key].numpy().copy()
+            yield key, feats.numpy().copy(), ivectors, texts[key]
+
+    ivector_reader = None
+    if ivectors_rspecifier is not None:
+        ivector_reader = _util_table.RandomAccessMatrixReader(
+            ivectors_rspecifier)
+    writer = None
+    if alignment_wspecifier is not None:
+        writer = _util_table.IntVectorWriter(alignment_wspecifier)
+    try:
+        with _util_table.SequentialMatrixReader(feats_rspecifier) as reader:
+            # Workers are forked so that they inherit the models.
+            results = _run_tasks(_align_task, tasks(reader, ivector_reader),
+                                 num_workers, _init_alignment_worker,
+                                 (aligner, phones, word_boundary_info),
+                                 max_pending)
+            for key, out in results:
+                if out is not None and writer is not None:
+                    writer[key] = out["alignment"].tolist()
+                yield key, out
+    finally:
+        if writer is not None:
+            writer.close()
+        if ivector_reader is not None:
+            ivector_reader.close()
+
@@ -10,6 +10,12 @@ this module cover only the most "typical" combinations.
 
 from __future__ import division
 
+import collections as _collections
+import logging as _logging
+from multiprocessing.pool import ThreadPool as _ThreadPool
+import os
+import threading as _threading
+
 from . import cudamatrix as _cumatrix
 from . import decoder as _dec
 from . import fstext as _fst
@@ -45,6 +51,7 @@ __all__ = ['Recognizer',
            'NnetFasterRecognizer',
            'NnetLatticeFasterRecognizer',
            'NnetLatticeFasterBatchRecognizer',
+           'NnetBatchRecognizer',
            'NnetLatticeFasterGrammarRecognizer',
            'NnetLatticeBiglmFasterRecognizer',
            'OnlineRecognizer',
@@ -842,9 +849,29 @@ class GmmLatticeBiglmFasterRecognizer(GmmRecognizer):
                    allow_partial, acoustic_scale)
 
 
+def _compiler_cache_dir(model_rxfilename, compiler_cache):
+    """Returns the compiler cache directory for a model file."""
+    if compiler_cache is False or compiler_cache is None:
+        return None
+    if compiler_cache is not True:
+        return compiler_cache
+    # Models read from pipes or standard input have no directory.
+    if (_util_io.classify_rxfilename(model_rxfilename)
+            != _util_io.InputType.FILE_INPUT):
+        return None
+    return os.path.dirname(os.path.abspath(model_rxfilename))
+
+
 class NnetRecognizer(Recognizer):
     """Base class for neural network based speech recognizers.
 
+    If a compiler cache directory is given, the computations compiled by the
+    caching compiler are read from a cache file in that directory when the
+    recognizer is constructed, and written back when the interpreter exits or
+    :meth:`save_compiler_cache` is called. The cache file is keyed by a hash of
+    the neural network and the optimization options, hence processes decoding
+    with the same model skip recompilation of computations seen before.
+
     Args:
         transition_model (TransitionModel): The transition model.
         acoustic_model (AmNnetSimple): The acoustic model.
@@ -857,10 +884,13 @@ class NnetRecognizer(Recognizer):
             simple nnet3 am decodable objects.
         online_ivector_period (int): Onlne ivector period. Relevant only if
             online ivectors are used.
+        compiler_cache_dir (str): Directory for persisting compiled nnet3
+            computations across processes. If ``None``, computations are
+            not persisted.
     """
     def __init__(self, transition_model, acoustic_model, decoder,
                  symbols=None, allow_partial=True, decodable_opts=None,
-                 online_ivector_period=10):
+                 online_ivector_period=10, compiler_cache_dir=None):
         if not isinstance(acoustic_model, _nnet3.AmNnetSimple):
             raise TypeError("acoustic_model should be a AmNnetSimple object")
         self.transition_model = transition_model
@@ -879,10 +909,28 @@ class NnetRecognizer(Recognizer):
             self.decodable_opts = _nnet3.NnetSimpleComputationOptions()
         self.compiler = _nnet3.CachingOptimizingCompiler.new_with_optimize_opts(
             nnet, self.decodable_opts.optimize_config)
+        self.compiler_cache = None
+        if compiler_cache_dir is not None:
+            self.compiler_cache = (
+                _nnet3.compiler_cache.PersistentCompilerCache.for_nnet(
+                    self.compiler, nnet, self.decodable_opts.optimize_config,
+                    compiler_cache_dir))
         self.online_ivector_period = online_ivector_period
         super(NnetRecognizer, self).__init__(decoder, symbols, allow_partial,
                                              self.decodable_opts.acoustic_scale)
 
+    def save_compiler_cache(self):
+        """Persists compiled nnet3 computations.
+
+        This is done automatically when the interpreter exits.
+
+        Returns:
+            bool: Whether the compiler cache file was written.
+        """
+        if self.compiler_cache is None:
+            return False
+        return self.compiler_cache.save()
+
     @staticmethod
     def read_model(model_rxfilename):
         """Reads model from an extended filename."""
@@ -955,21 +1003,24 @@ class NnetFasterRecognizer(NnetRecognizer):
             simple nnet3 am decodable objects.
         online_ivector_period (int): Onlne ivector period. Relevant only if
             online ivectors are used.
+        compiler_cache_dir (str): Directory for persisting compiled nnet3
+            computations across processes. If ``None``, computations are
+            not persisted.
     """
     def __init__(self, transition_model, acoustic_model, decoder,
                  symbols=None, allow_partial=True, decodable_opts=None,
-                 online_ivector_period=10):
+                 online_ivector_period=10, compiler_cache_dir=None):
         if not isinstance(decoder, _dec.FasterDecoder):
             raise TypeError("decoder argument should be a FasterDecoder")
         super(NnetFasterRecognizer, self).__init__(
             transition_model, acoustic_model, decoder, symbols, allow_partial,
-            decodable_opts, online_ivector_period)
+            decodable_opts, online_ivector_period, compiler_cache_dir)
 
     @classmethod
     def from_files(cls, model_rxfilename, graph_rxfilename,
                    symbols_filename=None, allow_partial=True,
                    decoder_opts=None, decodable_opts=None,
-                   online_ivector_period=10):
+                   online_ivector_period=10, compiler_cache=True):
         """Constructs a new recognizer from given files.
 
         Args:
@@ -985,6 +1036,10 @@ class NnetFasterRecognizer(NnetRecognizer):
                 for simple nnet3 am decodable objects.
             online_ivector_period (int): Onlne ivector period. Relevant only if
                 online ivectors are used.
+            compiler_cache (bool or str): Directory for persisting compiled
+                nnet3 computations. If ``True``, computations are persisted
+                in the directory of the model file. If ``False``, they are not
+                persisted.
 
         Returns:
             NnetFasterRecognizer: A new recognizer.
@@ -999,7 +1054,8 @@ class NnetFasterRecognizer(NnetRecognizer):
         else:
             symbols = _fst.SymbolTable.read_text(symbols_filename)
         return cls(transition_model, acoustic_model, decoder, symbols,
-                   allow_partial, decodable_opts, online_ivector_period)
+                   allow_partial, decodable_opts, online_ivector_period,
+                   _compiler_cache_dir(model_rxfilename, compiler_cache))
 
 
 class NnetLatticeFasterRecognizer(NnetRecognizer):
@@ -1017,21 +1073,24 @@ class NnetLatticeFasterRecognizer(NnetRecognizer):
             simple nnet3 am decodable objects.
         online_ivector_period (int): Onlne ivector period. Relevant only if
             online ivectors are used.
+        compiler_cache_dir (str): Directory for persisting compiled nnet3
+            computations across processes. If ``None``, computations are
+            not persisted.
     """
     def __init__(self, transition_model, acoustic_model, decoder,
                  symbols=None, allow_partial=True, decodable_opts=None,
-                 online_ivector_period=10):
+                 online_ivector_period=10, compiler_cache_dir=None):
         if not isinstance(decoder, _dec.LatticeFasterDecoder):
             raise TypeError("decoder argument should be a LatticeFasterDecoder")
         super(NnetLatticeFasterRecognizer, self).__init__(
             transition_model, acoustic_model, decoder, symbols, allow_partial,
-            decodable_opts, online_ivector_period)
+            decodable_opts, online_ivector_period, compiler_cache_dir)
 
     @classmethod
     def from_files(cls, model_rxfilename, graph_rxfilename,
                    symbols_filename=None, allow_partial=True,
                    decoder_opts=None, decodable_opts=None,
-                   online_ivector_period=10):
+                   online_ivector_period=10, compiler_cache=True):
         """Constructs a new recognizer from given files.
 
         Args:
@@ -1047,6 +1106,10 @@ class NnetLatticeFasterRecognizer(NnetRecognizer):
                 for simple nnet3 am decodable objects.
             online_ivector_period (int): Onlne ivector period. Relevant only if
                 online ivectors are used.
+            compiler_cache (bool or str): Directory for persisting compiled
+                nnet3 computations. If ``True``, computations are persisted
+                in the directory of the model file. If ``False``, they are not
+                persisted.
 
         Returns:
             NnetLatticeFasterRecognizer: A new recognizer.
@@ -1061,7 +1124,8 @@ class NnetLatticeFasterRecognizer(NnetRecognizer):
         else:
             symbols = _fst.SymbolTable.read_text(symbols_filename)
         return cls(transition_model, acoustic_model, decoder, symbols,
-                   allow_partial, decodable_opts, online_ivector_period)
+                   allow_partial, decodable_opts, online_ivector_period,
+                   _compiler_cache_dir(model_rxfilename, compiler_cache))
 
 
 class NnetLatticeFasterBatchRecognizer(object):
@@ -1262,6 +1326,237 @@ class NnetLatticeFasterBatchRecognizer(object):
         self.decoder.utterance_failed()
 
 
+class NnetBatchRecognizer(object):
+    """Neural network based multi-utterance batch speech recognizer.
+
+    Chunks of many utterances are gathered into minibatches and evaluated in
+    single nnet3 computations by an `NnetBatchInference` object, which runs
+    the computations on its own thread. Large minibatches make much better
+    use of BLAS than evaluating utterances one at a time, on CPU as well as
+    GPU. The log-likelihoods of each utterance are then decoded on a pool of
+    graph search threads, each with its own mapped recognizer. Graph search
+    does not hold the global interpreter lock, hence it runs in parallel with
+    the neural network computation.
+
+    Unlike :class:`NnetLatticeFasterBatchRecognizer`, any mapped recognizer
+    can be used for graph search and outputs are the same as those of
+    :meth:`MappedRecognizer.decode`. Log-likelihoods are divided by the
+    acoustic scale of `compute_opts` before decoding, hence recognizers apply
+    their own acoustic scale.
+
+    Args:
+        acoustic_model (AmNnetSimple): The acoustic model.
+        recognizers (List[MappedRecognizer]): Mapped recognizers used for
+            graph search, one for each search thread. They can share the
+            transition model, the graph and the symbol table.
+        compute_opts (NnetBatchComputerOptions): Configuration options for
+            neural network batch computation.
+        online_ivector_period (int): Onlne ivector period. Relevant only if
+            online ivectors are used.
+        max_pending (int): Maximum number of utterances whose log-likelihoods
+            were computed but not yet decoded. If ``None``, it is set to
+            twice the number of search threads.
+
+    Attributes:
+        num_done (int): Number of utterances decoded.
+        num_failed (int): Number of utterances that failed.
+    """
+    def __init__(self, acoustic_model, recognizers, compute_opts=None,
+                 online_ivector_period=10, max_pending=None):
+        if not isinstance(acoustic_model, _nnet3.AmNnetSimple):
+            raise TypeError("acoustic_model should be a AmNnetSimple object")
+        if not recognizers:
+            raise ValueError("At least one recognizer is required.")
+        for recognizer in recognizers:
+            if not isinstance(recognizer, MappedRecognizer):
+                raise TypeError("recognizers should be MappedRecognizer "
+                                "objects")
+        self.acoustic_model = acoustic_model
+        nnet = self.acoustic_model.get_nnet()
+        _nnet3.set_batchnorm_test_mode(True, nnet)
+        _nnet3.set_dropout_test_mode(True, nnet)
+        _nnet3.collapse_model(_nnet3.CollapseModelConfig(), nnet)
+        self.recognizers = list(recognizers)
+        if not compute_opts:
+            compute_opts = _nnet3.NnetBatchComputerOptions()
+        self.compute_opts = compute_opts
+        self.online_ivector_period = online_ivector_period
+        self.max_pending = (max_pending if max_pending is not None
+                            else 2 * len(self.recognizers))
+        self.num_done = 0
+        self.num_failed = 0
+        self._decoding = False
+
+    @classmethod
+    def from_files(cls, model_rxfilename, graph_rxfilename,
+                   symbols_filename=None, allow_partial=True, decoder_opts=None,
+                   compute_opts=None, num_threads=1, online_ivector_period=10,
+                   max_pending=None):
+        """Constructs a new recognizer from given files.
+
+        Graph search is done with :class:`MappedLatticeFasterRecognizer`
+        objects sharing the graph, using the acoustic scale of
+        `compute_opts`.
+
+        Args:
+            model_rxfilename (str): Extended filename for reading the model.
+            graph_rxfilename (str): Extended filename for reading the graph.
+            symbols_filename (str): The symbols file. If provided, "text" output
+                of :meth:`decode` includes symbols instead of integer indices.
+            allow_partial (bool): Whether to output decoding results if no
+                final state was active on the last frame.
+            decoder_opts (LatticeFasterDecoderOptions): Configuration options
+                for the decoder.
+            compute_opts (NnetBatchComputerOptions): Configuration options
+                for neural network batch computation.
+            num_threads (int): Number of graph search threads.
+            online_ivector_period (int): Onlne ivector period. Relevant only if
+                online ivectors are used.
+            max_pending (int): Maximum number of utterances whose
+                log-likelihoods were computed but not yet decoded.
+
+        Returns:
+            NnetBatchRecognizer: A new recognizer.
+        """
+        transition_model, acoustic_model = NnetRecognizer.read_model(
+            model_rxfilename)
+        graph = _fst.read_fst_kaldi(graph_rxfilename)
+        if symbols_filename is None:
+            symbols = None
+        else:
+            symbols = _fst.SymbolTable.read_text(symbols_filename)
+        if not decoder_opts:
+            decoder_opts = _dec.LatticeFasterDecoderOptions()
+        if not compute_opts:
+            compute_opts = _nnet3.NnetBatchComputerOptions()
+        recognizers = [
+            MappedLatticeFasterRecognizer(
+                transition_model, _dec.LatticeFasterDecoder(graph,
+                                                            decoder_opts),
+                symbols, allow_partial, compute_opts.acoustic_scale)
+            for _ in range(num_threads)]
+        return cls(acoustic_model, recognizers, compute_opts,
+                   online_ivector_period, max_pending)
+
+    def _decode(self, recognizer, key, loglikes):
+        """Decodes log-likelihoods with a mapped recognizer."""
+        scale = self.compute_opts.acoustic_scale
+        if scale != 0.0 and scale != 1.0:
+            loglikes.scale_(1.0 / scale)
+        try:
+            output = recognizer.decode(loglikes)
+        except (RuntimeError, ValueError) as e:
+            _logging.warning("Decoding failed for utterance {}: {}"
+                             .format(key, e))
+            return None
+        output["key"] = key
+        return output
+
+    def decode(self, inputs):
+        """Decodes a sequence of utterances.
+
+        Input of each utterance can be just a feature matrix or a tuple of a
+        feature matrix and an ivector or a tuple of a feature matrix and an
+        online ivector matrix.
+
+        Each output is a dictionary like the output of
+        :meth:`MappedRecognizer.decode` with an additional "key" entry holding
+        the utterance ID. Outputs are generated in the same order the inputs
+        were provided. Utterances that fail to decode are skipped with a
+        warning.
+
+        Args:
+            inputs (Iterable[Tuple[str, object]]): Utterance IDs and inputs,
+                e.g. a `SequentialMatrixReader`.
+
+        Yields:
+            A dictionary representing decoding output.
+
+        Raises:
+            RuntimeError: If another decode of this recognizer is in progress.
+        """
+        if self._decoding:
+            raise RuntimeError("Another decode of this recognizer is in "
+                               "progress.")
+        nnet = self.acoustic_model.get_nnet()
+        inference = _nnet3.NnetBatchInference(self.compute_opts, nnet,
+                                              self.acoustic_model.priors())
+        pool = _ThreadPool(len(self.recognizers))
+        pending = _collections.deque()
+        finished = False
+
+        # Each search thread takes a recognizer of its own on first use.
+        local = _threading.local()
+        free = list(self.recognizers)
+        lock = _threading.Lock()
+
+        def decode_loglikes(key, loglikes):
+            recognizer = getattr(local, "recognizer", None)
+            if recognizer is None:
+                with lock:
+                    recognizer = free.pop()
+                local.recognizer = recognizer
+            return self._decode(recognizer, key, loglikes)
+
+        def submit_outputs():
+            while True:
+                try:
+                    key, loglikes = inference.get_output()
+                except ValueError:
+                    return
+                pending.append(pool.apply_async(decode_loglikes,
+                                                (key, loglikes)))
+
+        def result(async_result):
+            output = async_result.get()
+            if output is None:
+                self.num_failed += 1
+            else:
+                self.num_done += 1
+            return output
+
+        self._decoding = True
+        try:
+            for key, input in inputs:
+                ivector, online_ivectors = None, None
+                if isinstance(input, tuple):
+                    features, ivector_features = input
+                    if isinstance(ivector_features, _kaldi_matrix.MatrixBase):
+                        online_ivectors = ivector_features
+                    else:
+                        ivector = ivector_features
+                else:
+                    features = input
+                if features.num_rows == 0:
+                    _logging.warning("Empty feature matrix for utterance {}"
+                                     .format(key))
+                    self.num_failed += 1
+                    continue
+                inference.accept_input(key, features, ivector,
+                                       online_ivectors,
+                                       self.online_ivector_period)
+                submit_outputs()
+                while pending and (len(pending) > self.max_pending
+                                   or pending[0].ready()):
+                    output = result(pending.popleft())
+                    if output is not None:
+                        yield output
+            finished = True
+            inference.finished()
+            submit_outputs()
+            while pending:
+                output = result(pending.popleft())
+                if output is not None:
+                    yield output
+        finally:
+            # Inference objects can not be destroyed before they finish.
+            if not finished:
+                inference.finished()
+            pool.terminate()
+            pool.join()
+            self._decoding = False
+
+
 class NnetLatticeFasterGrammarRecognizer(NnetRecognizer):
     """Neural network based lattice generating faster grammar speech recognizer.
 
@@ -1277,22 +1572,25 @@ class NnetLatticeFasterGrammarRecognizer(NnetRecognizer):
             simple nnet3 am decodable objects.
         online_ivector_period (int): Onlne ivector period. Relevant only if
             online ivectors are used.
+        compiler_cache_dir (str): Directory for persisting compiled nnet3
+            computations across processes. If ``None``, computations are
+            not persisted.
     """
     def __init__(self, transition_model, acoustic_model, decoder,
                  symbols=None, allow_partial=True, decodable_opts=None,
-                 online_ivector_period=10):
+                 online_ivector_period=10, compiler_cache_dir=None):
         if not isinstance(decoder, _dec.LatticeFasterGrammarDecoder):
             raise TypeError("decoder argument should be a "
                             "LatticeFasterGrammarDecoder")
         super(NnetLatticeFasterGrammarRecognizer, self).__init__(
             transition_model, acoustic_model, decoder, symbols, allow_partial,
-            decodable_opts, online_ivector_period)
+            decodable_opts, online_ivector_period, compiler_cache_dir)
 
     @classmethod
     def from_files(cls, model_rxfilename, graph_rxfilename,
                    symbols_filename=None, allow_partial=True,
                    decoder_opts=None, decodable_opts=None,
-                   online_ivector_period=10):
+                   online_ivector_period=10, compiler_cache=True):
         """Constructs a new recognizer from given files.
 
         Args:
@@ -1308,6 +1606,10 @@ class NnetLatticeFasterGrammarRecognizer(NnetRecognizer):
                 for simple nnet3 am decodable objects.
             online_ivector_period (int): Onlne ivector period. Relevant only if
                 online ivectors are used.
+            compiler_cache (bool or str): Directory for persisting compiled
+                nnet3 computations. If ``True``, computations are persisted
+                in the directory of the model file. If ``False``, they are not
+                persisted.
 
         Returns:
             NnetLatticeFasterGrammarRecognizer: A new recognizer.
@@ -1324,7 +1626,8 @@ class NnetLatticeFasterGrammarRecognizer(NnetRecognizer):
         else:
             symbols = _fst.SymbolTable.read_text(symbols_filename)
         return cls(transition_model, acoustic_model, decoder, symbols,
-                   allow_partial, decodable_opts, online_ivector_period)
+                   allow_partial, decodable_opts, online_ivector_period,
+                   _compiler_cache_dir(model_rxfilename, compiler_cache))
 
 
 class NnetLatticeBiglmFasterRecognizer(NnetRecognizer):
@@ -1342,22 +1645,25 @@ class NnetLatticeBiglmFasterRecognizer(NnetRecognizer):
             simple nnet3 am decodable objects.
         online_ivector_period (int): Onlne ivector period. Relevant only if
             online ivectors are used.
+        compiler_cache_dir (str): Directory for persisting compiled nnet3
+            computations across processes. If ``None``, computations are
+            not persisted.
     """
     def __init__(self, transition_model, acoustic_model, decoder,
                  symbols=None, allow_partial=True, decodable_opts=None,
-                 online_ivector_period=10):
+                 online_ivector_period=10, compiler_cache_dir=None):
         if not isinstance(decoder, _dec.LatticeBiglmFasterDecoder):
             raise TypeError("decoder argument should be a "
                             "LatticeBiglmFasterDecoder")
         super(NnetLatticeBiglmFasterRecognizer, self).__init__(
             transition_model, acoustic_model, decoder, symbols, allow_partial,
-            decodable_opts, online_ivector_period)
+            decodable_opts, online_ivector_period, compiler_cache_dir)
 
     @classmethod
     def from_files(cls, model_rxfilename, graph_rxfilename, old_lm_rxfilename,
                    new_lm_rxfilename, symbols_filename=None, allow_partial=True,
                    decoder_opts=None, decodable_opts=None,
-                   online_ivector_period=10):
+                   online_ivector_period=10, compiler_cache=True):
         """Constructs a new recognizer from given files.
 
         Args:
@@ -1375,6 +1681,10 @@ class NnetLatticeBiglmFasterRecognizer(NnetRecognizer):
                 for simple nnet3 am decodable objects.
             online_ivector_period (int): Onlne ivector period. Relevant only if
                 online ivectors are used.
+            compiler_cache (bool or str): Directory for persisting compiled
+                nnet3 computations. If ``True``, computations are persisted
+                in the directory of the model file. If ``False``, they are not
+                persisted.
 
         Returns:
             NnetLatticeBiglmFasterRecognizer: A new recognizer.
@@ -1399,7 +1709,8 @@ class NnetLatticeBiglmFasterRecognizer(NnetRecognizer):
         else:
             symbols = _fst.SymbolTable.read_text(symbols_filename)
         return cls(transition_model, acoustic_model, decoder, symbols,
-                   allow_partial, decodable_opts, online_ivector_period)
+                   allow_partial, decodable_opts, online_ivector_period,
+                   _compiler_cache_dir(model_rxfilename, compiler_cache))
 
 
 class OnlineRecognizer(object):
@@ -1,5 +1,6 @@
 from ._grammar_fst import *
 from ._decodable_matrix import *
+from ._decodable_matrix_ext import *
 from ._decodable_mapped import *
 from ._decodable_sum import *
 from ._decoder import *
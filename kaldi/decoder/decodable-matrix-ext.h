@@ -0,0 +1,73 @@
+#ifndef PYKALDI_DECODER_DECODABLE_MATRIX_EXT_H_
+#define PYKALDI_DECODER_DECODABLE_MATRIX_EXT_H_ 1
+
+#include "itf/decodable-itf.h"
+#include "matrix/kaldi-matrix.h"
+
+namespace kaldi {
+
+// Scaled counterpart of DecodableMatrixMappedOffset. Log-likelihoods are
+// appended as they become available and frames the decoder no longer needs
+// can be discarded from the left, so memory stays bounded on long streams.
+// Indices are 1-based, as in DecodableMatrixScaled.
+class DecodableMatrixScaledOffset : public DecodableInterface {
+ public:
+  explicit DecodableMatrixScaledOffset(BaseFloat scale)
+      : scale_(scale), frame_offset_(0), input_is_finished_(false) {}
+
+  virtual int32 NumFramesReady() const {
+    return frame_offset_ + loglikes_.NumRows();
+  }
+
+  int32 FirstAvailableFrame() const { return frame_offset_; }
+
+  void AcceptLoglikes(const MatrixBase<BaseFloat> &loglikes,
+                      int32 frames_to_discard) {
+    KALDI_ASSERT(frames_to_discard >= 0 &&
+                 frames_to_discard <= loglikes_.NumRows());
+    KALDI_ASSERT(loglikes_.NumRows() == 0 || loglikes.NumRows() == 0 ||
+                 loglikes.NumCols() == loglikes_.NumCols());
+    int32 num_kept = loglikes_.NumRows() - frames_to_discard,
+        num_rows = num_kept + loglikes.NumRows(),
+        num_cols = num_kept > 0 ? loglikes_.NumCols() : loglikes.NumCols();
+    Matrix<BaseFloat> new_loglikes;
+    if (num_rows > 0) {
+      new_loglikes.Resize(num_rows, num_cols, kUndefined);
+      if (num_kept > 0)
+        new_loglikes.RowRange(0, num_kept).CopyFromMat(
+            loglikes_.RowRange(frames_to_discard, num_kept));
+      if (loglikes.NumRows() > 0)
+        new_loglikes.RowRange(num_kept, loglikes.NumRows()).CopyFromMat(
+            loglikes);
+    }
+    loglikes_.Swap(&new_loglikes);
+    frame_offset_ += frames_to_discard;
+  }
+
+  void InputIsFinished() { input_is_finished_ = true; }
+
+  virtual bool IsLastFrame(int32 frame) const {
+    KALDI_ASSERT(frame < NumFramesReady());
+    return input_is_finished_ && frame + 1 == NumFramesReady();
+  }
+
+  virtual BaseFloat LogLikelihood(int32 frame, int32 index) {
+    int32 row = frame - frame_offset_;
+    KALDI_ASSERT(row >= 0 && row < loglikes_.NumRows());
+    KALDI_ASSERT(index > 0 && index <= loglikes_.NumCols());
+    return scale_ * loglikes_(row, index - 1);
+  }
+
+  virtual int32 NumIndices() const { return loglikes_.NumCols(); }
+
+ private:
+  BaseFloat scale_;
+  Matrix<BaseFloat> loglikes_;
+  int32 frame_offset_;
+  bool input_is_finished_;
+  KALDI_DISALLOW_COPY_AND_ASSIGN(DecodableMatrixScaledOffset);
+};
+
+}  // namespace kaldi
+
+#endif  // PYKALDI_DECODER_DECODABLE_MATRIX_EXT_H_
@@ -1,11 +1,20 @@
 # The Python API was largely adapted from the official OpenFst Python wrapper.
 # See www.openfst.org for additional documentation.
 
+import collections as _collections
 import logging as _logging
 import os as _os
 import subprocess as _subprocess
 import time as _time
 
+import numpy as _numpy
+try:
+    from multiprocessing import resource_tracker as _resource_tracker
+    from multiprocessing import shared_memory as _shared_memory
+except ImportError:
+    _resource_tracker = None
+    _shared_memory = None
+
 from ..base import io as _base_io
 from ..util import io as _util_io
 
@@ -259,6 +268,14 @@ class _FstBase(object):
             acceptor=self._properties(_props.ACCEPTOR, True) == _props.ACCEPTOR,
             show_weight_one=self._properties(_props.WEIGHTED, True) == _props.WEIGHTED)
 
+    def __reduce__(self):
+        # FSTs are pickled in binary format along with their symbol tables.
+        return _fst_from_bytes, (type(self), self.to_bytes())
+
+    def __reduce_ex__(self, protocol):
+        # Overrides the extension type's implementation.
+        return self.__reduce__()
+
     def _valid_state_id(self, s):
         if not self._properties(_props.EXPANDED, True):
             _logging.error("Cannot get number of states for unexpanded FST")
@@ -359,6 +376,83 @@ class _FstBase(object):
             raise IndexError("State index out of range")
         return self._final(state)
 
+    @classmethod
+    def from_arrays(cls, src, dst, ilabel, olabel, weight, final_state,
+                    final_weight, start=None, num_states=None, string=None,
+                    string_offsets=None, final_string=None,
+                    final_string_offsets=None):
+        """Constructs an FST from arc and final weight arrays.
+
+        This is the inverse of `to_arrays`. Arcs are added in the given order,
+        hence an FST converted to arrays can be reconstructed with::
+
+            ofst = StdVectorFst.from_arrays(**fst.to_arrays())
+
+        Args:
+            src (numpy.ndarray): Source states of arcs.
+            dst (numpy.ndarray): Destination states of arcs.
+            ilabel (numpy.ndarray): Input labels of arcs.
+            olabel (numpy.ndarray): Output labels of arcs.
+            weight (numpy.ndarray): Weights of arcs. For lattice arc types,
+                each row holds the graph and acoustic costs of a weight.
+            final_state (numpy.ndarray): States with final weights.
+            final_weight (numpy.ndarray): Final weights of these states.
+            start (int): The start state. If ``None``, state 0 is the start
+                state if the FST has any states.
+            num_states (int): Number of states. If ``None``, it is set to one
+                more than the largest state index in arrays.
+            string (numpy.ndarray): Concatenated strings of compact lattice
+                arc weights. If ``None``, strings are empty.
+            string_offsets (numpy.ndarray): Offsets of compact lattice arc
+                weight strings. The string of arc `i` is
+                `string[string_offsets[i]:string_offsets[i+1]]`.
+            final_string (numpy.ndarray): Concatenated strings of compact
+                lattice final weights. If ``None``, strings are empty.
+            final_string_offsets (numpy.ndarray): Offsets of compact lattice
+                final weight strings.
+
+        Returns:
+            An FST object.
+
+        Raises:
+            ValueError: If arrays are not consistent.
+        """
+        def to_bytes(x, dtype):
+            return _numpy.ascontiguousarray(x, dtype=dtype).tobytes()
+
+        if num_states is None:
+            num_states = 1 + max([-1] + [int(_numpy.max(x)) for x in
+                                         (src, dst, final_state) if len(x)])
+            if start is not None:
+                num_states = max(num_states, start + 1)
+        if start is None:
+            start = 0 if num_states > 0 else _fst.NO_STATE_ID
+        strings = [b"", b"", b"", b""]
+        if string is not None:
+            strings[0] = to_bytes(string, _numpy.int32)
+            strings[1] = to_bytes(string_offsets[1:], _numpy.int64)
+        if final_string is not None:
+            strings[2] = to_bytes(final_string, _numpy.int32)
+            strings[3] = to_bytes(final_string_offsets[1:], _numpy.int64)
+        if any(strings):
+            # Missing strings are empty.
+            if string is None:
+                strings[1] = to_bytes(_numpy.zeros(len(src)), _numpy.int64)
+            if final_string is None:
+                strings[3] = to_bytes(_numpy.zeros(len(final_state)),
+                                      _numpy.int64)
+        ofst = cls._mutable_fst_type()
+        if not cls._ops.from_arrays(
+                start, num_states, to_bytes(src, _numpy.int32),
+                to_bytes(dst, _numpy.int32), to_bytes(ilabel, _numpy.int32),
+                to_bytes(olabel, _numpy.int32),
+                to_bytes(weight, _numpy.float32), strings[0], strings[1],
+                to_bytes(final_state, _numpy.int32),
+                to_bytes(final_weight, _numpy.float32), strings[2],
+                strings[3], ofst):
+            raise ValueError("Arc and final weight arrays are not consistent.")
+        return ofst if isinstance(ofst, cls) else cls(ofst)
+
     @classmethod
     def from_bytes(cls, s):
         """Returns the FST represented by the bytes object.
@@ -572,6 +666,67 @@ class _FstBase(object):
         fstprinter.print_fst(sstrm, "text")
         return sstrm.to_str()
 
+    def to_arrays(self):
+        """Returns arcs and final weights of the FST as arrays.
+
+        Arcs are listed state by state in the order they are stored. This is
+        much faster than iterating over states and arcs in Python. Output is
+        a dictionary with the following `(key, value)` pairs:
+
+        ====================== ============================== =================
+        key                    value                          value type
+        ====================== ============================== =================
+        "start"                Start state                    `int`
+        "num_states"           Number of states               `int`
+        "src"                  Source states of arcs          `numpy.ndarray`
+        "dst"                  Destination states of arcs     `numpy.ndarray`
+        "ilabel"               Input labels of arcs           `numpy.ndarray`
+        "olabel"               Output labels of arcs          `numpy.ndarray`
+        "weight"               Weights of arcs                `numpy.ndarray`
+        "final_state"          States with final weights      `numpy.ndarray`
+        "final_weight"         Final weights of these states  `numpy.ndarray`
+        ====================== ============================== =================
+
+        States and labels are given as `int32` arrays and weights as `float32`
+        arrays. For lattice arc types, weights are given as `N x 2` arrays of
+        (graph-cost, acoustic-cost) pairs. For compact lattices, weight strings
+        are given as concatenated `int32` arrays "string" and "final_string"
+        along with `int64` offset arrays "string_offsets" and
+        "final_string_offsets" of length `N + 1`. Only states with final
+        weights other than semiring zero are listed as final states. Returned
+        arrays are read-only.
+
+        Returns:
+            A dictionary of arrays.
+        """
+        (start, num_states, src, dst, ilabels, olabels, weights, strings,
+         string_ends, final_states, final_weights, final_strings,
+         final_string_ends) = self._ops.to_arrays(self)
+        int32, int64 = _numpy.int32, _numpy.int64
+        weights = _weight_array(self, weights)
+        final_weights = _weight_array(self, final_weights)
+        arrays = {
+            "start": start,
+            "num_states": num_states,
+            "src": _numpy.frombuffer(src, dtype=int32),
+            "dst": _numpy.frombuffer(dst, dtype=int32),
+            "ilabel": _numpy.frombuffer(ilabels, dtype=int32),
+            "olabel": _numpy.frombuffer(olabels, dtype=int32),
+            "weight": weights,
+            "final_state": _numpy.frombuffer(final_states, dtype=int32),
+            "final_weight": final_weights,
+        }
+        if self._ops is _clat_ops:
+            zero = _numpy.zeros(1, dtype=int64)
+            arrays["string"] = _numpy.frombuffer(strings, dtype=int32)
+            arrays["string_offsets"] = _numpy.concatenate(
+                (zero, _numpy.frombuffer(string_ends, dtype=int64)))
+            arrays["final_string"] = _numpy.frombuffer(final_strings,
+                                                       dtype=int32)
+            arrays["final_string_offsets"] = _numpy.concatenate(
+                (zero, _numpy.frombuffer(final_string_ends, dtype=int64)))
+        return arrays
+
     def to_bytes(self):
         """Returns a bytes object representing the FST.
 
@@ -3295,8 +3450,361 @@ def synchronize(ifst):
     return ofst
 
 
+# Array-valued FST algorithms
+
+def _weight_array(fst, s):
+    """Converts packed weight values of an FST type to an array."""
+    weights = _numpy.frombuffer(s, dtype=_numpy.float32)
+    if fst._ops in (_lat_ops, _clat_ops):
+        # Lattice weights are (graph-cost, acoustic-cost) pairs.
+        weights = weights.reshape(-1, 2)
+    return weights
+
+
+def shortestdistance_array(ifst, reverse=False, delta=_weight.DELTA):
+    """
+    Computes the shortest distance from the initial or final state as an array.
+
+    This is an array-valued version of :func:`shortestdistance` that uses the
+    default queue type. Distances of states that are not reachable are
+    semiring zero, i.e. infinity. For lattice arc types, distances are given
+    as `N x 2` arrays of (graph-cost, acoustic-cost) pairs. String parts of
+    compact lattice weights are dropped.
+
+    Args:
+        ifst: The input FST.
+        reverse: Should the reverse distance (from each state to the final
+            state) be computed?
+        delta: Comparison/quantization delta (default: 0.0009765625).
+
+    Returns:
+        numpy.ndarray: A read-only `float32` array indexed by state.
+    """
+    distances = ifst._ops.shortestdistance_array(ifst, reverse, delta)
+    return _weight_array(ifst, distances)
+
+
+def statedepth_array(ifst):
+    """
+    Computes the depth of each state.
+
+    The depth of a state is the minimum number of arcs on a path from the
+    initial state to that state.
+
+    Args:
+        ifst: The input FST.
+
+    Returns:
+        numpy.ndarray: A read-only `int32` array indexed by state. Depths of
+        states that are not reachable are -1.
+    """
+    return _numpy.frombuffer(ifst._ops.state_depths(ifst), dtype=_numpy.int32)
+
+
+def connectivity_arrays(ifst):
+    """
+    Computes the accessibility and coaccessibility of each state.
+
+    A state is accessible if it can be reached from the initial state and
+    coaccessible if a final state can be reached from it.
+
+    Args:
+        ifst: The input FST.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]: Read-only boolean arrays indexed
+        by state.
+    """
+    accessible, coaccessible = ifst._ops.connectivity(ifst)
+    return (_numpy.frombuffer(accessible, dtype=_numpy.bool_),
+            _numpy.frombuffer(coaccessible, dtype=_numpy.bool_))
+
+
+def toporder_array(ifst):
+    """
+    Computes a topological order of the states.
+
+    Unlike :meth:`MutableFst.topsort`, this operation does not modify the
+    input FST.
+
+    Args:
+        ifst: The input FST.
+
+    Returns:
+        numpy.ndarray: A read-only `int32` array listing the states in
+        topological order.
+
+    Raises:
+        RuntimeError: If the FST is cyclic.
+    """
+    acyclic, states = ifst._ops.toporder(ifst)
+    if not acyclic:
+        raise RuntimeError("Cannot topsort cyclic FST.")
+    return _numpy.frombuffer(states, dtype=_numpy.int32)
+
+
+def degree_arrays(ifst):
+    """
+    Computes the out-degree and in-degree of each state.
+
+    The out-degree of a state is the number of arcs leaving it, i.e. the
+    value returned by :meth:`Fst.num_arcs`, and its in-degree is the number
+    of arcs entering it.
+
+    Args:
+        ifst: The input FST.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]: Read-only `int32` arrays of
+        out-degrees and in-degrees indexed by state.
+    """
+    out_degrees, in_degrees = ifst._ops.degrees(ifst)
+    return (_numpy.frombuffer(out_degrees, dtype=_numpy.int32),
+            _numpy.frombuffer(in_degrees, dtype=_numpy.int32))
+
+
+def num_arcs_array(ifst):
+    """
+    Computes the number of arcs leaving each state.
+
+    Args:
+        ifst: The input FST.
+
+    Returns:
+        numpy.ndarray: A read-only `int32` array indexed by state.
+    """
+    return degree_arrays(ifst)[0]
+
+
+def degree_histograms(ifst):
+    """
+    Computes the histograms of state out-degrees and in-degrees.
+
+    Args:
+        ifst: The input FST.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]: Arrays whose `k`-th entries are
+        the number of states with out-degree and in-degree `k` respectively.
+    """
+    out_degrees, in_degrees = degree_arrays(ifst)
+    return _numpy.bincount(out_degrees), _numpy.bincount(in_degrees)
+
+
 # Utility functions
 
+class SymbolTableView(object):
+    """Compiled view of a symbol table for batch lookups.
+
+    This class caches a dense array mapping indices to symbols and a
+    dictionary mapping symbols to indices, which makes it possible to map
+    many indices or symbols at once without going through the
+    :class:`SymbolTable` API for each item. The view does not track changes
+    to the underlying symbol table. Use :func:`symbol_table_view` to get an
+    up-to-date view of a symbol table.
+
+    Args:
+        symbol_table (SymbolTable): The symbol table.
+
+    Attributes:
+        symbol_table (SymbolTable): The underlying symbol table.
+        checksum (str): The labeled checksum of the symbol table at the time
+            the view was compiled.
+    """
+    def __init__(self, symbol_table):
+        self.symbol_table = symbol_table
+        self.checksum = symbol_table.labeled_checksum()
+        self._signature = _symbol_table_signature(symbol_table)
+        indices, symbols = [], []
+        for i in range(symbol_table.num_symbols()):
+            index = symbol_table.get_nth_key(i)
+            indices.append(index)
+            symbols.append(symbol_table.find_symbol(index))
+        self._indices = dict(zip(symbols, indices))
+        indices = _numpy.array(indices, dtype=_numpy.int64)
+        if len(indices) and indices.min() < 0:
+            raise ValueError("Symbol tables with negative indices are not "
+                             "supported.")
+        size = indices.max() + 1 if len(indices) else 0
+        self._symbols = _numpy.full(size, None, dtype=object)
+        self._symbols[indices] = symbols
+        self._known = _numpy.zeros(size, dtype=bool)
+        self._known[indices] = True
+
+    def __len__(self):
+        return len(self._indices)
+
+    def _lookup_symbols(self, indices):
+        indices = _numpy.asarray(indices)
+        if indices.size == 0:
+            return _numpy.empty(indices.shape, dtype=object)
+        if not _numpy.issubdtype(indices.dtype, _numpy.integer):
+            raise TypeError("Indices should be integers.")
+        inside = (indices >= 0) & (indices < len(self._symbols))
+        valid = _numpy.zeros(indices.shape, dtype=bool)
+        valid[inside] = self._known[indices[inside]]
+        if not valid.all():
+            raise KeyError("Index {} is not found in the symbol table."
+                           .format(indices[~valid].flat[0]))
+        return self._symbols[indices]
+
+    def _lookup_indices(self, symbols):
+        try:
+            return [self._indices[symbol] for symbol in symbols]
+        except KeyError as err:
+            raise KeyError("Symbol {} is not found in the symbol table."
+                           .format(err.args[0]))
+
+    def symbols_array(self, indices):
+        """Converts an array of indices to an array of symbols.
+
+        Args:
+            indices (numpy.ndarray): An integer array of any shape.
+
+        Returns:
+            numpy.ndarray: An object array of symbols with the same shape.
+
+        Raises:
+            KeyError: If an index is not found in the symbol table.
+        """
+        return self._lookup_symbols(indices)
+
+    def indices_array(self, symbols):
+        """Converts a sequence of symbols to an array of indices.
+
+        Args:
+            symbols (List[str]): The list of symbols.
+
+        Returns:
+            numpy.ndarray: An `int32` array of indices.
+
+        Raises:
+            KeyError: If a symbol is not found in the symbol table.
+        """
+        return _numpy.array(self._lookup_indices(symbols), dtype=_numpy.int32)
+
+    def indices_to_symbols(self, indices):
+        """Converts indices to symbols.
+
+        Args:
+            indices (List[int]): The list of indices.
+
+        Returns:
+            List[str]: The list of symbols corresponding to the given indices.
+
+        Raises:
+            KeyError: If an index is not found in the symbol table.
+        """
+        return self._lookup_symbols(indices).tolist()
+
+    def symbols_to_indices(self, symbols):
+        """Converts symbols to indices.
+
+        Args:
+            symbols (List[str]): The list of symbols.
+
+        Returns:
+            List[int]: The list of indices corresponding to the given symbols.
+
+        Raises:
+            KeyError: If a symbol is not found in the symbol table.
+        """
+        return self._lookup_indices(symbols)
+
+    def indices_to_symbols_batch(self, batch):
+        """Converts a batch of index sequences to symbol sequences.
+
+        All sequences are mapped with a single lookup.
+
+        Args:
+            batch (List[List[int]]): The list of index sequences.
+
+        Returns:
+            List[List[str]]: The list of symbol sequences.
+
+        Raises:
+            KeyError: If an index is not found in the symbol table.
+        """
+        batch = [_numpy.asarray(indices, dtype=_numpy.int64).ravel()
+                 for indices in batch]
+        if not batch:
+            return []
+        symbols = self._lookup_symbols(_numpy.concatenate(batch)).tolist()
+        outputs, offset = [], 0
+        for indices in batch:
+            outputs.append(symbols[offset:offset + len(indices)])
+            offset += len(indices)
+        return outputs
+
+    def symbols_to_indices_batch(self, batch):
+        """Converts a batch of symbol sequences to index sequences.
+
+        Args:
+            batch (List[List[str]]): The list of symbol sequences.
+
+        Returns:
+            List[List[int]]: The list of index sequences.
+
+        Raises:
+            KeyError: If a symbol is not found in the symbol table.
+        """
+        return [self._lookup_indices(symbols) for symbols in batch]
+
+    def indices_to_text_batch(self, batch, sep=" "):
+        """Converts a batch of index sequences to text.
+
+        Args:
+            batch (List[List[int]]): The list of index sequences.
+            sep (str): The separator placed between symbols.
+
+        Returns:
+            List[str]: The list of texts.
+
+        Raises:
+            KeyError: If an index is not found in the symbol table.
+        """
+        return [sep.join(symbols)
+                for symbols in self.indices_to_symbols_batch(batch)]
+
+
+# Most recently used symbol table views keyed by the ids of their tables.
+# Views keep references to their tables, hence ids are not reused while the
+# views are cached.
+_symbol_table_views = _collections.OrderedDict()
+_SYMBOL_TABLE_VIEW_CACHE_SIZE = 16
+
+
+def _symbol_table_signature(symbol_table):
+    """Returns a cheap signature of the symbol table contents."""
+    return symbol_table.num_symbols(), symbol_table.available_key()
+
+
+def symbol_table_view(symbol_table):
+    """Returns a compiled view of the symbol table.
+
+    Views of the most recently used symbol tables are cached. The cached view
+    is recompiled if symbols are added to or removed from the symbol table.
+    Construct a :class:`SymbolTableView` directly to pick up other changes.
+
+    Args:
+        symbol_table (SymbolTable): The symbol table.
+
+    Returns:
+        SymbolTableView: A view of the symbol table.
+    """
+    if isinstance(symbol_table, SymbolTableView):
+        return symbol_table
+    key = id(symbol_table)
+    view = _symbol_table_views.pop(key, None)
+    if (view is None or view.symbol_table is not symbol_table
+            or view._signature != _symbol_table_signature(symbol_table)):
+        view = SymbolTableView(symbol_table)
+    _symbol_table_views[key] = view
+    while len(_symbol_table_views) > _SYMBOL_TABLE_VIEW_CACHE_SIZE:
+        _symbol_table_views.popitem(last=False)
+    return view
+
+
 def indices_to_symbols(symbol_table, indices):
     """Converts indices to symbols by looking them up in the symbol table.
 
@@ -3310,14 +3818,7 @@ def indices_to_symbols(symbol_table, indices):
     Raises:
         KeyError: If an index is not found in the symbol table.
     """
-    symbols = []
-    for index in indices:
-        symbol = symbol_table.find_symbol(index)
-        if symbol == "":
-            raise KeyError("Index {} is not found in the symbol table."
-                           .format(index))
-        symbols.append(symbol)
-    return symbols
+    return symbol_table_view(symbol_table).indices_to_symbols(indices)
 
 
 def symbols_to_indices(symbol_table, symbols):
@@ -3333,14 +3834,7 @@ def symbols_to_indices(symbol_table, symbols):
     Raises:
         KeyError: If a symbol is not found in the symbol table.
     """
-    indices = []
-    for symbol in symbols:
-        index = symbol_table.find_index(symbol)
-        if index == -1:
-            raise KeyError("Symbol {} is not found in the symbol table."
-                           .format(symbol))
-        indices.append(index)
-    return indices
+    return symbol_table_view(symbol_table).symbols_to_indices(symbols)
 
 
 # Kaldi I/O
@@ -3429,6 +3923,149 @@ def write_fst_kaldi(fst, wxfilename):
             raise IOError("{}".format(err))
 
 
+# Shared memory transport
+
+def _fst_from_bytes(cls, s):
+    """Unpickles an FST of the given type."""
+    return cls.from_bytes(s)
+
+
+def _tracks_shared_memory():
+    """Returns whether shared memory blocks are tracked by this platform."""
+    return getattr(_shared_memory, "_USE_POSIX", False)
+
+
+def _attach_shared_memory(name):
+    """Attaches to an existing shared memory block without tracking it.
+
+    Resource trackers unlink the shared memory blocks they track when the
+    processes using them exit, hence only the creator of a block should
+    track it.
+    """
+    try:
+        return _shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass  # Python < 3.13 always tracks shared memory blocks.
+    shm = _shared_memory.SharedMemory(name=name)
+    if _tracks_shared_memory():
+        _resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedFstList(object):
+    """List of FSTs stored in a shared memory block.
+
+    This class serializes FSTs into a single
+    :class:`multiprocessing.shared_memory.SharedMemory` block. Pickling a
+    shared FST list only transfers the name of the block and the offsets of
+    the FSTs in it, hence it can be passed to worker processes without copying
+    the serialized FSTs through pipes. FSTs are deserialized on access, e.g. ::
+
+        shared = SharedFstList(lattices)
+        try:
+            with multiprocessing.Pool() as pool:
+                results = pool.map(process, [(shared, i) for i in range(n)])
+        finally:
+            shared.close()
+            shared.unlink()
+
+    The process creating the list owns the shared memory block and should
+    unlink it when it is no longer needed. Other processes should only close
+    their handles. Only the owner registers the block with the resource
+    tracker, hence the block is not destroyed when a worker process exits.
+    Requires Python 3.8 or newer.
+
+    Args:
+        fsts (Iterable[Fst]): The FSTs to share.
+
+    Attributes:
+        name (str): The name of the shared memory block.
+
+    Raises:
+        RuntimeError: If shared memory is not supported.
+    """
+    def __init__(self, fsts):
+        if _shared_memory is None:
+            raise RuntimeError("Shared memory transport requires Python 3.8 "
+                               "or newer.")
+        fsts = list(fsts)
+        data = [fst.to_bytes() for fst in fsts]
+        self._types = [type(fst) for fst in fsts]
+        self._offsets = [0]
+        for s in data:
+            self._offsets.append(self._offsets[-1] + len(s))
+        self._shm = _shared_memory.SharedMemory(
+            create=True, size=max(1, self._offsets[-1]))
+        for s, offset in zip(data, self._offsets):
+            self._shm.buf[offset:offset + len(s)] = s
+        self._owned_shm = self._shm
+        self.name = self._shm.name
+
+    def __getstate__(self):
+        return {"name": self.name, "types": self._types,
+                "offsets": self._offsets}
+
+    def __setstate__(self, state):
+        if _shared_memory is None:
+            raise RuntimeError("Shared memory transport requires Python 3.8 "
+                               "or newer.")
+        self.name = state["name"]
+        self._types = state["types"]
+        self._offsets = state["offsets"]
+        self._shm = None
+        self._owned_shm = None
+
+    def __len__(self):
+        return len(self._types)
+
+    def __getitem__(self, index):
+        """Deserializes the FST at the given index.
+
+        Args:
+            index (int): The index of the FST.
+
+        Returns:
+            An FST object with the same type as the shared FST.
+
+        Raises:
+            IndexError: If index is out of range.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("FST index out of range.")
+        if self._shm is None:
+            self._shm = _attach_shared_memory(self.name)
+        begin, end = self._offsets[index], self._offsets[index + 1]
+        return self._types[index].from_bytes(bytes(self._shm.buf[begin:end]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        """Closes the handle of this process to the shared memory block."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self):
+        """Destroys the shared memory block.
+
+        This should be called once, by the process that created the list.
+        """
+        shm = self._owned_shm
+        if shm is None:
+            shm = _attach_shared_memory(self.name)
+            shm.close()
+        if _tracks_shared_memory():
+            # Processes sharing the resource tracker of the creator may have
+            # unregistered the block already. Unlinking unregisters it again.
+            _resource_tracker.register(shm._name, "shared_memory")
+        shm.unlink()
+        self._owned_shm = None
+
+
 ################################################################################
 
 __all__ = [name for name in dir()
@@ -176,6 +176,324 @@ void UnionExt(MutableFst<Arc> *fst1, const Fst<Arc> &fst2) {
   Union(fst1, fst2);
 }
 
+// Array conversion
+
+// Weights are stored as one or two float values per weight. Compact lattice
+// weights also store a string of integers.
+
+template <class Weight>
+struct WeightArrays;
+
+template <>
+struct WeightArrays<TropicalWeight> {
+  static const int kNumValues = 1;
+  static void Append(const TropicalWeight &w, std::vector<float> *values,
+                     std::vector<int32> *strings) {
+    values->push_back(w.Value());
+  }
+  static TropicalWeight Make(const float *values, const int32 *begin,
+                             const int32 *end) {
+    return TropicalWeight(values[0]);
+  }
+};
+
+template <>
+struct WeightArrays<LogWeight> {
+  static const int kNumValues = 1;
+  static void Append(const LogWeight &w, std::vector<float> *values,
+                     std::vector<int32> *strings) {
+    values->push_back(w.Value());
+  }
+  static LogWeight Make(const float *values, const int32 *begin,
+                        const int32 *end) {
+    return LogWeight(values[0]);
+  }
+};
+
+template <>
+struct WeightArrays<LatticeWeightTpl<float>> {
+  static const int kNumValues = 2;
+  static void Append(const LatticeWeightTpl<float> &w,
+                     std::vector<float> *values, std::vector<int32> *strings) {
+    values->push_back(w.Value1());
+    values->push_back(w.Value2());
+  }
+  static LatticeWeightTpl<float> Make(const float *values, const int32 *begin,
+                                      const int32 *end) {
+    return LatticeWeightTpl<float>(values[0], values[1]);
+  }
+};
+
+template <>
+struct WeightArrays<CompactLatticeWeightTpl<LatticeWeightTpl<float>, int32>> {
+  typedef CompactLatticeWeightTpl<LatticeWeightTpl<float>, int32> Weight;
+  static const int kNumValues = 2;
+  static void Append(const Weight &w, std::vector<float> *values,
+                     std::vector<int32> *strings) {
+    values->push_back(w.Weight().Value1());
+    values->push_back(w.Weight().Value2());
+    strings->insert(strings->end(), w.String().begin(), w.String().end());
+  }
+  static Weight Make(const float *values, const int32 *begin,
+                     const int32 *end) {
+    return Weight(LatticeWeightTpl<float>(values[0], values[1]),
+                  std::vector<int32>(begin, end));
+  }
+};
+
+template <typename T>
+void VectorToBytes(const std::vector<T> &v, string *result) {
+  result->assign(reinterpret_cast<const char *>(v.data()),
+                 v.size() * sizeof(T));
+}
+
+// Outputs the arcs and the final weights of an FST as packed arrays. Arc and
+// final weight strings are concatenated, ends are cumulative string lengths.
+template <class Arc>
+void FstToArraysExt(const Fst<Arc> &fst, int64 *start, int64 *num_states,
+                    string *src, string *dst, string *ilabels,
+                    string *olabels, string *weights, string *strings,
+                    string *string_ends, string *final_states,
+                    string *final_weights, string *final_strings,
+                    string *final_string_ends) {
+  typedef typename Arc::StateId StateId;
+  typedef typename Arc::Weight Weight;
+  typedef WeightArrays<Weight> W;
+  std::vector<int32> src_v, dst_v, ilabels_v, olabels_v, strings_v;
+  std::vector<int32> final_states_v, final_strings_v;
+  std::vector<int64> string_ends_v, final_string_ends_v;
+  std::vector<float> weights_v, final_weights_v;
+  if (fst.Properties(kExpanded, false)) {
+    size_t num_arcs = CountArcs(fst);
+    src_v.reserve(num_arcs);
+    dst_v.reserve(num_arcs);
+    ilabels_v.reserve(num_arcs);
+    olabels_v.reserve(num_arcs);
+    weights_v.reserve(num_arcs * W::kNumValues);
+  }
+  StateId count = 0;
+  for (StateIterator<Fst<Arc>> siter(fst); !siter.Done(); siter.Next()) {
+    StateId s = siter.Value();
+    ++count;
+    for (ArcIterator<Fst<Arc>> aiter(fst, s); !aiter.Done(); aiter.Next()) {
+      const Arc &arc = aiter.Value();
+      src_v.push_back(s);
+      dst_v.push_back(arc.nextstate);
+      ilabels_v.push_back(arc.ilabel);
+      olabels_v.push_back(arc.olabel);
+      W::Append(arc.weight, &weights_v, &strings_v);
+      string_ends_v.push_back(strings_v.size());
+    }
+    Weight final_weight = fst.Final(s);
+    if (final_weight != Weight::Zero()) {
+      final_states_v.push_back(s);
+      W::Append(final_weight, &final_weights_v, &final_strings_v);
+      final_string_ends_v.push_back(final_strings_v.size());
+    }
+  }
+  *start = fst.Start();
+  *num_states = count;
+  VectorToBytes(src_v, src);
+  VectorToBytes(dst_v, dst);
+  VectorToBytes(ilabels_v, ilabels);
+  VectorToBytes(olabels_v, olabels);
+  VectorToBytes(weights_v, weights);
+  VectorToBytes(strings_v, strings);
+  VectorToBytes(string_ends_v, string_ends);
+  VectorToBytes(final_states_v, final_states);
+  VectorToBytes(final_weights_v, final_weights);
+  VectorToBytes(final_strings_v, final_strings);
+  VectorToBytes(final_string_ends_v, final_string_ends);
+}
+
+// Replaces the contents of an FST with the arcs and final weights given as
+// packed arrays. Returns false if the arrays are inconsistent.
+template <class Arc>
+bool ArraysToFstExt(int64 start, int64 num_states, const string &src,
+                    const string &dst, const string &ilabels,
+                    const string &olabels, const string &weights,
+                    const string &strings, const string &string_ends,
+                    const string &final_states, const string &final_weights,
+                    const string &final_strings,
+                    const string &final_string_ends, MutableFst<Arc> *fst) {
+  typedef typename Arc::Weight Weight;
+  typedef WeightArrays<Weight> W;
+  size_t num_arcs = src.size() / sizeof(int32);
+  size_t num_finals = final_states.size() / sizeof(int32);
+  bool has_strings = !string_ends.empty() || !final_string_ends.empty();
+  if (src.size() != num_arcs * sizeof(int32) ||
+      dst.size() != src.size() || ilabels.size() != src.size() ||
+      olabels.size() != src.size() ||
+      weights.size() != num_arcs * W::kNumValues * sizeof(float) ||
+      final_states.size() != num_finals * sizeof(int32) ||
+      final_weights.size() != num_finals * W::kNumValues * sizeof(float) ||
+      (has_strings &&
+       (string_ends.size() != num_arcs * sizeof(int64) ||
+        final_string_ends.size() != num_finals * sizeof(int64))))
+    return false;
+  if (num_states < 0 || start < kNoStateId || start >= num_states)
+    return false;
+  const int32 *src_p = reinterpret_cast<const int32 *>(src.data());
+  const int32 *dst_p = reinterpret_cast<const int32 *>(dst.data());
+  const int32 *ilabels_p = reinterpret_cast<const int32 *>(ilabels.data());
+  const int32 *olabels_p = reinterpret_cast<const int32 *>(olabels.data());
+  const float *weights_p = reinterpret_cast<const float *>(weights.data());
+  const int32 *strings_p = reinterpret_cast<const int32 *>(strings.data());
+  const int64 *ends_p = reinterpret_cast<const int64 *>(string_ends.data());
+  const int32 *finals_p = reinterpret_cast<const int32 *>(final_states.data());
+  const float *final_weights_p =
+      reinterpret_cast<const float *>(final_weights.data());
+  const int32 *final_strings_p =
+      reinterpret_cast<const int32 *>(final_strings.data());
+  const int64 *final_ends_p =
+      reinterpret_cast<const int64 *>(final_string_ends.data());
+  int64 num_strings = strings.size() / sizeof(int32);
+  int64 num_final_strings = final_strings.size() / sizeof(int32);
+
+  std::vector<size_t> num_state_arcs(num_states, 0);
+  for (size_t i = 0; i < num_arcs; ++i) {
+    if (src_p[i] < 0 || src_p[i] >= num_states ||
+        dst_p[i] < 0 || dst_p[i] >= num_states)
+      return false;
+    if (has_strings && (ends_p[i] < (i ? ends_p[i - 1] : 0) ||
+                        ends_p[i] > num_strings))
+      return false;
+    ++num_state_arcs[src_p[i]];
+  }
+  for (size_t i = 0; i < num_finals; ++i) {
+    if (finals_p[i] < 0 || finals_p[i] >= num_states)
+      return false;
+    if (has_strings && (final_ends_p[i] < (i ? final_ends_p[i - 1] : 0) ||
+                        final_ends_p[i] > num_final_strings))
+      return false;
+  }
+
+  fst->DeleteStates();
+  fst->ReserveStates(num_states);
+  for (int64 s = 0; s < num_states; ++s) {
+    fst->AddState();
+    fst->ReserveArcs(s, num_state_arcs[s]);
+  }
+  if (start != kNoStateId) fst->SetStart(start);
+  for (size_t i = 0; i < num_arcs; ++i) {
+    const int32 *begin = strings_p, *end = strings_p;
+    if (has_strings) {
+      begin = strings_p + (i ? ends_p[i - 1] : 0);
+      end = strings_p + ends_p[i];
+    }
+    fst->AddArc(src_p[i], Arc(ilabels_p[i], olabels_p[i],
+                              W::Make(weights_p + i * W::kNumValues,
+                                      begin, end),
+                              dst_p[i]));
+  }
+  for (size_t i = 0; i < num_finals; ++i) {
+    const int32 *begin = final_strings_p, *end = final_strings_p;
+    if (has_strings) {
+      begin = final_strings_p + (i ? final_ends_p[i - 1] : 0);
+      end = final_strings_p + final_ends_p[i];
+    }
+    fst->SetFinal(finals_p[i],
+                  W::Make(final_weights_p + i * W::kNumValues, begin, end));
+  }
+  return true;
+}
+
+// The following algorithms output one packed array entry per state.
+
+// Outputs shortest distances from the start state (or to the final states if
+// reverse is true). Distances of unreachable states are semiring zero.
+// Compact lattice weight strings are not included.
+template <class Arc>
+void ShortestDistanceArraysExt(const Fst<Arc> &fst, bool reverse, float delta,
+                               string *distances) {
+  typedef typename Arc::Weight Weight;
+  typedef WeightArrays<Weight> W;
+  std::vector<Weight> distance;
+  ShortestDistance(fst, &distance, reverse, delta);
+  size_t num_states = CountStates(fst);
+  distance.resize(num_states, Weight::Zero());
+  std::vector<float> values;
+  std::vector<int32> strings;
+  values.reserve(num_states * W::kNumValues);
+  for (size_t s = 0; s < num_states; ++s)
+    W::Append(distance[s], &values, &strings);
+  VectorToBytes(values, distances);
+}
+
+// Outputs the minimum number of arcs on a path from the start state to each
+// state, or -1 for unreachable states.
+template <class Arc>
+void StateDepthsExt(const Fst<Arc> &fst, string *depths) {
+  typedef typename Arc::StateId StateId;
+  std::vector<int32> depth(CountStates(fst), -1);
+  StateId start = fst.Start();
+  if (start != kNoStateId) {
+    std::vector<StateId> queue(1, start);
+    depth[start] = 0;
+    for (size_t i = 0; i < queue.size(); ++i) {
+      StateId s = queue[i];
+      for (ArcIterator<Fst<Arc>> aiter(fst, s); !aiter.Done(); aiter.Next()) {
+        StateId t = aiter.Value().nextstate;
+        if (depth[t] < 0) {
+          depth[t] = depth[s] + 1;
+          queue.push_back(t);
+        }
+      }
+    }
+  }
+  VectorToBytes(depth, depths);
+}
+
+// Outputs accessibility (reachable from the start state) and coaccessibility
+// (can reach a final state) flags of each state.
+template <class Arc>
+void ConnectivityExt(const Fst<Arc> &fst, string *accessible,
+                     string *coaccessible) {
+  typedef typename Arc::StateId StateId;
+  std::vector<StateId> scc;
+  std::vector<bool> access, coaccess;
+  uint64 props = 0;
+  SccVisitor<Arc> visitor(&scc, &access, &coaccess, &props);
+  DfsVisit(fst, &visitor);
+  std::vector<uint8> access_v(access.begin(), access.end());
+  std::vector<uint8> coaccess_v(coaccess.begin(), coaccess.end());
+  VectorToBytes(access_v, accessible);
+  VectorToBytes(coaccess_v, coaccessible);
+}
+
+// Outputs states in topological order if the FST is acyclic.
+template <class Arc>
+void TopOrderExt(const Fst<Arc> &fst, bool *acyclic, string *states) {
+  typedef typename Arc::StateId StateId;
+  std::vector<StateId> order;
+  TopOrderVisitor<Arc> visitor(&order, acyclic);
+  DfsVisit(fst, &visitor);
+  std::vector<int32> states_v;
+  if (*acyclic) {
+    states_v.resize(order.size());
+    for (size_t s = 0; s < order.size(); ++s)
+      states_v[order[s]] = s;
+  }
+  VectorToBytes(states_v, states);
+}
+
+// Outputs the number of arcs leaving and entering each state.
+template <class Arc>
+void DegreesExt(const Fst<Arc> &fst, string *out_degrees,
+                string *in_degrees) {
+  typedef typename Arc::StateId StateId;
+  size_t num_states = CountStates(fst);
+  std::vector<int32> out_v(num_states, 0), in_v(num_states, 0);
+  for (StateIterator<Fst<Arc>> siter(fst); !siter.Done(); siter.Next()) {
+    StateId s = siter.Value();
+    out_v[s] = fst.NumArcs(s);
+    for (ArcIterator<Fst<Arc>> aiter(fst, s); !aiter.Done(); aiter.Next())
+      ++in_v[aiter.Value().nextstate];
+  }
+  VectorToBytes(out_v, out_degrees);
+  VectorToBytes(in_v, in_degrees);
+}
+
 }  // namespace fst
 
 #endif  // PYKALDI_FSTEXT_FST_INPLACE_OPS_H_
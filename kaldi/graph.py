@@ -0,0 +1,307 @@
+from __future__ import division
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+
+from .base import io as _base_io
+from . import fstext as _fst
+from .fstext import properties as _fst_props
+from .fstext import special as _fst_spec
+from .fstext import utils as _fst_utils
+from . import hmm as _hmm
+from . import tree as _tree
+from .util import io as _util_io
+
+
+__all__ = ['GraphBuilder']
+
+
+def _hash(*parts):
+    """Returns a hex digest of the given bytes/str/int/float parts."""
+    sha = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, float):
+            part = struct.pack("<d", part)
+        elif isinstance(part, (bool, int)):
+            part = struct.pack("<q", int(part))
+        elif not isinstance(part, bytes):
+            part = part.encode("utf-8")
+        sha.update(struct.pack("<Q", len(part)))
+        sha.update(part)
+    return sha.hexdigest()
+
+
+def _kaldi_object_bytes(obj):
+    """Returns the binary Kaldi serialization of an object."""
+    ostrm = _base_io.ostringstream()
+    obj.write(ostrm, True)
+    return ostrm.to_bytes()
+
+
+class GraphBuilder(object):
+    """Decoding graph builder with on-disk caching of intermediate graphs.
+
+    This class builds HCLG decoding graphs following the recipe implemented by
+    the Kaldi script `utils/mkgraph.sh`, i.e.::
+
+        LG    = push_special(minimize(determinize_star(L o G)))
+        CLG   = C o LG
+        HCLGa = minimize(remove_eps_local(remove_disambig(
+                    determinize_star(Ha o CLG))))
+        HCLG  = add_self_loops(HCLGa)
+
+    Each intermediate graph is identified by a hash of the contents of its
+    inputs (lexicon, grammar, tree, transition model, disambiguation symbols)
+    and of the options it depends on. If a cache directory is given, the
+    intermediate graphs are stored there and a stage is only recomputed if
+    one of its inputs changed. For instance, the H transducer only depends on
+    the context-dependent input labels of CLG, hence it is typically reused
+    across different grammars. Building a graph for a grammar seen before
+    only reads the final graph from disk.
+
+    The cache directory can be shared between processes. Cache files are
+    written atomically and are never modified once written. Stale entries are
+    not deleted automatically.
+
+    Args:
+        trans_model (TransitionModel): The transition model.
+        tree (ContextDependency): The phonetic decision tree.
+        lexicon (StdFst): The lexicon FST with disambiguation symbols, e.g.
+            `L_disambig.fst`.
+        disambig_symbols (List[int]): Phone disambiguation symbols.
+        cache_dir (str): Directory for caching intermediate graphs. If
+            ``None``, nothing is cached.
+        transition_scale (float): Scale of transition probabilities in the
+            H transducer.
+        self_loop_scale (float): Scale of self-loop probabilities.
+        reorder (bool): Whether to reorder transition-ids when adding
+            self-loops.
+        const (bool): Whether to convert the final graph to a constant FST.
+    """
+    def __init__(self, trans_model, tree, lexicon, disambig_symbols,
+                 cache_dir=None, transition_scale=1.0, self_loop_scale=0.1,
+                 reorder=True, const=True):
+        self.trans_model = trans_model
+        self.tree = tree
+        self.lexicon = lexicon
+        self.disambig_symbols = list(disambig_symbols)
+        self.cache_dir = cache_dir
+        self.transition_scale = transition_scale
+        self.self_loop_scale = self_loop_scale
+        self.reorder = reorder
+        self.const = const
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self._lexicon_hash = _hash(lexicon.to_bytes())
+        self._tree_hash = _hash(_kaldi_object_bytes(tree))
+        self._model_hash = _hash(_kaldi_object_bytes(trans_model))
+        self._disambig_hash = _hash(*self.disambig_symbols)
+
+    @classmethod
+    def from_files(cls, model_rxfilename, tree_rxfilename, lexicon_rxfilename,
+                   disambig_rxfilename, cache_dir=None, transition_scale=1.0,
+                   self_loop_scale=0.1, reorder=True, const=True):
+        """Constructs a new graph builder from given files.
+
+        Args:
+            model_rxfilename (str): Extended filename for reading the
+                transition model. Acoustic model files can be given as well
+                since they start with the transition model.
+            tree_rxfilename (str): Extended filename for reading the phonetic
+                decision tree.
+            lexicon_rxfilename (str): Extended filename for reading the
+                lexicon FST with disambiguation symbols.
+            disambig_rxfilename (str): Extended filename for reading the list
+                of phone disambiguation symbols.
+            cache_dir (str): Directory for caching intermediate graphs.
+            transition_scale (float): Scale of transition probabilities.
+            self_loop_scale (float): Scale of self-loop probabilities.
+            reorder (bool): Whether to reorder transition-ids.
+            const (bool): Whether to convert the final graph to a constant
+                FST.
+
+        Returns:
+            GraphBuilder: A new graph builder.
+        """
+        with _util_io.xopen(model_rxfilename) as ki:
+            trans_model = _hmm.TransitionModel().read(ki.stream(), ki.binary)
+        tree = _tree.ContextDependency()
+        with _util_io.xopen(tree_rxfilename) as ki:
+            tree.read(ki.stream(), ki.binary)
+        lexicon = _fst.read_fst_kaldi(lexicon_rxfilename)
+        with _util_io.xopen(disambig_rxfilename, "rt") as ki:
+            disambig_symbols = [int(line.strip()) for line in ki]
+        return cls(trans_model, tree, lexicon, disambig_symbols, cache_dir,
+                   transition_scale, self_loop_scale, reorder, const)
+
+    def _path(self, stage, key, ext):
+        return os.path.join(self.cache_dir, "{}-{}.{}".format(stage, key, ext))
+
+    def _write_atomic(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.rename(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _load(self, stage, key, with_info=False):
+        """Loads a cached graph (and its label info) if it exists."""
+        if self.cache_dir is None:
+            return None
+        path = self._path(stage, key, "fst")
+        info_path = self._path(stage, key, "json")
+        if not os.path.exists(path):
+            return None
+        if with_info and not os.path.exists(info_path):
+            return None
+        with open(path, "rb") as f:
+            fst = _fst.StdVectorFst.from_bytes(f.read())
+        logging.info("Loaded cached {} graph {}.".format(stage, key))
+        if not with_info:
+            return fst
+        with open(info_path, "rt") as f:
+            return fst, json.load(f)
+
+    def _store(self, stage, key, fst, info=None):
+        """Stores a graph (and its label info) in the cache directory."""
+        if self.cache_dir is None:
+            return
+        if info is not None:
+            self._write_atomic(self._path(stage, key, "json"),
+                               json.dumps(info).encode("utf-8"))
+        self._write_atomic(self._path(stage, key, "fst"), fst.to_bytes())
+
+    def _keys(self, grammar_hash):
+        """Returns cache keys of all stages for the given grammar hash."""
+        lg = _hash("LG", self._lexicon_hash, grammar_hash)
+        clg = _hash("CLG", lg, self.tree.context_width(),
+                    self.tree.central_position(), self._disambig_hash,
+                    "ilabel_sorted")
+        hclga = _hash("HCLGa", clg, self._tree_hash, self._model_hash,
+                      self.transition_scale)
+        hclg = _hash("HCLG", hclga, self._model_hash, self.self_loop_scale,
+                     self.reorder)
+        return lg, clg, hclga, hclg
+
+    def _make_lg(self, key, grammar):
+        lg = self._load("LG", key)
+        if lg is None:
+            # Table composition matches on the input labels of the grammar.
+            if not grammar.properties(_fst_props.I_LABEL_SORTED, True):
+                grammar = _fst.StdVectorFst(grammar).arcsort("ilabel")
+            lg = _fst.StdVectorFst()
+            _fst_spec.table_compose(self.lexicon, grammar, lg)
+            _fst_spec.determinize_star_in_log(lg)
+            _fst_utils.minimize_encoded_std_fst(lg)
+            _fst_spec.push_special(lg)
+            self._store("LG", key, lg)
+        return lg
+
+    def _make_clg(self, keys, grammar):
+        cached = self._load("CLG", keys[1], with_info=True)
+        if cached is not None:
+            return cached
+        lg = self._make_lg(keys[0], grammar)
+        clg, ilabels = _fst_spec.compose_context(
+            self.disambig_symbols, self.tree.context_width(),
+            self.tree.central_position(), lg)
+        ilabels = [list(ilabel) for ilabel in ilabels]
+        # CLG is the right operand of the composition with Ha.
+        clg.arcsort("ilabel")
+        self._store("CLG", keys[1], clg, ilabels)
+        return clg, ilabels
+
+    def _make_ha(self, ilabels):
+        key = _hash("Ha", self._tree_hash, self._model_hash,
+                    self.transition_scale, json.dumps(ilabels))
+        cached = self._load("Ha", key, with_info=True)
+        if cached is not None:
+            return cached
+        config = _hmm.HTransducerConfig()
+        config.transition_scale = self.transition_scale
+        ha, disambig_tids = _hmm.get_h_transducer(ilabels, self.tree,
+                                                  self.trans_model, config)
+        disambig_tids = list(disambig_tids)
+        self._store("Ha", key, ha, disambig_tids)
+        return ha, disambig_tids
+
+    def _make_hclga(self, keys, grammar):
+        hclga = self._load("HCLGa", keys[2])
+        if hclga is None:
+            clg, ilabels = self._make_clg(keys, grammar)
+            ha, disambig_tids = self._make_ha(ilabels)
+            hclga = _fst.StdVectorFst()
+            _fst_spec.table_compose(ha, clg, hclga)
+            _fst_spec.determinize_star_in_log(hclga)
+            _fst_utils.remove_some_input_symbols(disambig_tids, hclga)
+            _fst_spec.remove_eps_local(hclga)
+            _fst_utils.minimize_encoded_std_fst(hclga)
+            self._store("HCLGa", keys[2], hclga)
+        return hclga
+
+    def make_lg(self, grammar):
+        """Builds the LG graph for a grammar.
+
+        Args:
+            grammar (StdFst): The grammar FST.
+
+        Returns:
+            StdVectorFst: The LG graph.
+        """
+        keys = self._keys(_hash(grammar.to_bytes()))
+        return self._make_lg(keys[0], grammar)
+
+    def make_clg(self, grammar):
+        """Builds the CLG graph for a grammar.
+
+        Args:
+            grammar (StdFst): The grammar FST.
+
+        Returns:
+            Tuple[StdVectorFst, List[List[int]]]: The CLG graph and the
+            context-dependent input label information.
+        """
+        return self._make_clg(self._keys(_hash(grammar.to_bytes())), grammar)
+
+    def make_hclga(self, grammar):
+        """Builds the HCLG graph without self-loops for a grammar.
+
+        Args:
+            grammar (StdFst): The grammar FST.
+
+        Returns:
+            StdVectorFst: The HCLGa graph.
+        """
+        return self._make_hclga(self._keys(_hash(grammar.to_bytes())),
+                                grammar)
+
+    def make_hclg(self, grammar):
+        """Builds the HCLG decoding graph for a grammar.
+
+        Only the stages whose inputs are not found in the cache directory are
+        computed. Grammars are arc-sorted on input labels before composition
+        with the lexicon if they are not already sorted.
+
+        Args:
+            grammar (StdFst): The grammar FST.
+
+        Returns:
+            StdConstFst or StdVectorFst: The HCLG decoding graph.
+        """
+        keys = self._keys(_hash(grammar.to_bytes()))
+        hclg = self._load("HCLG", keys[3])
+        if hclg is None:
+            hclg = self._make_hclga(keys, grammar)
+            _hmm.add_self_loops(self.trans_model, [], self.self_loop_scale,
+                                self.reorder, True, hclg)
+            self._store("HCLG", keys[3], hclg)
+        if self.const:
+            return _fst.StdConstFst(hclg)
+        return hclg
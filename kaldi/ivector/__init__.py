@@ -3,6 +3,9 @@ from ._ivector_extractor import *
 from ._logistic_regression import *
 from ._plda import *
 from ._agglomerative_clustering import *
+from . import clustering
+from . import extraction
+from . import scoring
 
 __all__ = [name for name in dir()
            if name[0] != '_'
@@ -0,0 +1,132 @@
+#ifndef PYKALDI_IVECTOR_AGGLOMERATIVE_CLUSTERING_EXT_H_
+#define PYKALDI_IVECTOR_AGGLOMERATIVE_CLUSTERING_EXT_H_ 1
+
+#include <algorithm>
+#include <limits>
+#include <numeric>
+#include <vector>
+
+#include "ivector/agglomerative-clustering.h"
+
+namespace kaldi {
+
+struct AhcMergeExt {
+  double cost;
+  int32 index;
+  int32 cluster1;
+  int32 cluster2;
+  bool operator<(const AhcMergeExt &other) const {
+    if (cost != other.cost) return cost < other.cost;
+    return index < other.index;
+  }
+};
+
+inline int32 AhcFindRootExt(std::vector<int32> *parent, int32 i) {
+  while ((*parent)[i] != i) {
+    (*parent)[i] = (*parent)[(*parent)[i]];
+    i = (*parent)[i];
+  }
+  return i;
+}
+
+// Average-linkage agglomerative clustering with the nearest-neighbor chain
+// algorithm. Input clusters are given by their sizes and the sums of the
+// costs between their points, i.e. costs(i, j) for i < j is the sum of the
+// costs of all pairs of points in clusters i and j (only the upper triangle
+// is used). If sizes is empty, all sizes are 1 and costs are pairwise point
+// costs. The merge cost of two clusters is the average cost between their
+// points, as in AgglomerativeClusterer.
+//
+// Since average linkage is reducible, the dendrogram built by the
+// nearest-neighbor chain algorithm in O(n^2) time is the same as the one
+// built by greedy merging. Merges are applied in order of increasing cost
+// while their cost is at most thresh and there are more than min_clust
+// clusters, and output clusters are numbered in the same order as
+// AgglomerativeCluster, hence assignments are the same as those of
+// AgglomerativeCluster up to ties in costs.
+inline void AgglomerativeClusterNnChainExt(
+    const MatrixBase<BaseFloat> &costs, const std::vector<int32> &sizes,
+    BaseFloat thresh, int32 min_clust, std::vector<int32> *assignments) {
+  int32 n = costs.NumRows();
+  KALDI_ASSERT(costs.NumCols() == n);
+  KALDI_ASSERT(sizes.empty() || sizes.size() == static_cast<size_t>(n));
+  std::vector<double> size(n, 1.0);
+  for (size_t i = 0; i < sizes.size(); ++i) size[i] = sizes[i];
+  Matrix<double> sums(n, n, kUndefined);
+  for (int32 i = 0; i < n; ++i) {
+    sums(i, i) = 0.0;
+    for (int32 j = i + 1; j < n; ++j)
+      sums(i, j) = sums(j, i) = costs(i, j);
+  }
+  std::vector<bool> active(n, true);
+  std::vector<int32> chain;
+  std::vector<AhcMergeExt> merges;
+  int32 num_active = n, first = 0;
+  while (num_active > 1) {
+    if (chain.empty()) {
+      while (!active[first]) ++first;
+      chain.push_back(first);
+    }
+    int32 a = chain.back();
+    int32 prev = chain.size() >= 2 ? chain[chain.size() - 2] : -1;
+    // Ties are resolved in favor of the previous element of the chain.
+    int32 b = prev;
+    double best = std::numeric_limits<double>::infinity();
+    if (prev >= 0) best = sums(a, prev) / (size[a] * size[prev]);
+    for (int32 c = 0; c < n; ++c) {
+      if (!active[c] || c == a) continue;
+      double cost = sums(a, c) / (size[a] * size[c]);
+      if (cost < best || b < 0) {
+        best = cost;
+        b = c;
+      }
+    }
+    if (b != prev) {
+      chain.push_back(b);
+      continue;
+    }
+    chain.pop_back();
+    chain.pop_back();
+    AhcMergeExt merge = {best, static_cast<int32>(merges.size()), a, b};
+    merges.push_back(merge);
+    // Merge b into a. Sums of costs are additive for average linkage.
+    for (int32 c = 0; c < n; ++c) {
+      if (!active[c] || c == a || c == b) continue;
+      sums(a, c) += sums(b, c);
+      sums(c, a) = sums(a, c);
+    }
+    size[a] += size[b];
+    active[b] = false;
+    --num_active;
+  }
+  std::stable_sort(merges.begin(), merges.end());
+  std::vector<int32> parent(n), last_merge(n, -1);
+  std::iota(parent.begin(), parent.end(), 0);
+  int32 num_clusters = n;
+  for (size_t k = 0; k < merges.size(); ++k) {
+    if (merges[k].cost > thresh || num_clusters <= min_clust) break;
+    int32 r1 = AhcFindRootExt(&parent, merges[k].cluster1);
+    int32 r2 = AhcFindRootExt(&parent, merges[k].cluster2);
+    parent[r2] = r1;
+    last_merge[r1] = k;
+    --num_clusters;
+  }
+  // Unmerged clusters come first in input order, followed by merged clusters
+  // in the order of their last merge.
+  std::vector<std::pair<int64, int32> > keys;
+  for (int32 i = 0; i < n; ++i) {
+    if (AhcFindRootExt(&parent, i) == i)
+      keys.push_back(std::make_pair(
+          last_merge[i] < 0 ? i : static_cast<int64>(n) + last_merge[i], i));
+  }
+  std::sort(keys.begin(), keys.end());
+  std::vector<int32> label(n);
+  for (size_t k = 0; k < keys.size(); ++k) label[keys[k].second] = k;
+  assignments->resize(n);
+  for (int32 i = 0; i < n; ++i)
+    (*assignments)[i] = label[AhcFindRootExt(&parent, i)];
+}
+
+}  // namespace kaldi
+
+#endif  // PYKALDI_IVECTOR_AGGLOMERATIVE_CLUSTERING_EXT_H_
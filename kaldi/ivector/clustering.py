@@ -0,0 +1,234 @@
+"""Scalable agglomerative clustering.
+
+This module implements average-linkage agglomerative clustering of the kind
+used by the Kaldi program `agglomerative-cluster` for speaker diarization,
+for recordings with many segments. Clusters are built with the
+nearest-neighbor chain algorithm in native code, which takes quadratic time
+instead of the cubic worst case of the priority queue based
+`agglomerative_cluster`. For very large numbers of segments, clustering is
+done in two passes so that pairwise costs are never held in memory at once:
+contiguous subsets of segments are clustered first, then the resulting
+clusters are clustered with costs accumulated over chunks of segment pairs.
+
+Costs can be given as dense matrices or computed on the fly from PLDA scores
+of segment i-vectors with :class:`PldaCosts`.
+"""
+
+from __future__ import division
+
+import math as _math
+
+import numpy as _np
+
+from .. import matrix as _matrix
+from . import _agglomerative_clustering_ext as _ext
+
+
+class DenseCosts(object):
+    """Pairwise costs given by a dense matrix.
+
+    Args:
+        costs (Matrix or numpy.ndarray): The symmetric matrix of pairwise
+            costs of points.
+    """
+    def __init__(self, costs):
+        self.costs = _np.asarray(costs, dtype=_np.float32)
+        if self.costs.ndim != 2 or self.costs.shape[0] != self.costs.shape[1]:
+            raise ValueError("Costs should be a square matrix.")
+
+    @property
+    def num_points(self):
+        """Number of points."""
+        return len(self.costs)
+
+    def block(self, rows, cols):
+        """Returns the costs of pairs of points.
+
+        Args:
+            rows (numpy.ndarray): Point indices of rows.
+            cols (numpy.ndarray): Point indices of columns.
+
+        Returns:
+            numpy.ndarray: The matrix of costs.
+        """
+        return self.costs[_np.ix_(rows, cols)]
+
+
+class PldaCosts(object):
+    """Pairwise costs given by negated PLDA scores.
+
+    Costs are computed in blocks with :meth:`PldaScorer.score_matrix`, hence
+    the full cost matrix is never stored. This matches the Kaldi diarization
+    recipe, which clusters segments with negated PLDA scores as costs.
+
+    Args:
+        scorer (PldaScorer): The PLDA scorer.
+        ivectors (numpy.ndarray): The PLDA-transformed i-vectors of points as
+            rows of a matrix, e.g. the output of
+            :meth:`PldaScorer.transform_ivectors`.
+    """
+    def __init__(self, scorer, ivectors):
+        self.scorer = scorer
+        self.ivectors = _np.asarray(ivectors, dtype=_np.float64)
+
+    @property
+    def num_points(self):
+        """Number of points."""
+        return len(self.ivectors)
+
+    def block(self, rows, cols):
+        """Returns the costs of pairs of points.
+
+        Args:
+            rows (numpy.ndarray): Point indices of rows.
+            cols (numpy.ndarray): Point indices of columns.
+
+        Returns:
+            numpy.ndarray: The matrix of costs.
+        """
+        scores = self.scorer.score_matrix(self.ivectors[rows],
+                                          self.ivectors[cols],
+                                          chunk_size=max(len(rows), 1))
+        return _np.negative(scores, out=scores)
+
+
+def _as_costs(costs):
+    if hasattr(costs, "block"):
+        return costs
+    return DenseCosts(costs)
+
+
+def nn_chain_cluster(costs, thresh, min_clust=1, sizes=None):
+    """Clusters points with average linkage.
+
+    This produces the same clusters, numbered in the same order, as
+    `agglomerative_cluster` (up to ties in costs), but runs in quadratic time
+    with the nearest-neighbor chain algorithm. Clusters are merged while the
+    average cost between their points is at most `thresh` and there are more
+    than `min_clust` clusters.
+
+    If `sizes` is given, inputs are clusters rather than points and `costs`
+    holds the sums of the costs between their points.
+
+    Args:
+        costs (Matrix or numpy.ndarray): The symmetric matrix of pairwise
+            costs. Only the upper triangle is used.
+        thresh (float): The maximum merge cost.
+        min_clust (int): The minimum number of clusters.
+        sizes (List[int]): Number of points in each input cluster.
+
+    Returns:
+        List[int]: The cluster index of each input.
+    """
+    costs = _np.ascontiguousarray(costs, dtype=_np.float32)
+    if not len(costs):
+        return []
+    sizes = [] if sizes is None else [int(s) for s in sizes]
+    return _ext._agglomerative_cluster_nn_chain(_matrix.SubMatrix(costs),
+                                                sizes, thresh, min_clust)
+
+
+def cluster_cost_sums(costs, assignments, num_clusters=None,
+                      chunk_size=4096):
+    """Sums pairwise costs of points over pairs of clusters.
+
+    Costs are computed in blocks of `chunk_size` by `chunk_size` points,
+    which bounds memory use.
+
+    Args:
+        costs (DenseCosts or PldaCosts or numpy.ndarray): The pairwise costs
+            of points. Any object with a `num_points` attribute and a
+            `block` method can be used as well.
+        assignments (List[int]): The cluster index of each point.
+        num_clusters (int): Number of clusters. If ``None``, it is inferred
+            from `assignments`.
+        chunk_size (int): Number of points in each block of costs.
+
+    Returns:
+        numpy.ndarray: The `float64` matrix of sums of costs between points
+        of each pair of clusters.
+    """
+    costs = _as_costs(costs)
+    assignments = _np.asarray(assignments, dtype=_np.int64)
+    if num_clusters is None:
+        num_clusters = int(assignments.max()) + 1 if len(assignments) else 0
+    sums = _np.zeros((num_clusters, num_clusters))
+    # Points are sorted by cluster so that blocks are reduced by slices.
+    order = _np.argsort(assignments, kind="mergesort")
+    n = len(order)
+
+    def segments(points):
+        labels = assignments[points]
+        starts = _np.flatnonzero(_np.r_[True, labels[1:] != labels[:-1]])
+        return labels[starts], starts
+
+    for i in range(0, n, chunk_size):
+        rows = order[i:i + chunk_size]
+        row_labels, row_starts = segments(rows)
+        for j in range(0, n, chunk_size):
+            cols = order[j:j + chunk_size]
+            col_labels, col_starts = segments(cols)
+            block = _np.asarray(costs.block(rows, cols), dtype=_np.float64)
+            block = _np.add.reduceat(block, col_starts, axis=1)
+            block = _np.add.reduceat(block, row_starts, axis=0)
+            sums[_np.ix_(row_labels, col_labels)] += block
+    return sums
+
+
+def scalable_agglomerative_cluster(costs, thresh, min_clust=1,
+                                   first_pass_max_points=1000,
+                                   chunk_size=4096):
+    """Clusters points with average linkage, in two passes if needed.
+
+    If there are at most `first_pass_max_points` points, this is the same
+    as :meth:`nn_chain_cluster`. Otherwise, points are split into contiguous
+    subsets of at most `first_pass_max_points` points, e.g. consecutive
+    segments of a recording, and each subset is clustered separately. To
+    avoid early merges of clusters that would be kept separate by a single
+    pass, first pass clustering stops at `10 * min_clust` clusters in each
+    subset. The first pass clusters are then clustered with average linkage,
+    using the sums of the costs between their points computed in chunks by
+    :meth:`cluster_cost_sums`. This is the two pass clustering scheme of
+    recent versions of the Kaldi program `agglomerative-cluster`.
+
+    Memory use is quadratic in `first_pass_max_points` and in the number of
+    first pass clusters, not in the number of points.
+
+    Args:
+        costs (DenseCosts or PldaCosts or numpy.ndarray): The pairwise costs
+            of points. Any object with a `num_points` attribute and a
+            `block` method can be used as well.
+        thresh (float): The maximum merge cost.
+        min_clust (int): The minimum number of clusters.
+        first_pass_max_points (int): Maximum number of points clustered in a
+            single pass.
+        chunk_size (int): Number of points in each block of costs used for
+            computing second pass costs.
+
+    Returns:
+        List[int]: The cluster index of each point.
+    """
+    costs = _as_costs(costs)
+    n = costs.num_points
+    if n <= first_pass_max_points:
+        points = _np.arange(n)
+        return nn_chain_cluster(costs.block(points, points), thresh,
+                                min_clust)
+    num_subsets = int(_math.ceil(n / first_pass_max_points))
+    subset_size = int(_math.ceil(n / num_subsets))
+    assignments = _np.empty(n, dtype=_np.int64)
+    num_clusters = 0
+    for begin in range(0, n, subset_size):
+        points = _np.arange(begin, min(begin + subset_size, n))
+        labels = nn_chain_cluster(costs.block(points, points), thresh,
+                                  10 * min_clust)
+        assignments[points] = _np.asarray(labels) + num_clusters
+        num_clusters += max(labels) + 1
+    sums = cluster_cost_sums(costs, assignments, num_clusters, chunk_size)
+    sizes = _np.bincount(assignments, minlength=num_clusters)
+    labels = _np.asarray(nn_chain_cluster(sums, thresh, min_clust, sizes))
+    return labels[assignments].tolist()
+
+
+__all__ = ['DenseCosts', 'PldaCosts', 'nn_chain_cluster',
+           'cluster_cost_sums', 'scalable_agglomerative_cluster']
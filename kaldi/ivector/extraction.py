@@ -0,0 +1,299 @@
+"""Batched i-vector extraction.
+
+This module implements the i-vector extraction pipeline of the Kaldi programs
+`gmm-gselect`, `fgmm-global-gselect-to-post` and `ivector-extract`, i.e.
+Gaussian selection with a diagonal UBM, posterior computation with a full
+UBM, accumulation of utterance statistics and i-vector estimation, for
+batches of utterances. The whole pipeline runs in native code for each
+utterance, hence utterances can be processed in parallel by a pool of
+threads.
+"""
+
+from __future__ import division
+
+import collections as _collections
+import logging as _logging
+import multiprocessing as _mp
+from multiprocessing.pool import ThreadPool as _ThreadPool
+
+import numpy as _np
+
+from ._ivector_extractor import IvectorEstimationOptions, IvectorExtractor
+from . import _ivector_extractor_ext as _ext
+
+from .. import gmm as _gmm
+from .. import matrix as _matrix
+from ..matrix import _kaldi_matrix
+from ..util import io as _util_io
+from ..util import table as _util_table
+
+
+def _as_matrix(feats):
+    if isinstance(feats, _kaldi_matrix.MatrixBase):
+        return feats
+    return _matrix.SubMatrix(feats)
+
+
+def gmm_posteriors(feats, dgmm, fgmm=None, num_gselect=20, min_post=0.025):
+    """Computes Gaussian posteriors of feature frames.
+
+    On each frame, the top `num_gselect` Gaussians are selected with the
+    diagonal GMM and their posteriors are computed with the full GMM, or with
+    the diagonal GMM if `fgmm` is ``None``. Posteriors below `min_post` are
+    pruned and the remaining ones are renormalized. This is equivalent to the
+    Kaldi programs `gmm-gselect` followed by `fgmm-global-gselect-to-post`.
+
+    Args:
+        feats (MatrixBase or numpy.ndarray): The input features.
+        dgmm (DiagGmm): The diagonal GMM used for Gaussian selection.
+        fgmm (FullGmm): The full GMM used for computing posteriors.
+        num_gselect (int): Number of Gaussians selected on each frame.
+        min_post (float): Minimum posterior of Gaussians kept on each frame.
+
+    Returns:
+        Tuple[Posterior, float]: Gaussian posteriors and total log-likelihood.
+    """
+    feats = _as_matrix(feats)
+    if fgmm is None:
+        return _ext._diag_gmm_posteriors(dgmm, feats, num_gselect, min_post)
+    return _ext._full_gmm_posteriors(dgmm, fgmm, feats, num_gselect,
+                                     min_post)
+
+
+class BatchIvectorExtractor(object):
+    """Batched i-vector extractor.
+
+    Extracts i-vectors of utterances in parallel on a pool of threads. Each
+    utterance is processed with a single native call, which does not hold the
+    global interpreter lock, hence extraction scales with the number of
+    threads. The i-vector extractor and the UBMs are shared by all threads.
+
+    If Gaussian posteriors are not given for an utterance, they are computed
+    from its features with :meth:`gmm_posteriors` using the diagonal UBM
+    `dgmm` and the full UBM `fgmm`. As in the Kaldi program `ivector-extract`,
+    the prior offset is subtracted from the first dimension of output
+    i-vectors.
+
+    Attributes:
+        num_done (int): Number of utterances processed.
+        num_failed (int): Number of utterances that failed.
+        tot_frames (float): Total (scaled) number of frames processed.
+        tot_objf_change (float): Total change in the objective function if
+            `compute_objf_change == True`.
+
+    Args:
+        extractor (IvectorExtractor): The i-vector extractor.
+        dgmm (DiagGmm): The diagonal UBM used for Gaussian selection.
+        fgmm (FullGmm): The full UBM used for computing posteriors. If
+            ``None``, posteriors are computed with the diagonal UBM.
+        opts (IvectorEstimationOptions): The i-vector estimation options.
+        num_gselect (int): Number of Gaussians selected on each frame.
+        min_post (float): Minimum Gaussian posterior kept on each frame.
+        compute_objf_change (bool): Whether to compute the change in the
+            objective function due to i-vector estimation.
+        num_threads (int): Number of threads. If ``None``, the number of CPUs
+            is used. If 1, utterances are processed in the calling thread.
+        max_pending (int): Maximum number of utterances submitted but not yet
+            returned. This bounds memory use. If ``None``, it is set to twice
+            the number of threads.
+    """
+    def __init__(self, extractor, dgmm=None, fgmm=None, opts=None,
+                 num_gselect=20, min_post=0.025, compute_objf_change=False,
+                 num_threads=None, max_pending=None):
+        self.extractor = extractor
+        self.dgmm = dgmm
+        self.fgmm = fgmm
+        self.opts = opts if opts is not None else IvectorEstimationOptions()
+        self.num_gselect = num_gselect
+        self.min_post = min_post
+        self.compute_objf_change = compute_objf_change
+        self.num_threads = (num_threads if num_threads is not None
+                            else _mp.cpu_count())
+        self.max_pending = (max_pending if max_pending is not None
+                            else 2 * self.num_threads)
+        self.num_done = 0
+        self.num_failed = 0
+        self.tot_frames = 0.0
+        self.tot_objf_change = 0.0
+
+    @classmethod
+    def from_files(cls, extractor_rxfilename, dubm_rxfilename=None,
+                   fubm_rxfilename=None, **kwargs):
+        """Constructs a new batch i-vector extractor from model files.
+
+        Args:
+            extractor_rxfilename (str): Extended filename for reading the
+                i-vector extractor.
+            dubm_rxfilename (str): Extended filename for reading the diagonal
+                UBM.
+            fubm_rxfilename (str): Extended filename for reading the full UBM.
+            **kwargs: Other arguments of :class:`BatchIvectorExtractor`.
+
+        Returns:
+            BatchIvectorExtractor: A new batch i-vector extractor.
+        """
+        extractor = IvectorExtractor()
+        with _util_io.xopen(extractor_rxfilename) as ki:
+            extractor.read(ki.stream(), ki.binary)
+        dgmm = fgmm = None
+        if dubm_rxfilename is not None:
+            dgmm = _gmm.DiagGmm()
+            with _util_io.xopen(dubm_rxfilename) as ki:
+                dgmm.read(ki.stream(), ki.binary)
+        if fubm_rxfilename is not None:
+            fgmm = _gmm.FullGmm()
+            with _util_io.xopen(fubm_rxfilename) as ki:
+                fgmm.read(ki.stream(), ki.binary)
+        return cls(extractor, dgmm, fgmm, **kwargs)
+
+    def _extract(self, key, feats, post=None):
+        """Extracts an i-vector, returning it with frame and objf counts."""
+        try:
+            feats = _as_matrix(feats)
+            if post is not None:
+                outputs = _ext._extract_ivector(
+                    self.extractor, feats, post, self.opts,
+                    self.compute_objf_change)
+            elif self.dgmm is None:
+                raise ValueError("Gaussian posteriors are required if the "
+                                 "diagonal UBM is not given.")
+            elif self.fgmm is None:
+                outputs = _ext._extract_ivector_diag_gmm(
+                    self.extractor, self.dgmm, feats, self.num_gselect,
+                    self.min_post, self.opts, self.compute_objf_change)
+            else:
+                outputs = _ext._extract_ivector_full_gmm(
+                    self.extractor, self.dgmm, self.fgmm, feats,
+                    self.num_gselect, self.min_post, self.opts,
+                    self.compute_objf_change)
+        except (RuntimeError, ValueError) as e:
+            _logging.warning("i-vector extraction failed for {}: {}"
+                             .format(key, e))
+            return key, None, 0.0, 0.0
+        num_frames, objf_change, ivector = outputs
+        return (key, _np.frombuffer(ivector, dtype=_np.float32), num_frames,
+                objf_change)
+
+    def _results(self, utterances):
+        if self.num_threads == 1:
+            for utt in utterances:
+                yield self._extract(*utt)
+            return
+        pool = _ThreadPool(self.num_threads)
+        try:
+            pending = _collections.deque()
+            for utt in utterances:
+                if len(pending) >= self.max_pending:
+                    yield pending.popleft().get()
+                pending.append(pool.apply_async(self._extract, utt))
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def extract(self, feats, post=None):
+        """Extracts the i-vector of an utterance.
+
+        Args:
+            feats (MatrixBase or numpy.ndarray): The input features.
+            post (Posterior): Gaussian posteriors of frames. If ``None``,
+                posteriors are computed with the UBMs.
+
+        Returns:
+            numpy.ndarray: The `float32` i-vector.
+
+        Raises:
+            RuntimeError: If extraction fails.
+        """
+        _, ivector, _, _ = self._extract("utterance", feats, post)
+        if ivector is None:
+            raise RuntimeError("i-vector extraction failed.")
+        return ivector
+
+    def extract_batch(self, utterances):
+        """Extracts i-vectors of a batch of utterances in parallel.
+
+        Args:
+            utterances (Iterable[tuple]): Utterances given as `(key, feats)`
+                or `(key, feats, post)` tuples. Features can be matrices or
+                2-D numpy arrays.
+
+        Yields:
+            Tuple[str, numpy.ndarray]: Utterance key and `float32` i-vector
+            in input order. If extraction fails, a warning is logged and the
+            i-vector is ``None``.
+        """
+        for key, ivector, num_frames, objf_change in self._results(
+                utterances):
+            if ivector is None:
+                self.num_failed += 1
+            else:
+                self.num_done += 1
+                self.tot_frames += num_frames
+                self.tot_objf_change += objf_change
+            yield key, ivector
+
+    def extract_table(self, feats_rspecifier, ivector_wspecifier=None,
+                      posteriors_rspecifier=None):
+        """Extracts i-vectors of a table of utterances in parallel.
+
+        Features are read sequentially in the calling thread. If given,
+        Gaussian posteriors are read from a random access table and
+        utterances without posteriors are skipped with a warning.
+
+        Args:
+            feats_rspecifier (str): Rspecifier for reading features.
+            ivector_wspecifier (str): Wspecifier for writing i-vectors with
+                a :class:`~kaldi.util.table.VectorWriter`. If ``None``,
+                i-vectors are not written.
+            posteriors_rspecifier (str): Rspecifier for reading Gaussian
+                posteriors. If ``None``, posteriors are computed with the
+                UBMs.
+
+        Yields:
+            Tuple[str, numpy.ndarray]: Utterance key and `float32` i-vector
+            in table order. Failed utterances are skipped with a warning.
+        """
+        feats_reader = _util_table.SequentialMatrixReader(feats_rspecifier)
+        post_reader = writer = None
+        if posteriors_rspecifier is not None:
+            post_reader = _util_table.RandomAccessPosteriorReader(
+                posteriors_rspecifier)
+        if ivector_wspecifier is not None:
+            writer = _util_table.VectorWriter(ivector_wspecifier)
+
+        def utterances():
+            for key, feats in feats_reader:
+                if post_reader is None:
+                    yield key, feats
+                elif key in post_reader:
+                    yield key, feats, post_reader[key]
+                else:
+                    _logging.warning("No posteriors for utterance {}"
+                                     .format(key))
+                    self.num_failed += 1
+
+        try:
+            for key, ivector in self.extract_batch(utterances()):
+                if ivector is None:
+                    continue
+                if writer is not None:
+                    writer[key] = ivector
+                yield key, ivector
+        finally:
+            feats_reader.close()
+            if post_reader is not None:
+                post_reader.close()
+            if writer is not None:
+                writer.close()
+        _logging.info("Extracted i-vectors for {} utterances, failed for {}."
+                      .format(self.num_done, self.num_failed))
+        if self.compute_objf_change and self.tot_frames > 0:
+            _logging.info("Average objective function change was {} per "
+                          "frame over {} frames."
+                          .format(self.tot_objf_change / self.tot_frames,
+                                  self.tot_frames))
+
+
+__all__ = ['gmm_posteriors', 'BatchIvectorExtractor']
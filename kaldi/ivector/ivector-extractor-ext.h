@@ -0,0 +1,145 @@
+#ifndef PYKALDI_IVECTOR_IVECTOR_EXTRACTOR_EXT_H_
+#define PYKALDI_IVECTOR_IVECTOR_EXTRACTOR_EXT_H_ 1
+
+#include <algorithm>
+
+#include "gmm/diag-gmm.h"
+#include "gmm/full-gmm.h"
+#include "hmm/posterior.h"
+#include "hmm/posterior-ext.h"
+#include "ivector/ivector-extractor.h"
+
+namespace kaldi {
+
+// Computes Gaussian posteriors of feature frames as in the Kaldi programs
+// gmm-gselect and fgmm-global-gselect-to-post. On each frame, the top
+// num_gselect Gaussians are selected with the diagonal GMM and their
+// posteriors are computed with the full GMM, or with the diagonal GMM if
+// fgmm is NULL. Posteriors below min_post are pruned and the remaining ones
+// are renormalized. Returns the total log-likelihood.
+inline double GmmPosteriorsHelper(const DiagGmm &dgmm, const FullGmm *fgmm,
+                                  const MatrixBase<BaseFloat> &feats,
+                                  int32 num_gselect, BaseFloat min_post,
+                                  Posterior *post) {
+  int32 num_frames = feats.NumRows();
+  num_gselect = std::min(num_gselect, dgmm.NumGauss());
+  post->clear();
+  post->resize(num_frames);
+  double tot_like = 0.0;
+  std::vector<int32> gselect;
+  Vector<BaseFloat> loglikes;
+  for (int32 t = 0; t < num_frames; ++t) {
+    SubVector<BaseFloat> frame(feats, t);
+    dgmm.GaussianSelection(frame, num_gselect, &gselect);
+    if (fgmm != NULL)
+      fgmm->LogLikelihoodsPreselect(frame, gselect, &loglikes);
+    else
+      dgmm.LogLikelihoodsPreselect(frame, gselect, &loglikes);
+    std::vector<std::pair<int32, BaseFloat> > &entry = (*post)[t];
+    tot_like += VectorToPosteriorEntry(loglikes, gselect.size(), min_post,
+                                       &entry);
+    for (size_t i = 0; i < entry.size(); ++i)
+      entry[i].first = gselect[entry[i].first];
+  }
+  return tot_like;
+}
+
+inline PosteriorWrapper DiagGmmPosteriorsExt(
+    const DiagGmm &dgmm, const MatrixBase<BaseFloat> &feats,
+    int32 num_gselect, BaseFloat min_post, double *tot_like) {
+  Posterior post;
+  *tot_like = GmmPosteriorsHelper(dgmm, NULL, feats, num_gselect, min_post,
+                                  &post);
+  return PosteriorWrapper(std::move(post));
+}
+
+inline PosteriorWrapper FullGmmPosteriorsExt(
+    const DiagGmm &dgmm, const FullGmm &fgmm,
+    const MatrixBase<BaseFloat> &feats, int32 num_gselect,
+    BaseFloat min_post, double *tot_like) {
+  Posterior post;
+  *tot_like = GmmPosteriorsHelper(dgmm, &fgmm, feats, num_gselect, min_post,
+                                  &post);
+  return PosteriorWrapper(std::move(post));
+}
+
+// Extracts the i-vector of an utterance as in the Kaldi program
+// ivector-extract. Posteriors are scaled by opts.acoustic_weight and, if
+// their total exceeds opts.max_count > 0, scaled down so that it equals
+// opts.max_count. The prior offset is subtracted from the first dimension of
+// the output i-vector. Outputs the i-vector as packed BaseFloat values along
+// with the (scaled) number of frames and, if compute_objf_change is true, the
+// change in the objective function. Posteriors are modified in place.
+inline void ExtractIvectorHelper(const IvectorExtractor &extractor,
+                                 const MatrixBase<BaseFloat> &feats,
+                                 const IvectorEstimationOptions &opts,
+                                 bool compute_objf_change, Posterior *post,
+                                 double *num_frames, double *objf_change,
+                                 std::string *ivector) {
+  double count = opts.acoustic_weight * TotalPosterior(*post);
+  double max_count_scale = 1.0;
+  if (opts.max_count > 0 && count > opts.max_count) {
+    max_count_scale = opts.max_count / count;
+    count = opts.max_count;
+  }
+  ScalePosterior(opts.acoustic_weight * max_count_scale, post);
+  IvectorExtractorUtteranceStats utt_stats(extractor.NumGauss(),
+                                           extractor.FeatDim(), false);
+  utt_stats.AccStats(feats, *post);
+  Vector<double> mean(extractor.IvectorDim());
+  mean(0) = extractor.PriorOffset();
+  *objf_change = 0.0;
+  if (compute_objf_change) {
+    double old_auxf = extractor.GetAuxf(utt_stats, mean);
+    extractor.GetIvectorDistribution(utt_stats, &mean, NULL);
+    *objf_change = extractor.GetAuxf(utt_stats, mean) - old_auxf;
+  } else {
+    extractor.GetIvectorDistribution(utt_stats, &mean, NULL);
+  }
+  mean(0) -= extractor.PriorOffset();
+  *num_frames = count;
+  Vector<BaseFloat> result(mean);
+  ivector->assign(reinterpret_cast<const char *>(result.Data()),
+                  result.Dim() * sizeof(BaseFloat));
+}
+
+inline void ExtractIvectorExt(const IvectorExtractor &extractor,
+                              const MatrixBase<BaseFloat> &feats,
+                              const PosteriorWrapper &post,
+                              const IvectorEstimationOptions &opts,
+                              bool compute_objf_change, double *num_frames,
+                              double *objf_change, std::string *ivector) {
+  Posterior scaled(post.GetPosteriors());
+  ExtractIvectorHelper(extractor, feats, opts, compute_objf_change, &scaled,
+                       num_frames, objf_change, ivector);
+}
+
+// Computes Gaussian posteriors and extracts the i-vector of an utterance in
+// a single call. See GmmPosteriorsHelper and ExtractIvectorHelper.
+inline void ExtractIvectorDiagGmmExt(
+    const IvectorExtractor &extractor, const DiagGmm &dgmm,
+    const MatrixBase<BaseFloat> &feats, int32 num_gselect,
+    BaseFloat min_post, const IvectorEstimationOptions &opts,
+    bool compute_objf_change, double *num_frames, double *objf_change,
+    std::string *ivector) {
+  Posterior post;
+  GmmPosteriorsHelper(dgmm, NULL, feats, num_gselect, min_post, &post);
+  ExtractIvectorHelper(extractor, feats, opts, compute_objf_change, &post,
+                       num_frames, objf_change, ivector);
+}
+
+inline void ExtractIvectorFullGmmExt(
+    const IvectorExtractor &extractor, const DiagGmm &dgmm,
+    const FullGmm &fgmm, const MatrixBase<BaseFloat> &feats,
+    int32 num_gselect, BaseFloat min_post,
+    const IvectorEstimationOptions &opts, bool compute_objf_change,
+    double *num_frames, double *objf_change, std::string *ivector) {
+  Posterior post;
+  GmmPosteriorsHelper(dgmm, &fgmm, feats, num_gselect, min_post, &post);
+  ExtractIvectorHelper(extractor, feats, opts, compute_objf_change, &post,
+                       num_frames, objf_change, ivector);
+}
+
+}  // namespace kaldi
+
+#endif  // PYKALDI_IVECTOR_IVECTOR_EXTRACTOR_EXT_H_
@@ -0,0 +1,41 @@
+#ifndef PYKALDI_IVECTOR_PLDA_EXT_H_
+#define PYKALDI_IVECTOR_PLDA_EXT_H_ 1
+
+#include <sstream>
+
+#include "ivector/plda.h"
+
+namespace kaldi {
+
+template <typename T>
+void VectorToBytesExt(const VectorBase<T> &v, std::string *result) {
+  result->assign(reinterpret_cast<const char *>(v.Data()),
+                 v.Dim() * sizeof(T));
+}
+
+// Outputs the parameters of a PLDA model, i.e. the mean, the transform (as
+// rows of packed doubles) and the diagonal between-class covariance psi in
+// the transformed space. Parameters are read back from the serialized model
+// since Plda does not provide accessors for them.
+inline void PldaParametersExt(const Plda &plda, std::string *mean,
+                              std::string *transform, std::string *psi) {
+  std::ostringstream os;
+  plda.Write(os, true);
+  std::istringstream is(os.str());
+  Vector<double> mean_v, psi_v;
+  Matrix<double> transform_m;
+  ExpectToken(is, true, "<Plda>");
+  mean_v.Read(is, true);
+  transform_m.Read(is, true);
+  psi_v.Read(is, true);
+  ExpectToken(is, true, "</Plda>");
+  VectorToBytesExt(mean_v, mean);
+  VectorToBytesExt(psi_v, psi);
+  Vector<double> rows(transform_m.NumRows() * transform_m.NumCols());
+  rows.CopyRowsFromMat(transform_m);
+  VectorToBytesExt(rows, transform);
+}
+
+}  // namespace kaldi
+
+#endif  // PYKALDI_IVECTOR_PLDA_EXT_H_
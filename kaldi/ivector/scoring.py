@@ -0,0 +1,176 @@
+"""Batched PLDA scoring.
+
+This module implements vectorized versions of `Plda.transform_ivector` and
+`Plda.log_likelihood_ratio` for scoring many enrollment/test pairs at once,
+e.g. the trial lists of speaker verification tasks. Scores are computed with
+matrix products over chunks of i-vectors, hence memory use is bounded by the
+chunk sizes rather than the number of pairs.
+"""
+
+from __future__ import division
+
+import numpy as _np
+
+from ._plda import PldaConfig
+from . import _plda_ext
+
+
+class PldaScorer(object):
+    """Batched PLDA scorer.
+
+    Scores are log-likelihood ratios of the same-speaker and different-speaker
+    hypotheses, identical to those computed by `Plda.log_likelihood_ratio`.
+    Inputs are PLDA-transformed i-vectors, e.g. the output of
+    :meth:`transform_ivectors`. Each enrollment i-vector can be the average of
+    multiple i-vectors, in which case it should be transformed with the
+    number of averaged i-vectors and scored with the same count.
+
+    For a PLDA model with between-class covariance `psi` in the transformed
+    space, the score of an enrollment i-vector `x` with count `n` and a test
+    i-vector `y` can be written as `c(x) + a(x) . [y * y, y]` where `c(x)`
+    and `a(x)` only depend on the enrollment i-vector. Score matrices are
+    computed as products of the matrices of these terms, which are evaluated
+    by BLAS.
+
+    Args:
+        plda (Plda): The PLDA model.
+        config (PldaConfig): The PLDA configuration used for transforming
+            i-vectors.
+
+    Attributes:
+        mean (numpy.ndarray): The i-vector mean.
+        transform (numpy.ndarray): The PLDA transform.
+        psi (numpy.ndarray): The diagonal of the between-class covariance in
+            the transformed space.
+    """
+    def __init__(self, plda, config=None):
+        self.config = config if config is not None else PldaConfig()
+        mean, transform, psi = _plda_ext._plda_parameters(plda)
+        self.mean = _np.frombuffer(mean, dtype=_np.float64)
+        self.psi = _np.frombuffer(psi, dtype=_np.float64)
+        self.transform = _np.frombuffer(transform, dtype=_np.float64).reshape(
+            len(self.psi), len(self.mean))
+        self._offset = -self.transform.dot(self.mean)
+
+    def transform_ivectors(self, ivectors, num_examples=1):
+        """Transforms i-vectors into the PLDA space.
+
+        This is a vectorized version of `Plda.transform_ivector`.
+
+        Args:
+            ivectors (numpy.ndarray): The i-vectors as rows of a matrix.
+            num_examples (int or numpy.ndarray): Number of i-vectors averaged
+                into each i-vector. Used for length normalization.
+
+        Returns:
+            numpy.ndarray: The transformed `float64` i-vectors.
+        """
+        ivectors = _np.asarray(ivectors, dtype=_np.float64)
+        transformed = ivectors.dot(self.transform.T) + self._offset
+        if self.config.normalize_length:
+            dim = transformed.shape[1]
+            if self.config.simple_length_norm:
+                sq_norms = _np.sum(transformed ** 2, axis=1) / dim
+            else:
+                num_examples = _np.asarray(num_examples, dtype=_np.float64)
+                inv_covar = 1.0 / (self.psi + 1.0 / num_examples[..., None])
+                sq_norms = _np.sum(transformed ** 2 * inv_covar, axis=1) / dim
+            transformed /= _np.sqrt(sq_norms)[:, None]
+        return transformed
+
+    def _enrollment_terms(self, enroll, counts):
+        """Returns the constant and linear terms of enrollment i-vectors."""
+        enroll = _np.asarray(enroll, dtype=_np.float64)
+        counts = _np.broadcast_to(_np.asarray(counts, dtype=_np.float64),
+                                  (len(enroll),))[:, None]
+        psi = self.psi
+        scaled_psi = counts * psi
+        mean = scaled_psi / (scaled_psi + 1.0) * enroll
+        inv_var = 1.0 / (1.0 + psi / (scaled_psi + 1.0))
+        inv_var_without = 1.0 / (psi + 1.0)
+        const = -0.5 * (-_np.sum(_np.log(inv_var), axis=1)
+                        + _np.sum(mean ** 2 * inv_var, axis=1)
+                        - _np.sum(_np.log(psi + 1.0)))
+        linear = _np.hstack((-0.5 * (inv_var - inv_var_without),
+                             mean * inv_var))
+        return const, linear
+
+    @staticmethod
+    def _test_terms(test):
+        test = _np.asarray(test, dtype=_np.float64)
+        return _np.hstack((test ** 2, test))
+
+    def score_matrix(self, enroll, test, enroll_counts=1, chunk_size=4096,
+                     dtype=_np.float32):
+        """Scores all pairs of enrollment and test i-vectors.
+
+        Args:
+            enroll (numpy.ndarray): The transformed enrollment i-vectors as
+                rows of a matrix.
+            test (numpy.ndarray): The transformed test i-vectors as rows of a
+                matrix.
+            enroll_counts (int or numpy.ndarray): Number of i-vectors averaged
+                into each enrollment i-vector.
+            chunk_size (int): Number of enrollment and test i-vectors scored
+                in each matrix product.
+            dtype (numpy.dtype): The data type of the output.
+
+        Returns:
+            numpy.ndarray: The score matrix, with a row for each enrollment
+            i-vector and a column for each test i-vector.
+        """
+        scores = _np.empty((len(enroll), len(test)), dtype=dtype)
+        for i in range(0, len(enroll), chunk_size):
+            counts = enroll_counts
+            if _np.ndim(enroll_counts):
+                counts = enroll_counts[i:i + chunk_size]
+            const, linear = self._enrollment_terms(enroll[i:i + chunk_size],
+                                                   counts)
+            for j in range(0, len(test), chunk_size):
+                terms = self._test_terms(test[j:j + chunk_size])
+                block = linear.dot(terms.T)
+                block += const[:, None]
+                scores[i:i + chunk_size, j:j + chunk_size] = block
+        return scores
+
+    def score_trials(self, enroll, test, enroll_indices, test_indices,
+                     enroll_counts=1, chunk_size=65536, dtype=_np.float32):
+        """Scores a list of trials.
+
+        Args:
+            enroll (numpy.ndarray): The transformed enrollment i-vectors as
+                rows of a matrix.
+            test (numpy.ndarray): The transformed test i-vectors as rows of a
+                matrix.
+            enroll_indices (numpy.ndarray): Enrollment i-vector indices of
+                trials.
+            test_indices (numpy.ndarray): Test i-vector indices of trials.
+            enroll_counts (int or numpy.ndarray): Number of i-vectors averaged
+                into each enrollment i-vector.
+            chunk_size (int): Number of trials scored at once.
+            dtype (numpy.dtype): The data type of the output.
+
+        Returns:
+            numpy.ndarray: The trial scores.
+
+        Raises:
+            ValueError: If index arrays have different lengths.
+        """
+        enroll_indices = _np.asarray(enroll_indices)
+        test_indices = _np.asarray(test_indices)
+        if enroll_indices.shape != test_indices.shape:
+            raise ValueError("Enrollment and test index arrays should have "
+                             "the same length.")
+        # Enrollment terms are computed once for all trials.
+        const, linear = self._enrollment_terms(enroll, enroll_counts)
+        test = _np.asarray(test, dtype=_np.float64)
+        scores = _np.empty(len(enroll_indices), dtype=dtype)
+        for k in range(0, len(enroll_indices), chunk_size):
+            e = enroll_indices[k:k + chunk_size]
+            terms = self._test_terms(test[test_indices[k:k + chunk_size]])
+            scores[k:k + chunk_size] = const[e] + _np.einsum(
+                "ij,ij->i", linear[e], terms)
+        return scores
+
+
+__all__ = ['PldaScorer']
@@ -71,6 +71,8 @@ def search_kws_index(index, keyword, encode_table, n_best=-1, detailed=False):
                                                 encode_table, n_best)
 
 
+from . import index
+
 __all__ = [name for name in dir()
            if name[0] != '_'
            and not name.endswith('Base')]
@@ -0,0 +1,311 @@
+"""Sharded keyword search indices.
+
+This module implements the indexing and search pipeline of the Kaldi keyword
+search recipe (`lattice-to-kws-index`, `kws-index-union` and `kws-search`)
+for large collections of lattices. Utterances are distributed over a number
+of index shards, each of which is the optimized union of the KWS indices of
+its utterances. Indices are built and searched by pools of forked worker
+processes.
+"""
+
+from __future__ import division
+
+import heapq as _heapq
+import logging as _logging
+import multiprocessing as _mp
+
+from .. import fstext as _fst
+from ..fstext import utils as _fst_utils
+from .. import kws as _kws
+from ..lat import functions as _lat_funcs
+from ..util import io as _util_io
+from ..util._parallel import run_tasks as _run_tasks
+from ..util import table as _util_table
+
+
+def _init_index_worker(scale, max_silence_frames, max_states, allow_partial):
+    global _worker_index_args
+    _worker_index_args = (scale, max_silence_frames, max_states,
+                          allow_partial)
+
+
+def _index_task(chunk):
+    """Returns the union of the KWS indices of a chunk of lattices."""
+    scale, max_silence_frames, max_states, allow_partial = _worker_index_args
+    index = _fst.KwsIndexVectorFst()
+    for utterance_id, key, clat in chunk:
+        try:
+            if scale is not None:
+                _fst_utils.scale_compact_lattice(scale, clat)
+            _lat_funcs.top_sort_lattice_if_needed(clat)
+            index.union(_kws.lattice_to_kws_index(
+                clat, utterance_id, max_silence_frames, max_states,
+                allow_partial, destructive=True))
+        except (RuntimeError, ValueError) as e:
+            _logging.warning("Failed to index lattice {}: {}".format(key, e))
+    return index
+
+
+def _optimize_task(index, max_states):
+    """Optimizes a KWS index."""
+    _kws.optimize_kws_index(index, max_states)
+    return index
+
+
+def _init_search_worker(shards, n_best):
+    global _worker_search_args
+    _worker_search_args = shards, n_best
+
+
+def _search_task(shard, keywords):
+    """Searches a batch of keywords in an index shard."""
+    shards, n_best = _worker_search_args
+    index, encode_table = shards[shard]
+    results = []
+    for kwid, keyword in keywords:
+        try:
+            results.append(_kws.search_kws_index(index, keyword, encode_table,
+                                                 n_best))
+        except (RuntimeError, ValueError) as e:
+            _logging.warning("Failed to search keyword {}: {}"
+                             .format(kwid, e))
+            results.append([])
+    return results
+
+
+def _batches(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ShardedKwsIndex(object):
+    """Keyword search index distributed over a number of shards.
+
+    Each shard is a `KwsIndexVectorFst` indexing a disjoint subset of the
+    utterances. Integer utterance ids used in the indices are mapped to
+    utterance keys with the `utterance_ids` dictionary. Searching a keyword
+    searches all shards and merges their hits.
+
+    Args:
+        shards (List[KwsIndexVectorFst]): The index shards.
+        utterance_ids (Dict[str, int]): Mapping from utterance keys to integer
+            utterance ids used in the indices.
+    """
+    def __init__(self, shards, utterance_ids):
+        self.shards = list(shards)
+        self.utterance_ids = dict(utterance_ids)
+        self._utterance_keys = {v: k for k, v in self.utterance_ids.items()}
+        self._encoded = None
+
+    @classmethod
+    def build(cls, lattice_rspecifier, num_shards=1, acoustic_scale=1.0,
+              lm_scale=1.0, max_silence_frames=50, max_states=-1,
+              allow_partial=True, optimize=True, max_states_union=-1,
+              utterance_ids=None, chunk_size=100, num_workers=None,
+              max_pending=None):
+        """Builds a sharded KWS index from a table of lattices.
+
+        Lattices are read sequentially in the calling process and grouped
+        into chunks of `chunk_size` lattices. Worker processes index the
+        lattices of each chunk with :meth:`~kaldi.kws.lattice_to_kws_index`
+        and return the union of their indices. Chunks are assigned to shards
+        in round-robin order. Finally, each shard is optimized with
+        :meth:`~kaldi.kws.optimize_kws_index` in parallel. This follows the
+        Kaldi recipe of running `lattice-to-kws-index` followed by
+        `kws-index-union` on each split of the data.
+
+        Lattices should be word-aligned compact lattices, e.g. the output of
+        `lattice-align-words`. Lattices that fail to be indexed are skipped
+        with a warning.
+
+        Args:
+            lattice_rspecifier (str): Rspecifier for reading compact lattices.
+            num_shards (int): Number of index shards.
+            acoustic_scale (float): Scaling factor for acoustic likelihoods.
+            lm_scale (float): Scaling factor for graph/LM costs.
+            max_silence_frames (int): The duration of the longest silence
+                (epsilon) arcs allowed in the indices. If < 0, all silence
+                arcs are kept.
+            max_states (int): The maximum number of states allowed in the
+                index of a lattice. If <= 0, any number of states is OK.
+            allow_partial (bool): Whether to allow partial output if
+                determinization of a lattice index fails.
+            optimize (bool): Whether to optimize the union of indices in each
+                shard.
+            max_states_union (int): The maximum number of states allowed in
+                optimized shards. If <= 0, any number of states is OK.
+            utterance_ids (Dict[str, int]): Mapping from utterance keys to
+                positive integer utterance ids. If ``None``, utterances are
+                numbered from 1 in table order. Lattices whose keys are not
+                in the mapping are skipped with a warning.
+            chunk_size (int): Number of lattices indexed in each task.
+            num_workers (int): Number of worker processes. If ``None``, the
+                number of CPUs is used. If 1, indices are built in the calling
+                process.
+            max_pending (int): Maximum number of chunks read but not yet
+                indexed. This bounds memory use. If ``None``, it is set to
+                twice the number of workers.
+
+        Returns:
+            ShardedKwsIndex: The index.
+        """
+        if num_workers is None:
+            num_workers = _mp.cpu_count()
+        if max_pending is None:
+            max_pending = 2 * num_workers
+        scale = None
+        if acoustic_scale != 1.0 or lm_scale != 1.0:
+            scale = _fst_utils.lattice_scale(lm_scale, acoustic_scale)
+        initargs = (scale, max_silence_frames, max_states, allow_partial)
+        ids = {} if utterance_ids is None else dict(utterance_ids)
+
+        def lattices(reader):
+            for key, clat in reader:
+                if utterance_ids is None:
+                    ids[key] = len(ids) + 1
+                elif key not in ids:
+                    _logging.warning("No utterance id for lattice {}, "
+                                     "skipping it.".format(key))
+                    continue
+                yield ids[key], key, clat
+
+        shards = [_fst.KwsIndexVectorFst() for _ in range(num_shards)]
+        with _util_table.SequentialCompactLatticeReader(
+                lattice_rspecifier) as reader:
+            chunks = ((chunk,) for chunk in _batches(lattices(reader),
+                                                     chunk_size))
+            results = _run_tasks(_index_task, chunks, num_workers,
+                                 _init_index_worker, initargs, max_pending)
+            for i, index in enumerate(results):
+                shards[i % num_shards].union(index)
+        if optimize:
+            args = ((shard, max_states_union) for shard in shards)
+            shards = list(_run_tasks(_optimize_task, args,
+                                     min(num_workers, num_shards),
+                                     _init_index_worker, initargs,
+                                     num_shards))
+        return cls(shards, ids)
+
+    @classmethod
+    def read(cls, index_rspecifier, utterance_ids_rxfilename):
+        """Reads a sharded KWS index.
+
+        Args:
+            index_rspecifier (str): Rspecifier for reading the index shards.
+            utterance_ids_rxfilename (str): Extended filename for reading the
+                mapping from utterance keys to integer ids. Each line of this
+                file holds an utterance key and its integer id.
+
+        Returns:
+            ShardedKwsIndex: The index.
+        """
+        with _util_table.SequentialKwsIndexFstReader(index_rspecifier) as r:
+            shards = [index for _, index in r]
+        utterance_ids = {}
+        with _util_io.xopen(utterance_ids_rxfilename, "rt") as ki:
+            for line in ki:
+                key, utterance_id = line.split()
+                utterance_ids[key] = int(utterance_id)
+        return cls(shards, utterance_ids)
+
+    def write(self, index_wspecifier, utterance_ids_wxfilename):
+        """Writes the sharded KWS index.
+
+        Shards are written with :class:`~kaldi.util.table.KwsIndexFstWriter`
+        using their indices as keys, so that shards can be searched with the
+        Kaldi program `kws-search` as well.
+
+        Args:
+            index_wspecifier (str): Wspecifier for writing the index shards.
+            utterance_ids_wxfilename (str): Extended filename for writing the
+                mapping from utterance keys to integer ids.
+        """
+        with _util_table.KwsIndexFstWriter(index_wspecifier) as writer:
+            for i, shard in enumerate(self.shards):
+                writer[str(i)] = shard
+        with _util_io.xopen(utterance_ids_wxfilename, "wt") as ko:
+            for key, utterance_id in sorted(self.utterance_ids.items(),
+                                            key=lambda x: x[1]):
+                ko.write("{} {}\n".format(key, utterance_id))
+
+    def _encoded_shards(self):
+        """Returns copies of shards with encoded disambiguation symbols."""
+        if self._encoded is None:
+            self._encoded = []
+            for shard in self.shards:
+                index = _fst.KwsIndexVectorFst(shard)
+                encode_table = _fst.KwsIndexEncodeTable(_fst.ENCODE_LABELS)
+                _kws.encode_kws_disambiguation_symbols(index, encode_table)
+                self._encoded.append((index, encode_table))
+        return self._encoded
+
+    def search(self, keywords, n_best=-1, batch_size=100, num_workers=None,
+               max_pending=None):
+        """Searches keywords in the index.
+
+        Keywords are grouped into batches of `batch_size` keywords and each
+        batch is searched in each shard by a pool of forked worker processes.
+        Shards are shared with workers without copying. Hits of all shards
+        are merged and sorted by score, lower scores being better.
+
+        Args:
+            keywords (Iterable[Tuple[str, StdVectorFst]]): Keyword ids and
+                keyword FSTs, e.g. a `SequentialVectorFstReader`. Keyword
+                FSTs should be acceptors over the word vocabulary of the
+                lattices.
+            n_best (int): Maximum number of hits returned for each keyword.
+                If <= 0, all hits are returned.
+            batch_size (int): Number of keywords searched in each task.
+            num_workers (int): Number of worker processes. If ``None``, the
+                number of CPUs is used. If 1, keywords are searched in the
+                calling process.
+            max_pending (int): Maximum number of tasks submitted but not yet
+                returned. If ``None``, it is set to twice the number of
+                workers.
+
+        Yields:
+            Tuple[str, List[Tuple[str, int, int, float]]]: Keyword id and its
+            hits in input order. Each hit is a tuple of `(utterance_key,
+            begin_frame, end_frame, score)`.
+        """
+        if num_workers is None:
+            num_workers = _mp.cpu_count()
+        if max_pending is None:
+            max_pending = 2 * num_workers
+        num_shards = len(self.shards)
+        initargs = (self._encoded_shards(), n_best)
+        batches = []
+
+        def tasks():
+            for batch in _batches(keywords, batch_size):
+                batches.append([kwid for kwid, _ in batch])
+                for shard in range(num_shards):
+                    yield shard, batch
+
+        results = _run_tasks(_search_task, tasks(), num_workers,
+                             _init_search_worker, initargs,
+                             max(max_pending, num_shards))
+        while True:
+            shard_results = [next(results, None) for _ in range(num_shards)]
+            if not num_shards or shard_results[0] is None:
+                break
+            kwids = batches.pop(0)
+            for i, kwid in enumerate(kwids):
+                hits = [(self._utterance_keys.get(utt, str(utt)), begin, end,
+                         score)
+                        for result in shard_results
+                        for utt, begin, end, score in result[i]]
+                if n_best > 0:
+                    hits = _heapq.nsmallest(n_best, hits, key=lambda x: x[3])
+                else:
+                    hits.sort(key=lambda x: x[3])
+                yield kwid, hits
+
+
+__all__ = ['ShardedKwsIndex']
@@ -1,4 +1,5 @@
 from . import align
+from . import columnar
 from . import functions
 from . import sausages
 
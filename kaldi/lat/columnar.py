@@ -0,0 +1,480 @@
+"""Columnar lattice archives.
+
+A columnar lattice archive stores a collection of compact lattices as a
+directory of flat binary columns, one file per field, which can be memory
+mapped and sliced with `numpy` without parsing. It is a compact alternative to
+Kaldi lattice archives when lattices are read many times, e.g. for building
+indices or computing statistics over a corpus, and when only parts of each
+lattice are needed.
+
+Lattices are stored topologically sorted. Each archive consists of the
+following files:
+
+===================== ==================================== ================
+file                  contents                             element type
+===================== ==================================== ================
+`meta.json`           Format version, quantization step    --
+`keys.txt`            Lattice keys, one per line           --
+`index.bin`           Per lattice counts (see below)       `int64 x 5`
+`num_arcs.bin`        Number of arcs of each state         `int32`
+`time_deltas.bin`     Delta-encoded state times            `int16`
+`dst.bin`             Destination states of arcs           `int32`
+`ilabel.bin`          Input labels of arcs                 `int32`
+`olabel.bin`          Output labels of arcs                `int32`
+`cost.bin`            (graph, acoustic) costs of arcs      `float32 x 2`
+`string_id.bin`       Transition-id string ids of arcs     `int32`
+`final_state.bin`     States with final weights            `int32`
+`final_cost.bin`      (graph, acoustic) final costs        `float32 x 2`
+`final_string_id.bin` Transition-id string ids of finals   `int32`
+`strings.bin`         Concatenated transition-id strings   `int32`
+`string_ends.bin`     End offsets of strings               `int64`
+===================== ==================================== ================
+
+Each row of `index.bin` holds the number of states, arcs and final states,
+the start state and the number of frames of a lattice. Empty lattices, i.e.
+lattices without a start state, are stored as rows with zero states and a
+start state of `NO_STATE_ID`. State and arc columns
+are concatenated across lattices, hence the offsets of a lattice in these
+columns are cumulative sums of the counts in `index.bin`. Arc destinations
+and final states are local to each lattice. The time of the first state of a
+lattice is stored as is, the time of each other state is stored as the
+difference to the time of the previous state.
+
+Transition-id strings of all lattices are stored once in a string table shared
+by the whole archive. Arcs and final weights refer to strings by their index
+in this table. String 0 is the empty string. Since the same transition-id
+sequences occur many times in a lattice, this is typically much smaller than
+storing a string per arc. Readers can skip the string table altogether and
+load only the word-level topology of lattices.
+
+If a quantization step is given, costs are stored as `int32` multiples of the
+step instead of `float32` values, which makes columns more compressible but
+loses precision. Otherwise, converting lattices to and from the archive is
+lossless.
+"""
+
+from __future__ import division
+
+import io as _io
+import json as _json
+import os as _os
+
+import numpy as _np
+
+from . import functions as _lat_funcs
+
+from .. import fstext as _fst
+from ..fstext import properties as _fst_props
+
+
+_VERSION = 1
+
+_META = "meta.json"
+_KEYS = "keys.txt"
+
+# Column names and element types. Cost columns are replaced with int32
+# columns if costs are quantized.
+_COLUMNS = [
+    ("index", _np.int64, 5),
+    ("num_arcs", _np.int32, 1),
+    ("time_deltas", _np.int16, 1),
+    ("dst", _np.int32, 1),
+    ("ilabel", _np.int32, 1),
+    ("olabel", _np.int32, 1),
+    ("cost", _np.float32, 2),
+    ("string_id", _np.int32, 1),
+    ("final_state", _np.int32, 1),
+    ("final_cost", _np.float32, 2),
+    ("final_string_id", _np.int32, 1),
+    ("strings", _np.int32, 1),
+    ("string_ends", _np.int64, 1),
+]
+
+
+def _column_types(quantization):
+    """Returns a dictionary mapping column names to (dtype, width) pairs."""
+    types = {}
+    for name, dtype, width in _COLUMNS:
+        if quantization is not None and name in ("cost", "final_cost"):
+            dtype = _np.int32
+        types[name] = dtype, width
+    return types
+
+
+def _gather_strings(strings, string_ends, ids):
+    """Concatenates strings with given ids.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]: Concatenated strings and their
+        offsets.
+    """
+    ends = string_ends[ids]
+    begins = _np.where(ids > 0, string_ends[_np.maximum(ids - 1, 0)], 0)
+    lengths = ends - begins
+    offsets = _np.zeros(len(ids) + 1, dtype=_np.int64)
+    _np.cumsum(lengths, out=offsets[1:])
+    positions = (_np.arange(offsets[-1], dtype=_np.int64)
+                 + _np.repeat(begins - offsets[:-1], lengths))
+    return strings[positions], offsets
+
+
+class ColumnarLatticeWriter(object):
+    """Writer for columnar lattice archives.
+
+    Lattices are appended to the columns of the archive as they are written.
+    The string table is kept in memory to deduplicate transition-id strings,
+    hence memory use grows with the number of distinct strings rather than
+    the number of lattices.
+
+    Args:
+        path (str): Directory of the archive. It is created if it does not
+            exist. Existing archive files in this directory are overwritten.
+        quantization (float): If provided, costs are stored as integer
+            multiples of this step. Otherwise, costs are stored exactly.
+
+    Raises:
+        ValueError: If quantization step is not positive.
+    """
+    def __init__(self, path, quantization=None):
+        if quantization is not None and not quantization > 0.0:
+            raise ValueError("Quantization step should be positive.")
+        self.path = path
+        self.quantization = quantization
+        if not _os.path.isdir(path):
+            _os.makedirs(path)
+        self._types = _column_types(quantization)
+        self._files = {name: open(_os.path.join(path, name + ".bin"), "wb")
+                       for name in self._types}
+        self._keys = _io.open(_os.path.join(path, _KEYS), "wt",
+                              encoding="utf-8")
+        self._string_ids = {b"": 0}
+        self._num_string_data = 0
+        self._append("string_ends", [0])
+        meta = {"version": _VERSION, "quantization": quantization}
+        with _io.open(_os.path.join(path, _META), "wt",
+                      encoding="utf-8") as f:
+            f.write(_json.dumps(meta))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __setitem__(self, key, clat):
+        self.write(key, clat)
+
+    def _append(self, name, data):
+        dtype, _ = self._types[name]
+        self._files[name].write(
+            _np.ascontiguousarray(data, dtype=dtype).tobytes())
+
+    def _encode_costs(self, costs):
+        costs = _np.asarray(costs, dtype=_np.float32).reshape(-1, 2)
+        if self.quantization is None:
+            return costs
+        if not _np.all(_np.isfinite(costs)):
+            raise ValueError("Cannot quantize infinite costs.")
+        return _np.rint(costs / self.quantization)
+
+    def _encode_strings(self, strings, offsets):
+        """Returns string table ids of strings, adding new strings.
+
+        Strings of each length are deduplicated with `numpy.unique`, hence
+        the string table is searched once for each distinct string.
+        """
+        strings = _np.ascontiguousarray(strings, dtype=_np.int32)
+        offsets = _np.asarray(offsets, dtype=_np.int64)
+        lengths = _np.diff(offsets)
+        ids = _np.zeros(len(lengths), dtype=_np.int32)
+        new_strings = []
+        for length in _np.unique(lengths[lengths > 0]):
+            which = _np.flatnonzero(lengths == length)
+            positions = offsets[which, None] + _np.arange(length)
+            unique, inverse = _np.unique(strings[positions], axis=0,
+                                         return_inverse=True)
+            unique_ids = _np.empty(len(unique), dtype=_np.int32)
+            for j, string in enumerate(unique):
+                key = string.tobytes()
+                string_id = self._string_ids.get(key)
+                if string_id is None:
+                    string_id = len(self._string_ids)
+                    self._string_ids[key] = string_id
+                    new_strings.append(string)
+                unique_ids[j] = string_id
+            ids[which] = unique_ids[inverse.reshape(-1)]
+        if new_strings:
+            ends = _np.cumsum([len(string) for string in new_strings])
+            self._append("strings", _np.concatenate(new_strings))
+            self._append("string_ends", self._num_string_data + ends)
+            self._num_string_data += int(ends[-1])
+        return ids
+
+    def write(self, key, clat):
+        """Appends a compact lattice to the archive.
+
+        If the lattice is not topologically sorted, a topologically sorted
+        copy of it is stored.
+
+        Args:
+            key (str): The lattice key.
+            clat (CompactLatticeVectorFst): The input lattice.
+
+        Raises:
+            ValueError: If the key is not valid or costs cannot be quantized.
+            RuntimeError: If the lattice cannot be topologically sorted.
+        """
+        if not key or key.split() != [key]:
+            raise ValueError("Invalid lattice key: {!r}".format(key))
+        if clat.start() == _fst.NO_STATE_ID:
+            # Lattices without a start state are stored without states.
+            self._append_index(key, [0, 0, 0, _fst.NO_STATE_ID, 0])
+            return
+        if not clat.properties(_fst_props.TOP_SORTED, True):
+            clat = _fst.CompactLatticeVectorFst(clat)
+            _lat_funcs.top_sort_lattice_if_needed(clat)
+        num_frames, times = _lat_funcs.lattice_state_times(clat)
+        arrays = clat.to_arrays()
+        num_states = arrays["num_states"]
+        times = _np.array(times, dtype=_np.int64)
+        deltas = _np.diff(_np.concatenate(([0], times)))
+        if len(deltas) and _np.max(_np.abs(deltas)) > _np.iinfo(_np.int16).max:
+            raise ValueError("State time deltas of lattice {} do not fit in "
+                             "16 bits.".format(key))
+        arc_costs = self._encode_costs(arrays["weight"])
+        final_costs = self._encode_costs(arrays["final_weight"])
+        string_ids = self._encode_strings(arrays["string"],
+                                          arrays["string_offsets"])
+        final_string_ids = self._encode_strings(arrays["final_string"],
+                                                arrays["final_string_offsets"])
+        self._append("num_arcs", _np.bincount(arrays["src"],
+                                              minlength=num_states))
+        self._append("time_deltas", deltas)
+        self._append("dst", arrays["dst"])
+        self._append("ilabel", arrays["ilabel"])
+        self._append("olabel", arrays["olabel"])
+        self._append("cost", arc_costs)
+        self._append("string_id", string_ids)
+        self._append("final_state", arrays["final_state"])
+        self._append("final_cost", final_costs)
+        self._append("final_string_id", final_string_ids)
+        self._append_index(key, [num_states, len(arrays["src"]),
+                                 len(arrays["final_state"]), arrays["start"],
+                                 num_frames])
+
+    def _append_index(self, key, row):
+        """Appends the key and the index row of a lattice and flushes files.
+
+        Index is written last so that readers never see partial lattices.
+        """
+        self._keys.write(key + u"\n")
+        self._append("index", [row])
+        for f in self._files.values():
+            f.flush()
+        self._keys.flush()
+
+    def close(self):
+        """Closes the archive files."""
+        for f in self._files.values():
+            f.close()
+        self._keys.close()
+
+
+class ColumnarLatticeReader(object):
+    """Random access reader for columnar lattice archives.
+
+    Columns are memory mapped, hence opening an archive is cheap and only the
+    parts of columns needed for the lattices that are read are loaded from
+    disk. Lattices can be accessed by key or iterated over in archive order.
+    The reader can be used as a context manager, which closes it on exit.
+
+    Args:
+        path (str): Directory of the archive.
+
+    Raises:
+        IOError: If the archive cannot be opened.
+        ValueError: If the archive format version is not supported.
+    """
+    def __init__(self, path):
+        self.path = path
+        with _io.open(_os.path.join(path, _META), "rt",
+                      encoding="utf-8") as f:
+            meta = _json.load(f)
+        if meta["version"] != _VERSION:
+            raise ValueError("Unsupported columnar lattice archive version: "
+                             "{}".format(meta["version"]))
+        self.quantization = meta["quantization"]
+        self._types = _column_types(self.quantization)
+        self._columns = {name: self._map(name) for name in self._types}
+        index = self._columns["index"]
+        with _io.open(_os.path.join(path, _KEYS), "rt",
+                      encoding="utf-8") as f:
+            keys = [line.rstrip(u"\n") for line in f][:len(index)]
+        self._index = index[:len(keys)]
+        self._keys = {key: i for i, key in enumerate(keys)}
+        self._key_list = keys
+        # Offsets of lattices in state, arc and final columns.
+        offsets = _np.zeros((len(keys) + 1, 3), dtype=_np.int64)
+        _np.cumsum(self._index[:, :3], axis=0, out=offsets[1:])
+        self._offsets = offsets
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes the archive.
+
+        Memory maps of the columns are released when the reader drops its
+        references to them. Arrays and lattices read earlier are copies, hence
+        they remain valid.
+        """
+        self._columns = None
+        self._index = None
+
+    def _get_columns(self):
+        if self._columns is None:
+            raise ValueError("I/O operation on closed archive.")
+        return self._columns
+
+    def _map(self, name):
+        dtype, width = self._types[name]
+        filename = _os.path.join(self.path, name + ".bin")
+        size = _os.path.getsize(filename) // _np.dtype(dtype).itemsize
+        size -= size % width
+        if size == 0:
+            data = _np.zeros(0, dtype=dtype)
+        else:
+            data = _np.memmap(filename, dtype=dtype, mode="r", shape=(size,))
+        return data.reshape(-1, width) if width > 1 else data
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __getitem__(self, key):
+        return self.read(key)
+
+    def __iter__(self):
+        for key in self._key_list:
+            yield key, self.read(key)
+
+    def __len__(self):
+        return len(self._key_list)
+
+    def keys(self):
+        """Returns the lattice keys in archive order.
+
+        Returns:
+            List[str]: The lattice keys.
+        """
+        return list(self._key_list)
+
+    def _decode_costs(self, costs):
+        if self.quantization is None:
+            return _np.array(costs, dtype=_np.float32)
+        return (costs * self.quantization).astype(_np.float32)
+
+    def arrays(self, key, strings=True):
+        """Returns the arrays of a lattice.
+
+        Output is a dictionary in the format returned by
+        `CompactLatticeVectorFst.to_arrays`, extended with the following
+        `(key, value)` pairs:
+
+        ============= ====================================== =================
+        key           value                                  value type
+        ============= ====================================== =================
+        "num_frames"  Number of frames                       `int`
+        "state_times" Times of states                        `int32` array
+        ============= ====================================== =================
+
+        Args:
+            key (str): The lattice key.
+            strings (bool): Whether to load transition-id strings. If
+                ``False``, the string table is not read and the "string",
+                "string_offsets", "final_string" and "final_string_offsets"
+                entries are omitted, i.e. only the word-level topology and
+                the costs of the lattice are returned.
+
+        Returns:
+            A dictionary of arrays.
+
+        Raises:
+            KeyError: If the key is not in the archive.
+        """
+        columns = self._get_columns()
+        i = self._keys[key]
+        num_states, num_arcs, num_finals, start, num_frames = (
+            int(x) for x in self._index[i])
+        s, a, f = (int(x) for x in self._offsets[i])
+        num_arcs_per_state = columns["num_arcs"][s:s + num_states]
+        times = _np.cumsum(columns["time_deltas"][s:s + num_states],
+                           dtype=_np.int32)
+        arrays = {
+            "start": start,
+            "num_states": num_states,
+            "num_frames": num_frames,
+            "state_times": times,
+            "src": _np.repeat(_np.arange(num_states, dtype=_np.int32),
+                              num_arcs_per_state),
+            "dst": _np.array(columns["dst"][a:a + num_arcs]),
+            "ilabel": _np.array(columns["ilabel"][a:a + num_arcs]),
+            "olabel": _np.array(columns["olabel"][a:a + num_arcs]),
+            "weight": self._decode_costs(columns["cost"][a:a + num_arcs]),
+            "final_state": _np.array(columns["final_state"][f:f + num_finals]),
+            "final_weight": self._decode_costs(
+                columns["final_cost"][f:f + num_finals]),
+        }
+        if strings:
+            table = columns["strings"], columns["string_ends"]
+            arrays["string"], arrays["string_offsets"] = _gather_strings(
+                table[0], table[1], columns["string_id"][a:a + num_arcs])
+            (arrays["final_string"],
+             arrays["final_string_offsets"]) = _gather_strings(
+                table[0], table[1],
+                columns["final_string_id"][f:f + num_finals])
+        return arrays
+
+    def read(self, key, strings=True):
+        """Reads a lattice.
+
+        Args:
+            key (str): The lattice key.
+            strings (bool): Whether to load transition-id strings. If
+                ``False``, only the word-level topology and the costs of the
+                lattice are loaded and all weight strings are empty.
+
+        Returns:
+            CompactLatticeVectorFst: The lattice.
+
+        Raises:
+            KeyError: If the key is not in the archive.
+        """
+        arrays = self.arrays(key, strings)
+        del arrays["num_frames"], arrays["state_times"]
+        return _fst.CompactLatticeVectorFst.from_arrays(**arrays)
+
+    def state_times(self, key):
+        """Returns the state times of a lattice.
+
+        Args:
+            key (str): The lattice key.
+
+        Returns:
+            Tuple[int, numpy.ndarray]: The number of frames and the `int32`
+            array of state times.
+
+        Raises:
+            KeyError: If the key is not in the archive.
+        """
+        columns = self._get_columns()
+        i = self._keys[key]
+        num_states, num_frames = int(self._index[i, 0]), int(self._index[i, 4])
+        s = int(self._offsets[i, 0])
+        deltas = columns["time_deltas"][s:s + num_states]
+        return num_frames, _np.cumsum(deltas, dtype=_np.int32)
+
+
+__all__ = ['ColumnarLatticeWriter', 'ColumnarLatticeReader']
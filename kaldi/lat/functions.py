@@ -1,8 +1,11 @@
 import logging
 
+import numpy
+
 from . import _confidence
 from . import _determinize_lattice_pruned as _dlp
 from . import _lattice_functions as _lat_fun
+from . import _lattice_functions_ext as _lat_fun_ext
 
 from ._confidence import *
 from ._compose_lattice_pruned import *
@@ -13,6 +16,9 @@ from ._push_lattice import *
 
 from .. import fstext as _fst
 from ..fstext import _api
+from ..fstext import properties as _fst_props
+from ..fstext import utils as _fst_utils
+from ..util import table as _util_table
 
 
 def sentence_level_confidence(lat):
@@ -201,6 +207,283 @@ def compute_lattice_alphas_and_betas(lat, viterbi):
         return _lat_fun._compute_compact_lattice_alphas_and_betas(lat, viterbi)
 
 
+def lattice_posterior_arrays(lat, viterbi=False):
+    """Computes lattice state times, alphas, betas and arc posteriors.
+
+    This is an array-valued version of :meth:`lattice_state_times` and
+    :meth:`compute_lattice_alphas_and_betas` which also computes the
+    posteriors of lattice arcs and final weights in the same native call.
+    Output is a dictionary with the following `(key, value)` pairs:
+
+    ================== =============================== ==================
+    key                value                           value type
+    ================== =============================== ==================
+    "total_prob"       Total (or best-path) log-prob   `float`
+    "num_frames"       Number of frames                `int`
+    "state_times"      State times                     `int32` array
+    "alphas"           Forward scores                  `float64` array
+    "betas"            Backward scores                 `float64` array
+    "arc_posteriors"   Arc posteriors                  `float64` array
+    "final_posteriors" Final weight posteriors         `float64` array
+    ================== =============================== ==================
+
+    Arc posteriors are listed state by state, in the same order as arcs are
+    listed by :meth:`~kaldi.fstext.CompactLatticeVectorFst.to_arrays`. If the
+    lattice is not topologically sorted, a sorted copy is used and outputs
+    refer to the states of that copy. Use :meth:`top_sort_lattice_if_needed`
+    first to align outputs with the input lattice. If `viterbi == True`,
+    posteriors are ratios of best path probabilities through each arc and
+    the best path probability. Empty lattices have no frames, zero
+    posteriors and a total log-prob of ``-inf``.
+
+    This function assumes that any acoustic scaling you want to apply,
+    has already been applied.
+
+    Args:
+        lat (LatticeVectorFst or CompactLatticeVectorFst): The input lattice.
+        viterbi (bool): Whether to compute Viterbi scores.
+
+    Returns:
+        dict: A dictionary of arrays.
+    """
+    if isinstance(lat, _fst.LatticeVectorFst):
+        outputs = _lat_fun_ext._lattice_posterior_arrays(lat, viterbi)
+    else:
+        outputs = _lat_fun_ext._compact_lattice_posterior_arrays(lat, viterbi)
+    (total_prob, num_frames, times, alphas, betas, arc_posteriors,
+     final_posteriors) = outputs
+    return {
+        "total_prob": total_prob,
+        "num_frames": num_frames,
+        "state_times": numpy.frombuffer(times, dtype=numpy.int32),
+        "alphas": numpy.frombuffer(alphas, dtype=numpy.float64),
+        "betas": numpy.frombuffer(betas, dtype=numpy.float64),
+        "arc_posteriors": numpy.frombuffer(arc_posteriors,
+                                           dtype=numpy.float64),
+        "final_posteriors": numpy.frombuffer(final_posteriors,
+                                             dtype=numpy.float64),
+    }
+
+
+def _frame_posterior_arrays(outputs):
+    frames, labels, posteriors = outputs
+    return (numpy.frombuffer(frames, dtype=numpy.int32),
+            numpy.frombuffer(labels, dtype=numpy.int32),
+            numpy.frombuffer(posteriors, dtype=numpy.float64))
+
+
+def word_frame_posteriors(clat):
+    """Computes frame-level word posteriors of a compact lattice.
+
+    The posterior of a word on a frame is the total posterior of the arcs
+    labeled with that word whose transition-id strings cover that frame.
+    Frames covered by final weight strings are attributed to word 0. The
+    output is a sparse matrix in coordinate format, sorted by frame and word.
+
+    Args:
+        clat (CompactLatticeVectorFst): The input lattice.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: Frame indices,
+        word labels and posteriors.
+    """
+    return _frame_posterior_arrays(_lat_fun_ext._word_frame_posteriors(clat))
+
+
+def phone_frame_posteriors(trans_model, clat):
+    """Computes frame-level phone posteriors of a compact lattice.
+
+    This function is like :meth:`word_frame_posteriors`, but labels are the
+    phones of the transition-ids on each frame.
+
+    Args:
+        trans_model (TransitionModel): The transition model.
+        clat (CompactLatticeVectorFst): The input lattice.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: Frame indices,
+        phone labels and posteriors.
+    """
+    return _frame_posterior_arrays(
+        _lat_fun_ext._phone_frame_posteriors(trans_model, clat))
+
+
+def lattice_posterior_table(lattice_rspecifier, acoustic_scale=1.0,
+                            lm_scale=1.0, viterbi=False, word_posteriors=False,
+                            trans_model=None):
+    """Computes posterior arrays for a table of lattices.
+
+    Reads compact lattices from a table, scales them and yields the outputs
+    of :meth:`lattice_posterior_arrays` for each lattice. Lattices that are
+    not topologically sorted are sorted after reading. Scaling and sorting
+    are done on copies of the lattices read from the table.
+
+    Args:
+        lattice_rspecifier (str): Lattice table rspecifier.
+        acoustic_scale (float): Scaling factor for acoustic likelihoods.
+        lm_scale (float): Scaling factor for graph/LM costs.
+        viterbi (bool): Whether to compute Viterbi scores.
+        word_posteriors (bool): Whether to add frame-level word posteriors to
+            outputs with key "word_posteriors".
+        trans_model (TransitionModel): If provided, frame-level phone
+            posteriors are added to outputs with key "phone_posteriors".
+
+    Yields:
+        Tuple[str, dict]: Utterance key and posterior arrays.
+    """
+    scale = None
+    if acoustic_scale != 1.0 or lm_scale != 1.0:
+        scale = _fst_utils.lattice_scale(lm_scale, acoustic_scale)
+    with _util_table.SequentialCompactLatticeReader(lattice_rspecifier) as r:
+        for key, clat in r:
+            if (scale is not None
+                    or not clat.properties(_fst_props.TOP_SORTED, True)):
+                # Lattices read from the table are not modified.
+                clat = _fst.CompactLatticeVectorFst(clat)
+            if scale is not None:
+                _fst_utils.scale_compact_lattice(scale, clat)
+            if clat.start() != _fst.NO_STATE_ID:
+                top_sort_lattice_if_needed(clat)
+            outputs = lattice_posterior_arrays(clat, viterbi)
+            if word_posteriors:
+                outputs["word_posteriors"] = word_frame_posteriors(clat)
+            if trans_model is not None:
+                outputs["phone_posteriors"] = phone_frame_posteriors(
+                    trans_model, clat)
+            yield key, outputs
+
+
+def compact_lattice_nbest(clat, n=1, word_posteriors=True):
+    """Extracts N-best word sequences with word timings and posteriors.
+
+    Computes the `n` best paths of a compact lattice along with the begin and
+    end frames of each word and, optionally, word posteriors in a single
+    native call. Output is a dictionary with the following `(key, value)`
+    pairs:
+
+    ================= ======================================= ================
+    key               value                                   value type
+    ================= ======================================= ================
+    "costs"           (graph, acoustic) costs of paths        `N x 2` array
+    "offsets"         Offsets of paths in word arrays         `int64` array
+    "words"           Word labels of paths                    `int32` array
+    "begin_frames"    Begin frames of words                   `int32` array
+    "end_frames"      End frames of words (exclusive)         `int32` array
+    "word_posteriors" Posteriors of words                     `float64` array
+    ================= ======================================= ================
+
+    Paths are sorted by total cost. Word arrays hold the words of all paths
+    concatenated; the words of path `i` are `words[offsets[i]:offsets[i+1]]`.
+    The posterior of a word is the total posterior of the lattice arcs with
+    the same word label at the middle frame of the word. It is computed with
+    a single forward-backward pass over the lattice, hence the cost of this
+    function does not grow with the lattice size times `n`.
+
+    This function assumes that any acoustic scaling you want to apply,
+    has already been applied.
+
+    Args:
+        clat (CompactLatticeVectorFst or LatticeVectorFst): The input lattice.
+            State-level lattices are converted to compact lattices.
+        n (int): Number of paths.
+        word_posteriors (bool): Whether to compute word posteriors. If
+            ``False``, "word_posteriors" output is omitted.
+
+    Returns:
+        dict: A dictionary of arrays.
+    """
+    if isinstance(clat, _fst.LatticeVectorFst):
+        clat = _fst_utils.convert_lattice_to_compact_lattice(clat)
+    (lengths, costs, words, begin_frames, end_frames,
+     posteriors) = _lat_fun_ext._compact_lattice_nbest(clat, n,
+                                                       word_posteriors)
+    lengths = numpy.frombuffer(lengths, dtype=numpy.int32)
+    offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+    numpy.cumsum(lengths, out=offsets[1:])
+    outputs = {
+        "costs": numpy.frombuffer(costs, dtype=numpy.float32).reshape(-1, 2),
+        "offsets": offsets,
+        "words": numpy.frombuffer(words, dtype=numpy.int32),
+        "begin_frames": numpy.frombuffer(begin_frames, dtype=numpy.int32),
+        "end_frames": numpy.frombuffer(end_frames, dtype=numpy.int32),
+    }
+    if word_posteriors:
+        outputs["word_posteriors"] = numpy.frombuffer(posteriors,
+                                                      dtype=numpy.float64)
+    return outputs
+
+
+def compact_lattice_nbest_batch(lats, n=1, word_posteriors=True,
+                                acoustic_scale=1.0, lm_scale=1.0):
+    """Extracts N-best word sequences from a batch of lattices.
+
+    This is a batched version of :meth:`compact_lattice_nbest`. Lattices can
+    be given directly or as the output dictionaries of
+    :meth:`kaldi.asr.Recognizer.decode`, in which case the "lattice" entry is
+    used. Outputs of all lattices are concatenated, and the paths of lattice
+    `j` are `lattice_offsets[j]` through `lattice_offsets[j+1] - 1`. Output
+    is a dictionary with the keys of :meth:`compact_lattice_nbest` output
+    along with the following `(key, value)` pair:
+
+    ================= ======================================= ================
+    key               value                                   value type
+    ================= ======================================= ================
+    "lattice_offsets" Offsets of lattices in path arrays      `int64` array
+    ================= ======================================= ================
+
+    Args:
+        lats (Iterable[CompactLatticeVectorFst or dict]): The input lattices
+            or decoding outputs.
+        n (int): Number of paths per lattice.
+        word_posteriors (bool): Whether to compute word posteriors.
+        acoustic_scale (float): Scaling factor for acoustic likelihoods.
+            Input lattices are not modified, scaled copies are used instead.
+        lm_scale (float): Scaling factor for graph/LM costs.
+
+    Returns:
+        dict: A dictionary of arrays.
+
+    Raises:
+        KeyError: If a decoding output does not have a "lattice" entry.
+    """
+    scale = None
+    if acoustic_scale != 1.0 or lm_scale != 1.0:
+        scale = _fst_utils.lattice_scale(lm_scale, acoustic_scale)
+    batch = []
+    for lat in lats:
+        if isinstance(lat, dict):
+            lat = lat["lattice"]
+        if scale is not None:
+            if isinstance(lat, _fst.LatticeVectorFst):
+                lat = _fst.LatticeVectorFst(lat)
+                _fst_utils.scale_lattice(scale, lat)
+            else:
+                lat = _fst.CompactLatticeVectorFst(lat)
+                _fst_utils.scale_compact_lattice(scale, lat)
+        batch.append(compact_lattice_nbest(lat, n, word_posteriors))
+    empty = {
+        "costs": numpy.zeros((0, 2), dtype=numpy.float32),
+        "words": numpy.zeros(0, dtype=numpy.int32),
+        "begin_frames": numpy.zeros(0, dtype=numpy.int32),
+        "end_frames": numpy.zeros(0, dtype=numpy.int32),
+        "lengths": numpy.zeros(0, dtype=numpy.int64),
+    }
+    if word_posteriors:
+        empty["word_posteriors"] = numpy.zeros(0, dtype=numpy.float64)
+    for x in batch:
+        x["lengths"] = numpy.diff(x["offsets"])
+    outputs = {key: numpy.concatenate([value] + [x[key] for x in batch])
+               for key, value in empty.items()}
+    lengths = outputs.pop("lengths")
+    offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+    numpy.cumsum(lengths, out=offsets[1:])
+    lattice_offsets = numpy.zeros(len(batch) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(x["costs"]) for x in batch], out=lattice_offsets[1:])
+    outputs["offsets"] = offsets
+    outputs["lattice_offsets"] = lattice_offsets
+    return outputs
+
+
 def top_sort_lattice_if_needed(lat):
     """Topologically sorts the lattice if it is not already sorted.
 
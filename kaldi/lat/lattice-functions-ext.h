@@ -0,0 +1,266 @@
+#ifndef PYKALDI_LAT_LATTICE_FUNCTIONS_EXT_H_
+#define PYKALDI_LAT_LATTICE_FUNCTIONS_EXT_H_ 1
+
+#include <algorithm>
+#include <limits>
+#include <map>
+#include <memory>
+#include <utility>
+
+#include "fstext/fstext-utils.h"
+#include "hmm/transition-model.h"
+#include "lat/kaldi-lattice.h"
+#include "lat/lattice-functions.h"
+
+namespace kaldi {
+
+template <typename T>
+void VectorToBytesExt(const std::vector<T> &v, std::string *result) {
+  result->assign(reinterpret_cast<const char *>(v.data()),
+                 v.size() * sizeof(T));
+}
+
+inline int32 LatticeStateTimesExt(const Lattice &lat,
+                                  std::vector<int32> *times) {
+  return LatticeStateTimes(lat, times);
+}
+
+inline int32 LatticeStateTimesExt(const CompactLattice &clat,
+                                  std::vector<int32> *times) {
+  return CompactLatticeStateTimes(clat, times);
+}
+
+// Computes state times, alphas, betas and the posteriors of arcs and final
+// weights of a lattice. The lattice is copied to sorted_copy and topologically
+// sorted if it is not already sorted; the returned arrays refer to the states
+// of the sorted lattice. Arc posteriors are listed state by state, in the same
+// order as FstToArraysExt. Lattices without a start state have no frames,
+// zero posteriors and a total log-probability of -infinity. Returns the total
+// log-probability.
+template <class LatticeType>
+double LatticePosteriorsHelper(const LatticeType &ilat, bool viterbi,
+                               int32 *num_frames, std::vector<int32> *times,
+                               std::vector<double> *alpha,
+                               std::vector<double> *beta,
+                               std::vector<double> *arc_posts,
+                               std::vector<double> *final_posts,
+                               std::unique_ptr<LatticeType> *sorted_copy) {
+  typedef typename LatticeType::Arc Arc;
+  typedef typename Arc::StateId StateId;
+  const double kInfinity = std::numeric_limits<double>::infinity();
+  sorted_copy->reset();
+  if (ilat.Start() == fst::kNoStateId) {
+    StateId num_states = ilat.NumStates();
+    *num_frames = 0;
+    times->assign(num_states, -1);
+    alpha->assign(num_states, -kInfinity);
+    beta->assign(num_states, -kInfinity);
+    arc_posts->clear();
+    for (StateId s = 0; s < num_states; ++s)
+      arc_posts->resize(arc_posts->size() + ilat.NumArcs(s), 0.0);
+    final_posts->assign(num_states, 0.0);
+    return -kInfinity;
+  }
+  const LatticeType *lat = &ilat;
+  if (ilat.Properties(fst::kTopSorted, true) == 0) {
+    std::unique_ptr<LatticeType> copy(new LatticeType(ilat));
+    if (!fst::TopSort(copy.get()))
+      KALDI_ERR << "Cannot topologically sort cyclic lattice.";
+    lat = copy.get();
+    *sorted_copy = std::move(copy);
+  }
+  *num_frames = LatticeStateTimesExt(*lat, times);
+  double total_prob = ComputeLatticeAlphasAndBetas(*lat, viterbi, alpha,
+                                                   beta);
+  StateId num_states = lat->NumStates();
+  arc_posts->clear();
+  final_posts->assign(num_states, 0.0);
+  for (StateId s = 0; s < num_states; ++s) {
+    for (fst::ArcIterator<LatticeType> aiter(*lat, s); !aiter.Done();
+         aiter.Next()) {
+      const Arc &arc = aiter.Value();
+      double logp = (*alpha)[s] - ConvertToCost(arc.weight) +
+                    (*beta)[arc.nextstate] - total_prob;
+      arc_posts->push_back(Exp(logp));
+    }
+    double final_cost = ConvertToCost(lat->Final(s));
+    if (final_cost != kInfinity)
+      (*final_posts)[s] = Exp((*alpha)[s] - final_cost - total_prob);
+  }
+  return total_prob;
+}
+
+// Outputs state times, alphas, betas and arc posteriors of a lattice as
+// packed arrays.
+template <class LatticeType>
+double LatticePosteriorArraysExt(const LatticeType &lat, bool viterbi,
+                                 int32 *num_frames, std::string *times,
+                                 std::string *alphas, std::string *betas,
+                                 std::string *arc_posteriors,
+                                 std::string *final_posteriors) {
+  std::vector<int32> times_v;
+  std::vector<double> alpha, beta, arc_posts, final_posts;
+  std::unique_ptr<LatticeType> sorted;
+  double total_prob = LatticePosteriorsHelper(
+      lat, viterbi, num_frames, &times_v, &alpha, &beta, &arc_posts,
+      &final_posts, &sorted);
+  VectorToBytesExt(times_v, times);
+  VectorToBytesExt(alpha, alphas);
+  VectorToBytesExt(beta, betas);
+  VectorToBytesExt(arc_posts, arc_posteriors);
+  VectorToBytesExt(final_posts, final_posteriors);
+  return total_prob;
+}
+
+// Accumulates frame-level posteriors of words (if trans_model is NULL) or
+// phones of a compact lattice. Frames covered by final weight strings are
+// attributed to word 0. Returns the number of frames.
+inline int32 CompactLatticeFramePosteriorMaps(
+    const TransitionModel *trans_model, const CompactLattice &clat,
+    std::vector<std::map<int32, double> > *post) {
+  typedef CompactLatticeArc::StateId StateId;
+  int32 num_frames;
+  std::vector<int32> times;
+  std::vector<double> alpha, beta, arc_posts, final_posts;
+  std::unique_ptr<CompactLattice> sorted;
+  LatticePosteriorsHelper(clat, false, &num_frames, &times, &alpha, &beta,
+                          &arc_posts, &final_posts, &sorted);
+  const CompactLattice *lat = sorted ? sorted.get() : &clat;
+  post->clear();
+  post->resize(num_frames);
+  size_t i = 0;
+  for (StateId s = 0; s < lat->NumStates(); ++s) {
+    int32 t = times[s];
+    if (t < 0) {  // Unreachable state.
+      i += lat->NumArcs(s);
+      continue;
+    }
+    for (fst::ArcIterator<CompactLattice> aiter(*lat, s); !aiter.Done();
+         aiter.Next(), ++i) {
+      const CompactLatticeArc &arc = aiter.Value();
+      const std::vector<int32> &tids = arc.weight.String();
+      for (size_t j = 0; j < tids.size(); ++j) {
+        int32 label = trans_model ? trans_model->TransitionIdToPhone(tids[j])
+                                  : arc.olabel;
+        (*post)[t + j][label] += arc_posts[i];
+      }
+    }
+    const std::vector<int32> &tids = lat->Final(s).String();
+    for (size_t j = 0; j < tids.size(); ++j) {
+      int32 label = trans_model ? trans_model->TransitionIdToPhone(tids[j])
+                                : 0;
+      (*post)[t + j][label] += final_posts[s];
+    }
+  }
+  return num_frames;
+}
+
+// Outputs frame-level posteriors of words or phones of a compact lattice as
+// (frame, label, posterior) triplets sorted by frame and label.
+inline void CompactLatticeFramePosteriorsHelper(
+    const TransitionModel *trans_model, const CompactLattice &clat,
+    std::string *frames, std::string *labels, std::string *posteriors) {
+  std::vector<std::map<int32, double> > post;
+  int32 num_frames = CompactLatticeFramePosteriorMaps(trans_model, clat,
+                                                      &post);
+  std::vector<int32> frames_v, labels_v;
+  std::vector<double> posts_v;
+  for (int32 t = 0; t < num_frames; ++t) {
+    for (std::map<int32, double>::const_iterator it = post[t].begin();
+         it != post[t].end(); ++it) {
+      frames_v.push_back(t);
+      labels_v.push_back(it->first);
+      posts_v.push_back(it->second);
+    }
+  }
+  VectorToBytesExt(frames_v, frames);
+  VectorToBytesExt(labels_v, labels);
+  VectorToBytesExt(posts_v, posteriors);
+}
+
+inline void CompactLatticeWordFramePosteriorsExt(
+    const CompactLattice &clat, std::string *frames, std::string *labels,
+    std::string *posteriors) {
+  CompactLatticeFramePosteriorsHelper(NULL, clat, frames, labels, posteriors);
+}
+
+inline void CompactLatticePhoneFramePosteriorsExt(
+    const TransitionModel &trans_model, const CompactLattice &clat,
+    std::string *frames, std::string *labels, std::string *posteriors) {
+  CompactLatticeFramePosteriorsHelper(&trans_model, clat, frames, labels,
+                                      posteriors);
+}
+
+// Extracts the n best paths of a compact lattice. For each path, outputs the
+// number of words, the (graph, acoustic) cost of the path and, for each word,
+// its label, begin and end frames. If word_posteriors is true, also outputs
+// the posterior of each word, i.e. the total posterior of lattice arcs with
+// the same label at the middle frame of the word. Posteriors are computed
+// with a single forward-backward pass over the lattice regardless of n.
+inline void CompactLatticeNbestExt(
+    const CompactLattice &clat, int32 n, bool word_posteriors,
+    std::string *lengths, std::string *costs, std::string *words,
+    std::string *begin_frames, std::string *end_frames,
+    std::string *posteriors) {
+  typedef CompactLatticeArc::StateId StateId;
+  std::vector<int32> lengths_v, words_v, begins_v, ends_v;
+  std::vector<float> costs_v;
+  std::vector<double> posts_v;
+  std::vector<std::map<int32, double> > post;
+  int32 num_frames = 0;
+  if (word_posteriors)
+    num_frames = CompactLatticeFramePosteriorMaps(NULL, clat, &post);
+  Lattice lat, nbest_lat;
+  ConvertLattice(clat, &lat);
+  fst::ShortestPath(lat, &nbest_lat, n);
+  std::vector<Lattice> nbest_lats;
+  fst::ConvertNbestToVector(nbest_lat, &nbest_lats);
+  for (size_t i = 0; i < nbest_lats.size(); ++i) {
+    CompactLattice path;
+    ConvertLattice(nbest_lats[i], &path);
+    LatticeWeight cost = LatticeWeight::One();
+    int32 num_words = 0, t = 0;
+    StateId s = path.Start();
+    while (s != fst::kNoStateId) {
+      if (path.NumArcs(s) == 0) {
+        cost = fst::Times(cost, path.Final(s).Weight());
+        break;
+      }
+      const CompactLatticeArc &arc =
+          fst::ArcIterator<CompactLattice>(path, s).Value();
+      int32 len = arc.weight.String().size();
+      if (arc.olabel != 0) {
+        words_v.push_back(arc.olabel);
+        begins_v.push_back(t);
+        ends_v.push_back(t + len);
+        if (word_posteriors) {
+          int32 mid = std::min(t + len / 2, num_frames - 1);
+          double p = 0.0;
+          if (mid >= 0) {
+            std::map<int32, double>::const_iterator it =
+                post[mid].find(arc.olabel);
+            if (it != post[mid].end()) p = it->second;
+          }
+          posts_v.push_back(p);
+        }
+        ++num_words;
+      }
+      t += len;
+      cost = fst::Times(cost, arc.weight.Weight());
+      s = arc.nextstate;
+    }
+    lengths_v.push_back(num_words);
+    costs_v.push_back(cost.Value1());
+    costs_v.push_back(cost.Value2());
+  }
+  VectorToBytesExt(lengths_v, lengths);
+  VectorToBytesExt(costs_v, costs);
+  VectorToBytesExt(words_v, words);
+  VectorToBytesExt(begins_v, begin_frames);
+  VectorToBytesExt(ends_v, end_frames);
+  VectorToBytesExt(posts_v, posteriors);
+}
+
+}  // namespace kaldi
+
+#endif  // PYKALDI_LAT_LATTICE_FUNCTIONS_EXT_H_
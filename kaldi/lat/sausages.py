@@ -1,4 +1,154 @@
+import logging as _logging
+import multiprocessing as _mp
+
+import numpy as _np
+
+from . import _sausages
 from ._sausages import *
+from . import functions as _lat_funcs
+
+from .. import fstext as _fst
+from ..fstext import utils as _fst_utils
+from ..util import io as _util_io
+from ..util._parallel import run_tasks as _run_tasks
+from ..util import table as _util_table
+
+
+def _init_mbr_worker(opts, scale, word_ins_penalty, prune_beam):
+    global _worker_mbr_args
+    _worker_mbr_args = opts, scale, word_ins_penalty, prune_beam
+
+
+def _mbr_task(key, clat):
+    """Runs MBR decoding on a single lattice.
+
+    Returns:
+        Tuple[str, dict]: Utterance key and MBR output. Output is ``None`` if
+        decoding fails.
+    """
+    opts, scale, word_ins_penalty, prune_beam = _worker_mbr_args
+    try:
+        if scale is not None:
+            _fst_utils.scale_compact_lattice(scale, clat)
+        if word_ins_penalty != 0.0:
+            _lat_funcs.add_word_ins_pen_to_compact_lattice(word_ins_penalty,
+                                                           clat)
+        if prune_beam is not None:
+            _lat_funcs.top_sort_lattice_if_needed(clat)
+            _lat_funcs.prune_lattice(prune_beam, clat)
+        mbr = _sausages.MinimumBayesRisk(clat, opts)
+        words = _np.array(mbr.get_one_best(), dtype=_np.int32)
+        times = _np.array(mbr.get_one_best_times(),
+                          dtype=_np.float32).reshape(-1, 2)
+        confidences = _np.array(mbr.get_one_best_confidences(),
+                                dtype=_np.float32)
+        bayes_risk = mbr.get_bayes_risk()
+    except (RuntimeError, ValueError) as e:
+        _logging.warning("MBR decoding failed for {}: {}".format(key, e))
+        return key, None
+    return key, {
+        "words": words,
+        "times": times,
+        "confidences": confidences,
+        "bayes_risk": bayes_risk,
+    }
+
+
+def _write_ctm(output, key, out, symbols, frame_shift):
+    """Writes MBR output of an utterance in CTM format."""
+    words = out["words"]
+    if symbols is not None:
+        words = _fst.symbol_table_view(symbols).symbols_array(words)
+    starts = out["times"][:, 0] * frame_shift
+    durations = (out["times"][:, 1] - out["times"][:, 0]) * frame_shift
+    for word, start, duration, conf in zip(words, starts, durations,
+                                           out["confidences"]):
+        output.write("{} 1 {:.2f} {:.2f} {} {:.2f}\n".format(
+            key, start, duration, word, conf))
+
+
+def mbr_decode_table(lattice_rspecifier, opts=None, acoustic_scale=1.0,
+                     lm_scale=1.0, word_ins_penalty=0.0, prune_beam=None,
+                     ctm_wxfilename=None, symbols=None, frame_shift=0.01,
+                     num_workers=None, max_pending=None):
+    """Runs Minimum Bayes Risk decoding on a table of lattices in parallel.
+
+    This is a table-level version of the following loop, similar to the Kaldi
+    program `lattice-mbr-decode`::
+
+        for key, clat in SequentialCompactLatticeReader(lattice_rspecifier):
+            scale_compact_lattice(lattice_scale(lm_scale, acoustic_scale),
+                                  clat)
+            mbr = MinimumBayesRisk(clat, opts)
+            words = mbr.get_one_best()
+            times = mbr.get_one_best_times()
+            confidences = mbr.get_one_best_confidences()
+
+    Lattices are read sequentially in the calling process and decoded by a
+    pool of forked worker processes. Outputs are dictionaries with the
+    following `(key, value)` pairs:
+
+    ============= ======================================= =================
+    key           value                                   value type
+    ============= ======================================= =================
+    "words"       MBR one-best word sequence              `int32` array
+    "times"       Average (begin, end) frames of words    `N x 2` array
+    "confidences" Word confidences                        `float32` array
+    "bayes_risk"  Expected WER over the utterance         `float`
+    ============= ======================================= =================
+
+    Args:
+        lattice_rspecifier (str): Rspecifier for reading compact lattices.
+        opts (MinimumBayesRiskOptions): The MBR options.
+        acoustic_scale (float): Scaling factor for acoustic likelihoods.
+        lm_scale (float): Scaling factor for graph/LM costs.
+        word_ins_penalty (float): Word insertion penalty added to graph costs
+            after scaling.
+        prune_beam (float): If provided, lattices are pruned with this beam
+            after scaling, which bounds the cost of MBR decoding.
+        ctm_wxfilename (str): Extended filename for writing MBR output in CTM
+            format. If ``None``, CTM is not written.
+        symbols (SymbolTable): Word symbol table. If provided, words are
+            written as symbols instead of integer indices to CTM.
+        frame_shift (float): Frame shift in seconds used for CTM times.
+        num_workers (int): Number of worker processes. If ``None``, the number
+            of CPUs is used. If 1, lattices are decoded in the calling process.
+        max_pending (int): Maximum number of lattices read but not yet
+            returned. This bounds memory use. If ``None``, it is set to twice
+            the number of workers.
+
+    Yields:
+        Tuple[str, dict]: Utterance key and MBR output in table order. If
+        decoding fails, a warning is logged and the output is ``None``.
+    """
+    if opts is None:
+        opts = MinimumBayesRiskOptions()
+    if num_workers is None:
+        num_workers = _mp.cpu_count()
+    if max_pending is None:
+        max_pending = 2 * num_workers
+    scale = None
+    if acoustic_scale != 1.0 or lm_scale != 1.0:
+        scale = _fst_utils.lattice_scale(lm_scale, acoustic_scale)
+    initargs = (opts, scale, word_ins_penalty, prune_beam)
+
+    output = None
+    if ctm_wxfilename is not None:
+        output = _util_io.xopen(ctm_wxfilename, "wt")
+    try:
+        with _util_table.SequentialCompactLatticeReader(
+                lattice_rspecifier) as reader:
+            # Options are inherited by forked workers. Lattices are pickled.
+            results = _run_tasks(_mbr_task, reader, num_workers,
+                                 _init_mbr_worker, initargs, max_pending)
+            for key, out in results:
+                if out is not None and output is not None:
+                    _write_ctm(output, key, out, symbols, frame_shift)
+                yield key, out
+    finally:
+        if output is not None:
+            output.close()
+
 
 __all__ = [name for name in dir()
            if name[0] != '_'
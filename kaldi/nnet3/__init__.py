@@ -40,6 +40,8 @@ from ._am_nnet_simple import *
 from ._nnet_am_decodable_simple import *
 from ._decodable_simple_looped import *
 from ._decodable_online_looped import *
+from . import compiler_cache
+from .loglikes import *
 
 ################################################################################
 
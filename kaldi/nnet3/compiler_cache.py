@@ -0,0 +1,177 @@
+"""Persistent caches of compiled nnet3 computations.
+
+Compiling and optimizing nnet3 computations for each combination of chunk size
+and context can take seconds for large networks. This module persists the
+computation cache of a `CachingOptimizingCompiler` on disk, so that processes
+using the same network and options only compile computations they have not
+seen before.
+"""
+
+from __future__ import division
+
+import atexit
+import hashlib
+import logging
+import os
+import tempfile
+import weakref
+
+from ..base import io as _base_io
+
+
+__all__ = ['compiler_cache_key', 'PersistentCompilerCache']
+
+
+def _kaldi_object_bytes(obj):
+    """Returns the binary Kaldi serialization of an object."""
+    ostrm = _base_io.ostringstream()
+    obj.write(ostrm, True)
+    return ostrm.to_bytes()
+
+
+def compiler_cache_key(nnet, optimize_config=None):
+    """Returns a hex digest identifying a network and its compiler options.
+
+    Args:
+        nnet (Nnet): The neural network.
+        optimize_config (NnetOptimizeOptions): The optimization options of
+            the compiler.
+
+    Returns:
+        str: The hex digest.
+    """
+    sha = hashlib.sha1()
+    sha.update(_kaldi_object_bytes(nnet))
+    if optimize_config is not None:
+        sha.update(_kaldi_object_bytes(optimize_config))
+    return sha.hexdigest()
+
+
+# Live caches saved when the interpreter exits.
+_exit_caches = weakref.WeakSet()
+
+
+def _save_caches_at_exit():
+    for cache in list(_exit_caches):
+        cache.save()
+        # Caches collected during interpreter shutdown are not saved again.
+        cache.save_at_exit = False
+    _exit_caches.clear()
+
+
+atexit.register(_save_caches_at_exit)
+
+
+class PersistentCompilerCache(object):
+    """Computation cache of a compiler persisted in a file.
+
+    The cache file is read, if it exists, when this object is constructed and
+    written back with :meth:`save`. By default, it is also saved when this
+    object is garbage collected or when the interpreter exits, whichever comes
+    first. Nothing is written if no new computations were compiled
+    since the cache was last read or written.
+
+    The cache file can be shared between processes. It is written atomically,
+    hence concurrent writers never corrupt it, although computations compiled
+    by only one of them may be lost. Cache files should only be used with the
+    network they were created with, see :meth:`for_nnet`.
+
+    Args:
+        compiler (CachingOptimizingCompiler): The compiler.
+        filename (str): The cache file.
+        save_at_exit (bool): Whether to save the cache when this object is
+            garbage collected or the interpreter exits.
+    """
+    def __init__(self, compiler, filename, save_at_exit=True):
+        self.compiler = compiler
+        self.filename = filename
+        self.save_at_exit = save_at_exit
+        self._saved = None
+        self.load()
+        if save_at_exit:
+            _exit_caches.add(self)
+
+    def __del__(self):
+        if getattr(self, "save_at_exit", False):
+            try:
+                self.save()
+            except Exception:
+                pass
+
+    @classmethod
+    def for_nnet(cls, compiler, nnet, optimize_config, cache_dir,
+                 save_at_exit=True):
+        """Constructs a cache stored in a file keyed by network and options.
+
+        The cache file name includes :meth:`compiler_cache_key` of the network
+        and the optimization options, hence changing either one starts a new
+        cache.
+
+        Args:
+            compiler (CachingOptimizingCompiler): The compiler.
+            nnet (Nnet): The neural network of the compiler.
+            optimize_config (NnetOptimizeOptions): The optimization options
+                of the compiler.
+            cache_dir (str): The directory of the cache file.
+            save_at_exit (bool): Whether to save the cache when it is
+                garbage collected or the interpreter exits.
+
+        Returns:
+            PersistentCompilerCache: A new persistent cache.
+        """
+        key = compiler_cache_key(nnet, optimize_config)
+        filename = os.path.join(cache_dir,
+                                "nnet3-compiler-cache.{}".format(key))
+        return cls(compiler, filename, save_at_exit)
+
+    def load(self):
+        """Reads the cache file into the compiler cache.
+
+        Returns:
+            bool: Whether the cache file was read.
+        """
+        if not os.path.exists(self.filename):
+            return False
+        try:
+            with open(self.filename, "rb") as f:
+                data = f.read()
+            self.compiler.read_cache(_base_io.istringstream.from_str(data),
+                                     True)
+        except (IOError, OSError, RuntimeError) as e:
+            logging.warning("Failed to read compiler cache {}: {}"
+                            .format(self.filename, e))
+            return False
+        self._saved = data
+        logging.info("Read compiler cache {}.".format(self.filename))
+        return True
+
+    def save(self):
+        """Writes the compiler cache to the cache file if it changed.
+
+        Returns:
+            bool: Whether the cache file was written.
+        """
+        ostrm = _base_io.ostringstream()
+        self.compiler.write_cache(ostrm, True)
+        data = ostrm.to_bytes()
+        if data == self._saved:
+            return False
+        cache_dir = os.path.dirname(os.path.abspath(self.filename))
+        tmp = None
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.rename(tmp, self.filename)
+        except (IOError, OSError) as e:
+            logging.warning("Failed to write compiler cache {}: {}"
+                            .format(self.filename, e))
+            return False
+        finally:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+        self._saved = data
+        logging.info("Wrote compiler cache {}.".format(self.filename))
+        return True
@@ -0,0 +1,296 @@
+"""Batch computation of neural network log-likelihoods.
+
+This module computes acoustic log-likelihoods or posteriors of whole
+utterances, as the Kaldi program `nnet3-compute` does, instead of building a
+decodable object for each utterance and reading its frames one at a time. The
+network is evaluated in chunks of frames and each utterance is computed with a
+single native call. All utterances share a caching compiler, hence computations
+are only compiled once for each chunk size and context. The compiled
+computations can also be persisted across processes.
+"""
+
+from __future__ import division
+
+import logging as _logging
+import sys as _sys
+
+from ._am_nnet_simple import AmNnetSimple
+from ._nnet_am_decodable_simple import NnetSimpleComputationOptions
+from . import _nnet_am_decodable_simple_ext as _ext
+from ._nnet_nnet import Nnet
+from ._nnet_optimize import CachingOptimizingCompiler
+from . import _nnet_utils
+from .compiler_cache import PersistentCompilerCache
+
+from .. import hmm as _hmm
+from .. import matrix as _matrix
+from ..matrix import _kaldi_matrix
+from ..matrix import _kaldi_vector
+from ..util import io as _util_io
+from ..util import table as _util_table
+
+# Table rspecifiers can be unicode strings in Python 2.
+if _sys.version_info > (3,):
+    _string_types = (str,)
+else:
+    _string_types = (basestring,)
+
+
+__all__ = ['NnetLoglikeComputer', 'compute_loglikes']
+
+
+def _as_matrix(feats):
+    if feats is None or isinstance(feats, _kaldi_matrix.MatrixBase):
+        return feats
+    return _matrix.SubMatrix(feats)
+
+
+def _as_vector(ivector):
+    if ivector is None or isinstance(ivector, _kaldi_vector.VectorBase):
+        return ivector
+    return _matrix.SubVector(ivector)
+
+
+class NnetLoglikeComputer(object):
+    """Neural network log-likelihood computer.
+
+    Computes log-likelihoods of utterances by subtracting log priors from the
+    network output, or posteriors by exponentiating the network output, e.g.
+    the log-softmax output of a cross-entropy model. Outputs are scaled by
+    `opts.acoustic_scale` before exponentiation, and they are subsampled by
+    `opts.frame_subsampling_factor`.
+
+    The network is put in test mode and collapsed, as done by the neural
+    network recognizers in :mod:`kaldi.asr`.
+
+    Args:
+        model (AmNnetSimple or Nnet): The acoustic model or neural network.
+            Priors are only available with acoustic models.
+        opts (NnetSimpleComputationOptions): Configuration options for simple
+            nnet3 computation. If ``None``, the acoustic scale is 1.0 and the
+            network is evaluated in chunks of 150 frames.
+        posteriors (bool): Whether to compute posteriors instead of
+            log-likelihoods.
+        compiler_cache_dir (str): Directory for persisting compiled
+            computations across processes, see
+            :class:`~kaldi.nnet3.compiler_cache.PersistentCompilerCache`. If
+            ``None``, computations are not persisted.
+
+    Attributes:
+        compiler (CachingOptimizingCompiler): The compiler shared by all
+            computations.
+        compiler_cache (PersistentCompilerCache): The persistent compiler
+            cache or ``None``.
+    """
+    def __init__(self, model, opts=None, posteriors=False,
+                 compiler_cache_dir=None):
+        if isinstance(model, AmNnetSimple):
+            self.nnet = model.get_nnet()
+            priors = model.priors()
+        elif isinstance(model, Nnet):
+            self.nnet = model
+            priors = None
+        else:
+            raise TypeError("model should be an AmNnetSimple or Nnet object")
+        if posteriors or priors is None:
+            priors = _matrix.Vector()
+        self.priors = priors
+        self.posteriors = posteriors
+        if opts is None:
+            opts = NnetSimpleComputationOptions()
+            opts.acoustic_scale = 1.0
+            opts.frames_per_chunk = 150
+        self.opts = opts
+        _nnet_utils.set_batchnorm_test_mode(True, self.nnet)
+        _nnet_utils.set_dropout_test_mode(True, self.nnet)
+        _nnet_utils.collapse_model(_nnet_utils.CollapseModelConfig(),
+                                   self.nnet)
+        self.compiler = CachingOptimizingCompiler.new_with_optimize_opts(
+            self.nnet, self.opts.optimize_config, self.opts.compiler_config)
+        self.compiler_cache = None
+        if compiler_cache_dir is not None:
+            self.compiler_cache = PersistentCompilerCache.for_nnet(
+                self.compiler, self.nnet, self.opts.optimize_config,
+                compiler_cache_dir)
+
+    @classmethod
+    def from_file(cls, model_rxfilename, opts=None, posteriors=False,
+                  compiler_cache_dir=None):
+        """Constructs a new log-likelihood computer from an acoustic model.
+
+        Args:
+            model_rxfilename (str): Extended filename for reading the
+                acoustic model, i.e. a transition model followed by an
+                `AmNnetSimple`.
+            opts (NnetSimpleComputationOptions): Configuration options for
+                simple nnet3 computation.
+            posteriors (bool): Whether to compute posteriors instead of
+                log-likelihoods.
+            compiler_cache_dir (str): Directory for persisting compiled
+                computations across processes.
+
+        Returns:
+            NnetLoglikeComputer: A new log-likelihood computer.
+        """
+        with _util_io.xopen(model_rxfilename) as ki:
+            _hmm.TransitionModel().read(ki.stream(), ki.binary)
+            acoustic_model = AmNnetSimple().read(ki.stream(), ki.binary)
+        return cls(acoustic_model, opts, posteriors, compiler_cache_dir)
+
+    def compute(self, features, ivector=None, online_ivectors=None,
+                online_ivector_period=10):
+        """Computes the output for an utterance.
+
+        Args:
+            features (MatrixBase or numpy.ndarray): Input features.
+            ivector (VectorBase or numpy.ndarray): The i-vector of the
+                utterance.
+            online_ivectors (MatrixBase or numpy.ndarray): Online i-vectors.
+            online_ivector_period (int): Number of frames between online
+                i-vectors.
+
+        Returns:
+            Matrix: The log-likelihoods or posteriors, with a row for each
+            (subsampled) frame.
+
+        Raises:
+            ValueError: If the feature matrix is empty.
+        """
+        features = _as_matrix(features)
+        if features.num_rows == 0:
+            raise ValueError("Empty feature matrix.")
+        return _ext._compute_nnet_output(
+            self.opts, self.nnet, self.priors, features, self.compiler,
+            _as_vector(ivector), _as_matrix(online_ivectors),
+            online_ivector_period, self.posteriors)
+
+    def compute_table(self, features, ivectors=None, online_ivectors=None,
+                      online_ivector_period=10):
+        """Computes outputs for a sequence of utterances.
+
+        Utterances without i-vectors are skipped with a warning, as are those
+        that fail.
+
+        Args:
+            features (str or Iterable[Tuple[str, MatrixBase]]): Rspecifier for
+                reading features, or utterance keys and features.
+            ivectors (str or Dict[str, VectorBase]): Rspecifier for reading
+                utterance i-vectors, or a mapping from utterance keys to
+                i-vectors.
+            online_ivectors (str or Dict[str, MatrixBase]): Rspecifier for
+                reading online i-vectors, or a mapping from utterance keys to
+                online i-vectors.
+            online_ivector_period (int): Number of frames between online
+                i-vectors.
+
+        Yields:
+            Tuple[str, Matrix]: Utterance key and log-likelihoods or
+            posteriors, in input order.
+        """
+        readers = []
+        try:
+            if isinstance(features, _string_types):
+                features = _util_table.SequentialMatrixReader(features)
+                readers.append(features)
+            if isinstance(ivectors, _string_types):
+                ivectors = _util_table.RandomAccessVectorReader(ivectors)
+                readers.append(ivectors)
+            if isinstance(online_ivectors, _string_types):
+                online_ivectors = _util_table.RandomAccessMatrixReader(
+                    online_ivectors)
+                readers.append(online_ivectors)
+            for key, feats in features:
+                ivector = online = None
+                if ivectors is not None:
+                    if key not in ivectors:
+                        _logging.warning("No i-vector for utterance {}"
+                                         .format(key))
+                        continue
+                    ivector = ivectors[key]
+                if online_ivectors is not None:
+                    if key not in online_ivectors:
+                        _logging.warning("No online i-vectors for utterance "
+                                         "{}".format(key))
+                        continue
+                    online = online_ivectors[key]
+                try:
+                    output = self.compute(feats, ivector, online,
+                                          online_ivector_period)
+                except (RuntimeError, ValueError) as e:
+                    _logging.warning("Failed to compute output for utterance "
+                                     "{}: {}".format(key, e))
+                    continue
+                yield key, output
+        finally:
+            for reader in readers:
+                reader.close()
+
+
+def compute_loglikes(model, features, ivectors=None, online_ivectors=None,
+                     online_ivector_period=10, wspecifier=None, opts=None,
+                     posteriors=False, compiler_cache_dir=None):
+    """Computes neural network log-likelihoods or posteriors of utterances.
+
+    This is a convenience wrapper around :class:`NnetLoglikeComputer`. Inputs
+    can be a table of features, in which case i-vectors are given as tables
+    or dictionaries keyed by utterance, or a list of feature matrices, in
+    which case i-vectors are given as lists of the same length.
+
+    Args:
+        model (str or AmNnetSimple or Nnet): The acoustic model, the neural
+            network or an extended filename for reading the acoustic model.
+        features (str or Iterable[Tuple[str, MatrixBase]] or List[MatrixBase]):
+            Rspecifier for reading features, utterance keys and features, or
+            a list of feature matrices (or 2-D numpy arrays).
+        ivectors (str or Dict[str, VectorBase] or List[VectorBase]): Utterance
+            i-vectors.
+        online_ivectors (str or Dict[str, MatrixBase] or List[MatrixBase]):
+            Online i-vectors.
+        online_ivector_period (int): Number of frames between online
+            i-vectors.
+        wspecifier (str): Wspecifier for writing outputs with a
+            :class:`~kaldi.util.table.MatrixWriter`. Only for table inputs.
+        opts (NnetSimpleComputationOptions): Configuration options for simple
+            nnet3 computation. See :class:`NnetLoglikeComputer`.
+        posteriors (bool): Whether to compute posteriors instead of
+            log-likelihoods.
+        compiler_cache_dir (str): Directory for persisting compiled
+            computations across processes.
+
+    Returns:
+        List[numpy.ndarray] or Dict[str, numpy.ndarray] or int: The outputs
+        for a list of feature matrices, the outputs keyed by utterance for
+        table inputs, or the number of outputs written if `wspecifier` is
+        given.
+
+    Raises:
+        ValueError: If `wspecifier` is given for a list of feature matrices.
+    """
+    if isinstance(model, _string_types):
+        computer = NnetLoglikeComputer.from_file(model, opts, posteriors,
+                                                 compiler_cache_dir)
+    else:
+        computer = NnetLoglikeComputer(model, opts, posteriors,
+                                       compiler_cache_dir)
+    if isinstance(features, list) and (
+            not features or not isinstance(features[0], tuple)):
+        if wspecifier is not None:
+            raise ValueError("Outputs can only be written for table inputs.")
+        num_utts = len(features)
+        ivectors = ivectors if ivectors is not None else [None] * num_utts
+        if online_ivectors is None:
+            online_ivectors = [None] * num_utts
+        return [computer.compute(feats, ivector, online,
+                                 online_ivector_period).numpy()
+                for feats, ivector, online
+                in zip(features, ivectors, online_ivectors)]
+    outputs = computer.compute_table(features, ivectors, online_ivectors,
+                                     online_ivector_period)
+    if wspecifier is None:
+        return {key: output.numpy() for key, output in outputs}
+    num_done = 0
+    with _util_table.MatrixWriter(wspecifier) as writer:
+        for key, output in outputs:
+            writer[key] = output
+            num_done += 1
+    return num_done
@@ -0,0 +1,38 @@
+#ifndef PYKALDI_NNET3_NNET_AM_DECODABLE_SIMPLE_EXT_H_
+#define PYKALDI_NNET3_NNET_AM_DECODABLE_SIMPLE_EXT_H_ 1
+
+#include "nnet3/nnet-am-decodable-simple.h"
+
+namespace kaldi {
+namespace nnet3 {
+
+// Computes the output of a neural network for all frames of an utterance as
+// in the Kaldi program nnet3-compute. The network is evaluated in chunks of
+// opts.frames_per_chunk frames with computations compiled by the given
+// caching compiler. If priors is not empty, log priors are subtracted from
+// the output, which is then scaled by opts.acoustic_scale. If apply_exp is
+// true, the output is exponentiated, e.g. to get posteriors from a network
+// with a log-softmax output.
+inline void ComputeNnetOutputExt(const NnetSimpleComputationOptions &opts,
+                                 const Nnet &nnet,
+                                 const VectorBase<BaseFloat> &priors,
+                                 const MatrixBase<BaseFloat> &feats,
+                                 CachingOptimizingCompiler *compiler,
+                                 const VectorBase<BaseFloat> *ivector,
+                                 const MatrixBase<BaseFloat> *online_ivectors,
+                                 int32 online_ivector_period, bool apply_exp,
+                                 Matrix<BaseFloat> *output) {
+  DecodableNnetSimple computer(opts, nnet, priors, feats, compiler, ivector,
+                               online_ivectors, online_ivector_period);
+  output->Resize(computer.NumFrames(), computer.OutputDim(), kUndefined);
+  for (int32 t = 0; t < computer.NumFrames(); ++t) {
+    SubVector<BaseFloat> row(*output, t);
+    computer.GetOutputForFrame(t, &row);
+  }
+  if (apply_exp) output->ApplyExp();
+}
+
+}  // namespace nnet3
+}  // namespace kaldi
+
+#endif  // PYKALDI_NNET3_NNET_AM_DECODABLE_SIMPLE_EXT_H_
@@ -1,6 +1,10 @@
 from __future__ import division, print_function
 
+import logging as _logging
 import math
+import multiprocessing as _mp
+
+import numpy
 
 from . import decoder as _dec
 from . import fstext as _fst
@@ -9,9 +13,12 @@ from . import matrix as _mat
 from .matrix import common as _mat_comm
 from . import nnet3 as _nnet3
 from .util import io as _util_io
+from .util._parallel import run_tasks as _run_tasks
+from .util import table as _util_table
 
 
-__all__ = ['Segmenter', 'NnetSAD', 'SegmentationProcessor']
+__all__ = ['Segmenter', 'NnetSAD', 'NnetOnlineSAD', 'SegmentationProcessor',
+           'segment_table']
 
 
 class Segmenter(object):
@@ -331,11 +338,256 @@ class NnetSAD(Segmenter):
         return compiler.compile()
 
 
+class NnetOnlineSAD(NnetSAD):
+    """Neural network based streaming speech activity detection (SAD).
+
+    This class segments live input with bounded latency. Feature chunks are
+    passed to :meth:`accept_features` as they arrive. The SAD model is run on
+    each new chunk together with the necessary left/right context, the
+    resulting pseudo-likelihoods are appended to the segmentation decoder which
+    is advanced frame by frame, and segments are emitted as soon as they are
+    finalized::
+
+        sad = NnetOnlineSAD(model, transform, graph, lookahead=50)
+
+        sad.init_segmentation()
+        for chunk in chunks:
+            for begin, end, label in sad.accept_features(chunk):
+                ...
+        for begin, end, label in sad.finalize_segmentation():
+            ...
+
+    Frames are finalized when they are at least `lookahead` frames behind the
+    last decoded frame. Labels of finalized frames are taken from the partial
+    best path at that point. To keep memory bounded on long streams, decoding
+    is restarted from the initial state of the SAD graph within finalized
+    non-target (typically silence) regions.
+
+    Segments are reported as `(segment-beg, segment-end, label)` tuples, in
+    terms of SAD model output frames counted from the beginning of the stream.
+    They can be further post-processed with :class:`SegmentationProcessor`.
+
+    Args:
+        model (Nnet): SAD model. Model output should be log-posteriors for
+            [silence, speech, garbage] labels.
+        transform (Matrix): Transformation applied to SAD label posteriors. It
+            should be a 3x2 matrix mapping [silence, speech, garbage] posteriors
+            to [silence, speech] pseudo-likelihoods.
+        graph (StdVectorFst): SAD graph. Silence and speech arcs should be
+            labeled respectively with 1 and 2.
+        beam (float): Logarithmic decoding beam.
+        max_active (int): Maximum number of active states in decoding.
+        decodable_opts (NnetSimpleComputationOptions): Configuration options for
+            the SAD model.
+        target_labels (List[int]): Labels of the segments to emit. Typically
+            the speech labels. If ``None``, defaults to ``[2]``.
+        lookahead (int): Number of model output frames the finalized output
+            lags behind the last decoded frame.
+    """
+    def __init__(self, model, transform, graph, beam=8, max_active=1000,
+                 decodable_opts=None, target_labels=None, lookahead=50):
+        super(NnetOnlineSAD, self).__init__(model, transform, graph, beam,
+                                            max_active, decodable_opts)
+        if lookahead < 0:
+            raise ValueError("lookahead should be non-negative")
+        if target_labels is None:
+            target_labels = [2]
+        self.target_labels = target_labels
+        self.lookahead = lookahead
+        self.left_context, self.right_context = (
+            _nnet3.compute_simple_nnet_context(self.model))
+        self.left_context += self.decodable_opts.extra_left_context
+        self.right_context += self.decodable_opts.extra_right_context
+        self._transform = numpy.array(self.transform, dtype=numpy.float32).T
+        self.init_segmentation()
+
+    def init_segmentation(self):
+        """Initializes segmentation for a new stream."""
+        self._feats = None
+        self._feats_offset = 0      # input frame index of first buffered row
+        self._num_feats = 0         # number of input frames received
+        self._num_computed = 0      # number of output frames computed
+        self._loglikes = None       # loglikes since the session start
+        self._session_offset = 0    # output frame index of session start
+        self._num_committed = 0     # number of finalized output frames
+        self._run_begin, self._run_label = 0, None
+        self._start_session()
+
+    def _start_session(self):
+        """Restarts decoding at the current session offset."""
+        self._decodable = _dec.DecodableMatrixScaledOffset(self.acoustic_scale)
+        self.decoder.init_decoding()
+        if self._loglikes is not None and len(self._loglikes):
+            self._decodable.accept_log_likes(_mat.Matrix(self._loglikes), 0)
+            self.decoder.advance_decoding(self._decodable)
+
+    def _compute_loglikes(self, num_outputs):
+        """Runs the SAD model to compute the next `num_outputs` frames.
+
+        Returns:
+            numpy.ndarray: Pseudo log-likelihoods for the new output frames.
+        """
+        factor = self.decodable_opts.frame_subsampling_factor
+        first = self._num_computed * factor
+        # Left context is rounded up to the subsampling factor so that model
+        # outputs for the window are aligned with the output frames.
+        max_left = -(-self.left_context // factor) * factor
+        left = min(max_left, first)
+        last = min((self._num_computed + num_outputs - 1) * factor
+                   + self.right_context + 1, self._num_feats)
+        window = self._feats[first - left - self._feats_offset:
+                             last - self._feats_offset]
+        nnet_computer = _nnet3.DecodableNnetSimple(
+            self.decodable_opts, self.model, self.priors,
+            _mat.Matrix(window), self.compiler, None, None, 0)
+        post = _mat.Matrix(num_outputs, nnet_computer.output_dim())
+        for t in range(num_outputs):
+            nnet_computer.get_output_for_frame(left // factor + t, post[t])
+        loglikes = numpy.log(numpy.exp(post.numpy()).dot(self._transform))
+        self._num_computed += num_outputs
+        # Drop features that are not needed as left context anymore.
+        keep = max(self._num_computed * factor - max_left, 0)
+        if keep - self._feats_offset > len(self._feats) // 2:
+            self._feats = self._feats[keep - self._feats_offset:].copy()
+            self._feats_offset = keep
+        return loglikes
+
+    def _emit(self, labels, offset):
+        """Emits segments finalized by appending given labels.
+
+        Args:
+            labels (numpy.ndarray): Finalized labels starting at `offset`.
+
+        Returns:
+            List[Tuple[int, int, int]]: Completed target segments.
+        """
+        segments = []
+        if len(labels) == 0:
+            return segments
+        changes = numpy.flatnonzero(labels[1:] != labels[:-1]) + 1
+        begins = numpy.concatenate(([0], changes)) + offset
+        run_labels = labels[begins - offset]
+        for begin, label in zip(begins.tolist(), run_labels.tolist()):
+            if label == self._run_label:
+                continue
+            if self._run_label in self.target_labels:
+                segments.append((self._run_begin, begin, self._run_label))
+            self._run_begin, self._run_label = begin, label
+        return segments
+
+    def _decode(self, num_committed):
+        """Finalizes output frames up to `num_committed`."""
+        try:
+            best_path = self.decoder.get_best_path(use_final_probs=False)
+        except RuntimeError:
+            raise RuntimeError("Empty segmentation output.")
+        ali, _, _ = _fst_utils.get_linear_symbol_sequence(best_path)
+        ali = numpy.asarray(ali, dtype=numpy.int64)
+        begin = self._num_committed - self._session_offset
+        end = num_committed - self._session_offset
+        segments = self._emit(ali[begin:end], self._num_committed)
+        self._num_committed = num_committed
+        return segments
+
+    def accept_features(self, features):
+        """Accepts a chunk of features and emits finalized segments.
+
+        Args:
+            features (Matrix): The next chunk of input features.
+
+        Returns:
+            List[Tuple[int, int, int]]: Segments finalized after processing the
+            chunk. Each entry is a (segment-beg, segment-end, label) tuple.
+        """
+        features = numpy.asarray(features, dtype=numpy.float32)
+        if self._feats is None:
+            self._feats = features.copy()
+        else:
+            self._feats = numpy.concatenate((self._feats, features))
+        self._num_feats += len(features)
+
+        factor = self.decodable_opts.frame_subsampling_factor
+        # Output frame t can be computed once its right context is available.
+        num_ready = max((self._num_feats - self.right_context - 1) // factor
+                        + 1, 0)
+        if num_ready <= self._num_computed:
+            return []
+        loglikes = self._compute_loglikes(num_ready - self._num_computed)
+        if self._loglikes is None:
+            self._loglikes = loglikes
+        else:
+            self._loglikes = numpy.concatenate((self._loglikes, loglikes))
+        discard = (self.decoder.num_frames_decoded()
+                   - self._decodable.first_available_frame())
+        self._decodable.accept_log_likes(_mat.Matrix(loglikes), discard)
+        self.decoder.advance_decoding(self._decodable)
+
+        num_decoded = self._session_offset + self.decoder.num_frames_decoded()
+        num_committed = num_decoded - self.lookahead
+        if num_committed <= self._num_committed:
+            return []
+        segments = self._decode(num_committed)
+
+        # Restart decoding within finalized non-target regions once the
+        # session is long enough. The cost of decoding the lookahead frames
+        # again is amortized over at least as many finalized frames.
+        session_length = num_committed - self._session_offset
+        if (self._run_label not in self.target_labels
+                and session_length >= 2 * max(self.lookahead, 1)):
+            self._loglikes = self._loglikes[session_length:]
+            self._session_offset = num_committed
+            self._start_session()
+        return segments
+
+    def finalize_segmentation(self):
+        """Finalizes segmentation at the end of the stream.
+
+        Returns:
+            List[Tuple[int, int, int]]: Remaining segments.
+
+        Raises:
+            RuntimeError: If segmentation fails.
+        """
+        if self._feats is None:
+            return []
+        factor = self.decodable_opts.frame_subsampling_factor
+        num_outputs = -(-self._num_feats // factor)
+        if num_outputs > self._num_computed:
+            loglikes = self._compute_loglikes(num_outputs - self._num_computed)
+            discard = (self.decoder.num_frames_decoded()
+                       - self._decodable.first_available_frame())
+            self._decodable.accept_log_likes(_mat.Matrix(loglikes), discard)
+        self._decodable.input_is_finished()
+        self.decoder.advance_decoding(self._decodable)
+        if self.decoder.num_frames_decoded() == 0:
+            # Decoding was restarted after the last frame was finalized.
+            ali = numpy.zeros(0, dtype=numpy.int64)
+        else:
+            if not self.decoder.reached_final():
+                raise RuntimeError("No final state was active on the last "
+                                   "frame.")
+            try:
+                best_path = self.decoder.get_best_path()
+            except RuntimeError:
+                raise RuntimeError("Empty segmentation output.")
+            ali, _, _ = _fst_utils.get_linear_symbol_sequence(best_path)
+            ali = numpy.asarray(ali, dtype=numpy.int64)
+        begin = self._num_committed - self._session_offset
+        segments = self._emit(ali[begin:], self._num_committed)
+        end = self._session_offset + len(ali)
+        if self._run_label in self.target_labels:
+            segments.append((self._run_begin, end, self._run_label))
+        self.init_segmentation()
+        return segments
+
+
 class SegmentationProcessor(object):
     """Segmentation post-processor.
 
     This class is used for converting segmentation labels to a list of segments.
     Output includes only those segments labeled with the target labels.
+    Processing is done over NumPy arrays, hence frame-level labels can also be
+    given as a NumPy array.
 
     Post-processing operations include::
         * filtering out short segments
@@ -372,7 +624,11 @@ class SegmentationProcessor(object):
         self.frame_shift = frame_shift
         self.segment_padding = int(segment_padding / frame_shift)
         self.min_segment_dur = int(math.ceil(min_segment_dur / frame_shift))
-        self.max_merged_segment_dur = int(max_merged_segment_dur / frame_shift)
+        if math.isinf(max_merged_segment_dur):
+            self.max_merged_segment_dur = max_merged_segment_dur
+        else:
+            self.max_merged_segment_dur = int(max_merged_segment_dur
+                                              / frame_shift)
         self.stats = self.Stats()
 
     class Stats(object):
@@ -421,7 +677,8 @@ class SegmentationProcessor(object):
         """Converts frame-level segmentation labels to a list of segments.
 
         Args:
-            alignment (List[int]): Frame-level segmentation labels.
+            alignment (List[int] or numpy.ndarray): Frame-level segmentation
+                labels.
 
         Returns:
             Tuple[List[Tuple[int, int, int]], SegmentationProcessor.Stats]: List
@@ -429,12 +686,22 @@ class SegmentationProcessor(object):
             tuple, along with segmentation post-processing stats.
         """
         stats = self.Stats()
-        segments = self.initialize_segments(alignment, stats)
-        segments = self.filter_short_segments(segments, stats)
-        segments = self.pad_segments(segments, stats, len(alignment))
-        segments = self.merge_consecutive_segments(segments, stats)
+        segments = self._initialize_segments(alignment, stats)
+        segments = self._filter_short_segments(segments, stats)
+        segments = self._pad_segments(segments, stats, len(alignment))
+        segments = self._merge_consecutive_segments(segments, stats)
         self.stats.add(stats)
-        return segments, stats
+        return self._as_segment_list(segments), stats
+
+    @staticmethod
+    def _as_segment_array(segments):
+        """Converts a list of segments to an `N x 3` integer array."""
+        return numpy.asarray(segments, dtype=numpy.int64).reshape(-1, 3)
+
+    @staticmethod
+    def _as_segment_list(segments):
+        """Converts an `N x 3` integer array to a list of segments."""
+        return list(map(tuple, segments.tolist()))
 
     def initialize_segments(self, alignment, stats):
         """Initializes segments.
@@ -442,40 +709,13 @@ class SegmentationProcessor(object):
         The alignment is frame-level segmentation labels. Output includes only
         those segments labeled with the target labels.
         """
-        segments = []
-        if not alignment:
-            return segments
-        num_target_frames, seg_begin, seg_label = 0, 0, alignment[0]
-        for i, label in enumerate(alignment[1:], 1):
-            if label != seg_label:
-                if seg_label in self.target_labels:
-                    segments.append((seg_begin, i, seg_label))
-                    num_target_frames += i - seg_begin
-                seg_begin, seg_label = i, label
-        if seg_label in self.target_labels:
-            segments.append((seg_begin, len(alignment), seg_label))
-            num_target_frames += len(alignment) - seg_begin
-        stats.num_segments_initial = len(segments)
-        stats.num_segments_final = len(segments)
-        stats.initial_duration = num_target_frames * self.frame_shift
-        stats.final_duration = stats.initial_duration
-        return segments
+        return self._as_segment_list(
+            self._initialize_segments(alignment, stats))
 
     def filter_short_segments(self, segments, stats):
         """Filters out short segments."""
-        if self.min_segment_dur <= 0:
-            return segments
-        filtered_segments = []
-        for segment in segments:
-            dur = segment[1] - segment[0]
-            if dur < self.min_segment_dur:
-                stats.filter_short_duration += dur * self.frame_shift
-                stats.num_short_segments_filtered += 1
-            else:
-                filtered_segments.append(segment)
-        stats.num_segments_final = len(filtered_segments)
-        stats.final_duration -= stats.filter_short_duration
-        return filtered_segments
+        return self._as_segment_list(
+            self._filter_short_segments(segments, stats))
 
     def pad_segments(self, segments, stats, num_utt_frames=None):
         """Pads segments on both sides.
@@ -483,37 +723,8 @@ class SegmentationProcessor(object):
         Ensures that the segments do not go beyond the neighboring segments or
         utterance boundaries.
         """
-        num_padded_frames, padded_segments = 0, []
-        for i, (seg_beg, seg_end, label) in enumerate(segments):
-            seg_beg -= self.segment_padding  # try padding on the left side
-            num_padded_frames += self.segment_padding
-            if seg_beg < 0:
-                # Padded segment start is before the beginning of the utterance.
-                # Reduce padding.
-                num_padded_frames += seg_beg
-                seg_beg = 0
-            if i >= 1 and prev_seg_end > seg_beg:
-                # Padded segment start is before the end of previous segment.
-                # Reduce padding.
-                num_padded_frames -= prev_seg_end - seg_beg
-                seg_beg = prev_seg_end
-            seg_end += self.segment_padding
-            num_padded_frames += self.segment_padding
-            if num_utt_frames is not None and seg_end > num_utt_frames:
-                # Padded segment end is beyond the max duration.
-                # Reduce padding.
-                num_padded_frames -= seg_end - num_utt_frames
-                seg_end = num_utt_frames
-            if i + 1 < len(segments) and seg_end > segments[i + 1][0]:
-                # Padded segment end is beyond the start of the next segment.
-                # Reduce padding.
-                num_padded_frames -= seg_end - segments[i + 1][0]
-                seg_end = segments[i + 1][0]
-            padded_segments.append((seg_beg, seg_end, label))
-            prev_seg_end = seg_end
-        stats.padding_duration = num_padded_frames * self.frame_shift
-        stats.final_duration += stats.padding_duration
-        return padded_segments
+        return self._as_segment_list(
+            self._pad_segments(segments, stats, num_utt_frames))
 
     def merge_consecutive_segments(self, segments, stats):
         """Merges consecutive segments.
@@ -522,19 +733,100 @@ class SegmentationProcessor(object):
         merged if they have the same label and the merged segment is no longer
         than 'max_merged_segment_dur'.
         """
-        if self.max_merged_segment_dur <= 0 or not segments:
+        return self._as_segment_list(
+            self._merge_consecutive_segments(segments, stats))
+
+    def _initialize_segments(self, alignment, stats):
+        """Finds target label segments by run-length encoding the labels.
+
+        Returns:
+            numpy.ndarray: An `N x 3` array of (segment-beg, segment-end, label)
+            rows.
+        """
+        labels = numpy.asarray(alignment, dtype=numpy.int64).ravel()
+        if labels.size == 0:
+            return self._as_segment_array([])
+        changes = numpy.flatnonzero(labels[1:] != labels[:-1]) + 1
+        begins = numpy.concatenate(([0], changes))
+        ends = numpy.concatenate((changes, [labels.size]))
+        seg_labels = labels[begins]
+        targets = numpy.isin(seg_labels, list(self.target_labels))
+        segments = numpy.stack((begins[targets], ends[targets],
+                                seg_labels[targets]), axis=1)
+        num_target_frames = int((ends[targets] - begins[targets]).sum())
+        stats.num_segments_initial = len(segments)
+        stats.num_segments_final = len(segments)
+        stats.initial_duration = num_target_frames * self.frame_shift
+        stats.final_duration = stats.initial_duration
+        return segments
+
+    def _filter_short_segments(self, segments, stats):
+        """Filters out short segments with a boolean mask."""
+        segments = self._as_segment_array(segments)
+        if self.min_segment_dur <= 0:
             return segments
+        durs = segments[:, 1] - segments[:, 0]
+        short = durs < self.min_segment_dur
+        stats.filter_short_duration += int(durs[short].sum()) * self.frame_shift
+        stats.num_short_segments_filtered += int(short.sum())
+        filtered_segments = segments[~short]
+        stats.num_segments_final = len(filtered_segments)
+        stats.final_duration -= stats.filter_short_duration
+        return filtered_segments
 
-        merged_segments = [segments[0]]
-        for seg_beg, seg_end, label in segments[1:]:
-            prev_seg_beg, prev_seg_end, prev_label = merged_segments[-1]
-            if (seg_beg == prev_seg_end and label == prev_label and
-                seg_end - prev_seg_beg <= self.max_merged_segment_dur):
-                merged_segments[-1] = (prev_seg_beg, seg_end, label)
-                stats.num_merges += 1
-            else:
-                merged_segments.append((seg_beg, seg_end, label))
+    def _pad_segments(self, segments, stats, num_utt_frames=None):
+        """Pads segments with shifted array minimum/maximum."""
+        segments = self._as_segment_array(segments)
+        begins, ends = segments[:, 0], segments[:, 1]
+        # Padded segment ends can not go beyond the start of the next segment
+        # or the end of the utterance.
+        padded_ends = ends + self.segment_padding
+        padded_ends[:-1] = numpy.minimum(padded_ends[:-1], begins[1:])
+        if num_utt_frames is not None:
+            padded_ends = numpy.minimum(padded_ends, num_utt_frames)
+        # Padded segment starts can not go before the beginning of the
+        # utterance or the end of the previous padded segment.
+        padded_begins = numpy.maximum(begins - self.segment_padding, 0)
+        padded_begins[1:] = numpy.maximum(padded_begins[1:], padded_ends[:-1])
+        num_padded_frames = int((begins - padded_begins).sum()
+                                + (padded_ends - ends).sum())
+        stats.padding_duration = num_padded_frames * self.frame_shift
+        stats.final_duration += stats.padding_duration
+        return numpy.stack((padded_begins, padded_ends, segments[:, 2]),
+                           axis=1)
 
+    def _merge_consecutive_segments(self, segments, stats):
+        """Merges runs of touching same-label segments."""
+        segments = self._as_segment_array(segments)
+        if self.max_merged_segment_dur <= 0 or len(segments) == 0:
+            return segments
+
+        begins, ends, labels = segments[:, 0], segments[:, 1], segments[:, 2]
+        # Runs of touching segments with the same label are merge candidates.
+        breaks = numpy.flatnonzero((begins[1:] != ends[:-1]) |
+                                   (labels[1:] != labels[:-1])) + 1
+        run_begins = numpy.concatenate(([0], breaks))
+        run_ends = numpy.concatenate((breaks, [len(segments)]))
+        fits = (ends[run_ends - 1] - begins[run_begins]
+                <= self.max_merged_segment_dur)
+        first = numpy.zeros(len(segments), dtype=bool)
+        first[run_begins[fits]] = True
+        # Runs longer than the maximum merged duration are split greedily.
+        # Each iteration emits one merged segment.
+        for run_beg, run_end in zip(run_begins[~fits], run_ends[~fits]):
+            i = run_beg
+            while i < run_end:
+                first[i] = True
+                limit = begins[i] + self.max_merged_segment_dur
+                j = run_beg + numpy.searchsorted(ends[run_beg:run_end], limit,
+                                                 side="right")
+                i = max(j, i + 1)
+        group_begins = numpy.flatnonzero(first)
+        group_ends = numpy.concatenate((group_begins[1:], [len(segments)])) - 1
+        merged_segments = numpy.stack((begins[group_begins], ends[group_ends],
+                                       labels[group_begins]), axis=1)
+
+        stats.num_merges += len(segments) - len(merged_segments)
         stats.num_segments_final = len(merged_segments)
         return merged_segments
 
@@ -547,3 +839,97 @@ class SegmentationProcessor(object):
                       id=id, key=key, begin=begin * self.frame_shift,
                       end=end * self.frame_shift),
                   file=file_handle)
+
+
+# Per-process segmenter and post-processor used by segment_table workers.
+_worker_sad = None
+_worker_processor = None
+
+
+def _init_segmentation_worker(sad, processor):
+    global _worker_sad, _worker_processor
+    _worker_sad, _worker_processor = sad, processor
+
+
+def _segment_task(key, feats):
+    """Segments a single recording.
+
+    Returns:
+        Tuple[str, List[Tuple[int, int, int]], SegmentationProcessor.Stats]:
+        Recording key, segments and post-processing stats. Segments and stats
+        are ``None`` if segmentation fails.
+    """
+    try:
+        out = _worker_sad.segment(_mat.Matrix(feats))
+    except (RuntimeError, ValueError) as e:
+        _logging.warning("Segmentation failed for {}: {}".format(key, e))
+        return key, None, None
+    segments, stats = _worker_processor.process(out["alignment"])
+    return key, segments, stats
+
+
+def segment_table(sad, processor, feats_rspecifier, segments_wxfilename,
+                  num_workers=None, max_pending=None):
+    """Segments all recordings in a feature table in parallel.
+
+    This is a batch version of the single recording segmentation loop::
+
+        sad = NnetSAD(model, transform, graph, decodable_opts=decodable_opts)
+        seg = SegmentationProcessor(target_labels=[2])
+        segment_table(sad, seg, "scp:data/feats.scp", "data/segments",
+                      num_workers=16)
+        print("global stats:", seg.stats)
+
+    Features are read sequentially in the calling process and segmented by a
+    pool of forked worker processes. Workers share the SAD model and graph of
+    `sad` with the calling process, so they are not serialized or copied
+    upfront. Segments are written in the order recordings appear in the
+    feature table. Post-processing stats of all recordings are added to
+    `processor.stats`.
+
+    Args:
+        sad (Segmenter): The segmenter, e.g. an :class:`NnetSAD` object.
+        processor (SegmentationProcessor): Segmentation post-processor.
+        feats_rspecifier (str): Rspecifier for reading feature matrices.
+        segments_wxfilename (str): Extended filename for writing the Kaldi
+            segments file.
+        num_workers (int): Number of worker processes. If ``None``, the number
+            of CPUs is used. If 1, recordings are segmented in the calling
+            process.
+        max_pending (int): Maximum number of recordings read but not yet
+            written. This bounds memory use. If ``None``, it is set to twice
+            the number of workers.
+
+    Returns:
+        Tuple[int, int]: The number of recordings segmented successfully and
+        the number of recordings with errors.
+    """
+    if num_workers is None:
+        num_workers = _mp.cpu_count()
+    if max_pending is None:
+        max_pending = 2 * num_workers
+
+    def tasks(reader):
+        for key, feats in reader:
+            if num_workers == 1:
+                yield key, feats
+            else:
+                yield key, feats.numpy().copy()
+
+    num_done, num_err = 0, 0
+    with _util_table.SequentialMatrixReader(feats_rspecifier) as reader, \
+         _util_io.xopen(segments_wxfilename, "wt") as output:
+        # Workers are forked so that they inherit the model and the graph.
+        results = _run_tasks(_segment_task, tasks(reader), num_workers,
+                             _init_segmentation_worker, (sad, processor),
+                             max_pending)
+        for key, segments, stats in results:
+            if segments is None:
+                num_err += 1
+                continue
+            if num_workers != 1:
+                # Worker processes accumulate stats into their own copies.
+                processor.stats.add(stats)
+            processor.write(key, segments, output)
+            num_done += 1
+    return num_done, num_err
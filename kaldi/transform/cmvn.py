@@ -1,8 +1,17 @@
+import itertools
+import logging
+import multiprocessing
+
+import numpy
+
 from . import _cmvn
+from ..feat import functions as _feat_funcs
 from .. import matrix
 from ..matrix import _kaldi_matrix
 from ..matrix import _kaldi_vector
 from ..util import io
+from ..util._parallel import run_tasks as _run_tasks
+from ..util import table as _table
 
 class Cmvn(object):
     """Cepstral mean variance normalization (CMVN).
@@ -140,4 +149,349 @@ class Cmvn(object):
             self.stats.write(ko.stream(), binary)
 
 
-__all__ = ['Cmvn']
+
+class SlidingWindowCmvn(object):
+    """Sliding-window cepstral mean and variance normalization.
+
+    This class computes the same normalization as
+    :func:`kaldi.feat.functions.sliding_window_cmn`, but it keeps running sums
+    of the features and their squares instead of recomputing window statistics
+    for each frame. Hence, the cost of normalizing a frame does not depend on
+    the window length. Features can be normalized all at once with
+    :meth:`apply` or incrementally with :meth:`accept_chunk` and
+    :meth:`finalize`::
+
+        opts = SlidingWindowCmnOptions()
+        opts.center = True
+        swcmvn = SlidingWindowCmvn(opts)
+
+        for chunk in chunks:
+            output = swcmvn.accept_chunk(chunk)  # frames that are ready
+            ...
+        output = swcmvn.finalize()               # remaining frames
+        swcmvn.reset()                           # before the next utterance
+
+    In streaming mode, a frame is output as soon as all frames in its window
+    are available. Non-centered windows need `min_window` frames before the
+    first frame is output, centered windows need `cmn_window // 2` frames of
+    lookahead.
+
+    Args:
+        opts (SlidingWindowCmnOptions): Configuration options. If ``None``,
+            default options are used.
+    """
+    def __init__(self, opts=None):
+        if opts:
+            if not isinstance(opts, _feat_funcs.SlidingWindowCmnOptions):
+                raise TypeError("opts should be either None or a "
+                                "SlidingWindowCmnOptions object")
+            opts.check()
+            self.opts = opts
+        else:
+            self.opts = _feat_funcs.SlidingWindowCmnOptions()
+        self.reset()
+
+    def _window_bounds(self, frames, num_frames=None):
+        """Computes normalization window boundaries for given frames.
+
+        Window boundaries are computed exactly as they are computed in Kaldi.
+        If `num_frames` is ``None``, windows are not clipped at the end.
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: Window begin and end (one past
+            the last frame in the window) indices.
+        """
+        cmn_window = self.opts.cmn_window
+        if self.opts.center:
+            begin = frames - cmn_window // 2
+            end = begin + cmn_window
+        else:
+            begin = frames - cmn_window
+            end = frames + 1
+        # Shift windows starting before the first frame to the right.
+        end = numpy.where(begin < 0, end - begin, end)
+        begin = numpy.maximum(begin, 0)
+        if not self.opts.center:
+            end = numpy.maximum(frames + 1, self.opts.min_window)
+        if num_frames is not None:
+            # Shift windows ending after the last frame to the left.
+            overflow = numpy.maximum(end - num_frames, 0)
+            begin = numpy.maximum(begin - overflow, 0)
+            end = numpy.minimum(end, num_frames)
+        return begin, end
+
+    def _num_ready(self):
+        """Returns the number of frames whose windows are fully received."""
+        if self.opts.center:
+            cmn_window = self.opts.cmn_window
+            if self._num_frames < cmn_window:
+                return 0
+            return self._num_frames - cmn_window + cmn_window // 2 + 1
+        if self._num_frames < self.opts.min_window:
+            return 0
+        return self._num_frames
+
+    def _normalize(self, feats, csum, csum2, begin, end):
+        """Normalizes features using prefix sums over window boundaries."""
+        count = (end - begin)[:, None].astype(numpy.float64)
+        mean = (csum[end] - csum[begin]) / count
+        output = feats - mean
+        if self.opts.normalize_variance:
+            var = (csum2[end] - csum2[begin]) / count - mean * mean
+            numpy.maximum(var, 1.0e-10, out=var)
+            output /= numpy.sqrt(var)
+        return output
+
+    def _output(self, num_ready, num_frames=None):
+        """Normalizes buffered frames up to `num_ready` and drops old frames."""
+        frames = numpy.arange(self._num_output, num_ready)
+        begin, end = self._window_bounds(frames, num_frames)
+        offset = self._offset
+        rows = frames - offset
+        output = self._normalize(self._feats[rows], self._csum, self._csum2,
+                                 begin - offset, end - offset)
+        self._num_output = num_ready
+        # Windows of the remaining frames can not start before this frame.
+        keep = max(self._num_output - self.opts.cmn_window, offset)
+        dead = keep - offset
+        if dead > self._num_frames - keep:
+            # Compact buffers when more than half of the used rows are dead.
+            # Rebasing prefix sums keeps their magnitude bounded on long
+            # streams.
+            live = self._num_frames - keep
+            self._feats[:live] = self._feats[dead:dead + live]
+            self._csum[:live + 1] = (self._csum[dead:dead + live + 1]
+                                     - self._csum[dead])
+            self._csum2[:live + 1] = (self._csum2[dead:dead + live + 1]
+                                      - self._csum2[dead])
+            self._offset = keep
+        if output.shape[0] == 0:
+            return matrix.Matrix()
+        return matrix.Matrix(output)
+
+    def accept_chunk(self, chunk):
+        """Accepts a chunk of features and outputs the frames that are ready.
+
+        Args:
+            chunk (MatrixBase or numpy.ndarray): The next chunk of features.
+
+        Returns:
+            Matrix: Normalized features for the frames whose normalization
+            windows are complete. This matrix is empty if there are no such
+            frames yet.
+        """
+        chunk = numpy.asarray(chunk, dtype=numpy.float64)
+        if chunk.ndim != 2:
+            raise ValueError("chunk should be a 2-D matrix like object.")
+        num_rows, dim = chunk.shape
+        if self._feats is None:
+            capacity = max(2 * (self.opts.cmn_window + 1), num_rows)
+            self._feats = numpy.empty((capacity, dim))
+            self._csum = numpy.zeros((capacity + 1, dim))
+            self._csum2 = numpy.zeros((capacity + 1, dim))
+        elif dim != self._feats.shape[1]:
+            raise ValueError("chunk dimension {} does not match feature "
+                             "dimension {}.".format(dim, self._feats.shape[1]))
+        used = self._num_frames - self._offset
+        if used + num_rows > self._feats.shape[0]:
+            capacity = max(2 * self._feats.shape[0], used + num_rows)
+            self._feats.resize((capacity, dim), refcheck=False)
+            self._csum.resize((capacity + 1, dim), refcheck=False)
+            self._csum2.resize((capacity + 1, dim), refcheck=False)
+        rows = slice(used, used + num_rows)
+        self._feats[rows] = chunk
+        self._csum[used + 1:used + num_rows + 1] = (
+            numpy.cumsum(chunk, axis=0) + self._csum[used])
+        self._csum2[used + 1:used + num_rows + 1] = (
+            numpy.cumsum(chunk * chunk, axis=0) + self._csum2[used])
+        self._num_frames += num_rows
+        return self._output(self._num_ready())
+
+    def finalize(self):
+        """Outputs the remaining frames at the end of the input.
+
+        Returns:
+            Matrix: Normalized features for the frames that were not output yet.
+        """
+        if self._feats is None:
+            return matrix.Matrix()
+        return self._output(self._num_frames, self._num_frames)
+
+    def reset(self):
+        """Resets the internal state for processing a new input stream."""
+        self._feats, self._csum, self._csum2 = None, None, None
+        self._offset, self._num_frames, self._num_output = 0, 0, 0
+
+    def apply(self, feats):
+        """Applies sliding-window CMVN to the given feature matrix.
+
+        Normalization is done in place. This method does not change the
+        streaming state.
+
+        Args:
+            feats (MatrixBase or numpy.ndarray): The feature matrix to
+                normalize.
+        """
+        array = numpy.asarray(feats)
+        num_frames = array.shape[0]
+        if num_frames == 0:
+            return
+        data = array.astype(numpy.float64)
+        zeros = numpy.zeros((1, data.shape[1]))
+        csum = numpy.concatenate((zeros, numpy.cumsum(data, axis=0)))
+        csum2 = numpy.concatenate((zeros, numpy.cumsum(data * data, axis=0)))
+        begin, end = self._window_bounds(numpy.arange(num_frames), num_frames)
+        array[:] = self._normalize(data, csum, csum2, begin, end)
+
+
+# Per-process table readers used by compute_cmvn_stats workers.
+_worker_feats_reader = None
+_worker_weights_reader = None
+
+
+def _init_cmvn_stats_worker(feats_rspecifier, weights_rspecifier):
+    """Opens the table readers used by a CMVN stats worker."""
+    global _worker_feats_reader, _worker_weights_reader
+    _worker_feats_reader = _table.RandomAccessMatrixReader(feats_rspecifier)
+    if weights_rspecifier:
+        _worker_weights_reader = _table.RandomAccessVectorReader(
+            weights_rspecifier)
+    else:
+        _worker_weights_reader = None
+
+
+def _close_cmvn_stats_worker():
+    """Closes the table readers opened by :func:`_init_cmvn_stats_worker`."""
+    global _worker_feats_reader, _worker_weights_reader
+    for reader in (_worker_feats_reader, _worker_weights_reader):
+        if reader is not None:
+            reader.close()
+    _worker_feats_reader, _worker_weights_reader = None, None
+
+
+def _acc_cmvn_stats_task(task):
+    """Accumulates CMVN stats for a subset of utterances of a speaker.
+
+    Returns:
+        Tuple[str, numpy.ndarray, int, int]: The speaker id, accumulated stats
+        (``None`` if nothing was accumulated), number of utterances done and
+        number of utterances with errors.
+    """
+    spk, utts = task
+    cmvn, num_done, num_err = Cmvn(), 0, 0
+    for utt in utts:
+        if utt not in _worker_feats_reader:
+            logging.warning("Did not find features for utterance {}"
+                            .format(utt))
+            num_err += 1
+            continue
+        feats = _worker_feats_reader[utt]
+        weights = None
+        if _worker_weights_reader is not None:
+            if utt not in _worker_weights_reader:
+                logging.warning("No weights available for utterance {}"
+                                .format(utt))
+                num_err += 1
+                continue
+            weights = _worker_weights_reader[utt]
+            if weights.dim != feats.num_rows:
+                logging.warning("Weights for utterance {} have wrong size {} "
+                                "vs. {}".format(utt, weights.dim,
+                                                feats.num_rows))
+                num_err += 1
+                continue
+        if cmvn.stats is None:
+            cmvn.init(feats.num_cols)
+        cmvn.accumulate(feats, weights)
+        num_done += 1
+    stats = None if cmvn.stats is None else cmvn.stats.numpy().copy()
+    return spk, stats, num_done, num_err
+
+
+def _read_spk2utt(spk2utt_rxfilename):
+    """Reads a speaker-to-utterances map as a list of (spk, utts) pairs."""
+    spk2utt = []
+    with io.xopen(spk2utt_rxfilename, "rt") as ki:
+        for line in ki:
+            fields = line.split()
+            if fields:
+                spk2utt.append((fields[0], fields[1:]))
+    return spk2utt
+
+
+def compute_cmvn_stats(feats_rspecifier, stats_wspecifier, spk2utt_rxfilename,
+                       weights_rspecifier=None, num_workers=None,
+                       max_utts_per_task=100):
+    """Computes per-speaker CMVN statistics in parallel.
+
+    This is a map-reduce version of Kaldi's `compute-cmvn-stats --spk2utt`.
+    Speakers are split into tasks of at most `max_utts_per_task` utterances
+    each, so that speakers with many utterances are accumulated by multiple
+    workers. Each worker reads features for its utterances from a random
+    access table reader and returns partial `2 x dim+1` statistics, which are
+    summed per speaker and written in `spk2utt` order::
+
+        compute_cmvn_stats("scp:data/feats.scp", "ark:data/cmvn.ark",
+                           "data/spk2utt", num_workers=16)
+
+    Args:
+        feats_rspecifier (str): Rspecifier for reading feature matrices. This
+            table is opened for random access in each worker, so a script file
+            is the most efficient choice.
+        stats_wspecifier (str): Wspecifier for writing speaker statistics as
+            double precision matrices.
+        spk2utt_rxfilename (str): Extended filename for reading the
+            speaker-to-utterances map.
+        weights_rspecifier (str): Rspecifier for reading per-frame weights,
+            e.g. voice activity detection output. If ``None``, frames are not
+            weighted.
+        num_workers (int): Number of worker processes. If ``None``, the number
+            of CPUs is used. If 1, statistics are accumulated in the calling
+            process.
+        max_utts_per_task (int): Maximum number of utterances in a single task.
+
+    Returns:
+        Tuple[int, int]: The number of utterances processed successfully and
+        the number of utterances with errors.
+    """
+    tasks = []
+    for spk, utts in _read_spk2utt(spk2utt_rxfilename):
+        for i in range(0, max(len(utts), 1), max_utts_per_task):
+            tasks.append((spk, utts[i:i + max_utts_per_task]))
+
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    results = _run_tasks(_acc_cmvn_stats_task, ((task,) for task in tasks),
+                         num_workers, _init_cmvn_stats_worker,
+                         (feats_rspecifier, weights_rspecifier),
+                         2 * num_workers)
+
+    num_done, num_err = 0, 0
+    try:
+        with _table.DoubleMatrixWriter(stats_wspecifier) as writer:
+            # Results are in task order, so partial stats for a speaker are
+            # consecutive.
+            for spk, partials in itertools.groupby(results, lambda r: r[0]):
+                stats = None
+                for _, partial_stats, done, err in partials:
+                    num_done += done
+                    num_err += err
+                    if partial_stats is None:
+                        continue
+                    if stats is None:
+                        stats = partial_stats
+                    else:
+                        stats += partial_stats
+                if stats is None:
+                    logging.warning("No stats accumulated for speaker {}"
+                                    .format(spk))
+                else:
+                    writer[spk] = stats
+    finally:
+        results.close()
+        # Readers are opened in the calling process if there is one worker.
+        _close_cmvn_stats_worker()
+    return num_done, num_err
+
+
+__all__ = ['Cmvn', 'SlidingWindowCmvn', 'compute_cmvn_stats']
@@ -0,0 +1,54 @@
+"""Process pools shared by the table-level batch processing functions."""
+
+import collections as _collections
+import multiprocessing as _mp
+
+
+def fork_pool(num_workers, initializer=None, initargs=()):
+    """Returns a pool of forked worker processes.
+
+    Forked workers inherit the state of the calling process, e.g. models and
+    graphs passed to the initializer, without serializing it.
+    """
+    # Python 2 has no start methods, its pools are always forked on POSIX.
+    context = _mp.get_context("fork") if hasattr(_mp, "get_context") else _mp
+    return context.Pool(num_workers, initializer, initargs)
+
+
+def run_tasks(task, args, num_workers, initializer, initargs, max_pending):
+    """Runs tasks on a pool of forked workers, yielding results in order.
+
+    Args:
+        task (callable): Task function. It should be a module level function.
+        args (Iterable[tuple]): Task arguments. They are consumed lazily.
+        num_workers (int): Number of worker processes. If 1, tasks are run in
+            the calling process.
+        initializer (callable): Worker initializer. It is called with
+            `initargs` in each worker, or in the calling process if
+            `num_workers` is 1, before any tasks are run.
+        initargs (tuple): Initializer arguments. They are inherited by forked
+            workers.
+        max_pending (int): Maximum number of tasks submitted but not yet
+            returned. This bounds memory use.
+
+    Yields:
+        Task results in the order of `args`. Exceptions raised by tasks are
+        re-raised in the calling process.
+    """
+    if num_workers == 1:
+        initializer(*initargs)
+        for a in args:
+            yield task(*a)
+        return
+    pool = fork_pool(num_workers, initializer, initargs)
+    try:
+        pending = _collections.deque()
+        for a in args:
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(task, a))
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from kaldi.alignment import MappedAligner, align_corpus
+from kaldi.util.table import MatrixWriter, SequentialIntVectorReader
+
+from .fixtures import *
+
+
+class TestAlignCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        trans_model, tree, lexicon = make_models()
+        self.aligner = MappedAligner(trans_model, tree, lexicon,
+                                     acoustic_scale=1.0)
+        self.info = make_word_boundary_info()
+        self.texts = {"utt1": "1 2", "utt2": "2", "utt3": "2 1 1",
+                      "utt5": "1 2 1"}
+        self.loglikes = [
+            ("utt1", make_loglikes(trans_model, phone_sequence([1, 2]))),
+            ("utt2", make_loglikes(trans_model, phone_sequence([2], 4))),
+            ("utt3", make_loglikes(trans_model, phone_sequence([2, 1, 1]))),
+            # No text.
+            ("utt4", make_loglikes(trans_model, phone_sequence([1]))),
+            # Too short to align with the text.
+            ("utt5", make_loglikes(trans_model, [SILENCE] * 4)),
+        ]
+        self.feats_rspecifier = "ark:" + self.path("loglikes.ark")
+        with MatrixWriter(self.feats_rspecifier) as writer:
+            for key, loglikes in self.loglikes:
+                writer[key] = loglikes
+        self.text = self.path("text")
+        with open(self.text, "w") as f:
+            for key, text in sorted(self.texts.items()):
+                f.write("{} {}\n".format(key, text))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def expected_outputs(self):
+        expected = {}
+        for key, loglikes in self.loglikes:
+            if key not in self.texts:
+                continue
+            try:
+                out = self.aligner.align(loglikes, self.texts[key])
+            except RuntimeError:
+                continue
+            out["phone_alignment"] = self.aligner.to_phone_alignment(
+                out["alignment"])
+            out["word_alignment"] = self.aligner.to_word_alignment(
+                out["best_path"], self.info)
+            expected[key] = out
+        return expected
+
+    def test_align_corpus(self):
+        expected = self.expected_outputs()
+        self.assertEqual(sorted(expected), ["utt1", "utt2", "utt3"])
+        wspecifier = "ark:" + self.path("ali.ark")
+        for num_workers in (1, 2):
+            for max_pending in (None, 1):
+                outputs = list(align_corpus(
+                    self.aligner, self.feats_rspecifier, self.text,
+                    wspecifier, phones=True, word_boundary_info=self.info,
+                    num_workers=num_workers, max_pending=max_pending))
+                self.assertEqual([key for key, _ in outputs],
+                                 [key for key, _ in self.loglikes])
+                for key, out in outputs:
+                    if key not in expected:
+                        self.assertIsNone(out)
+                        continue
+                    self.assertEqual(out["alignment"].tolist(),
+                                     expected[key]["alignment"])
+                    self.assertAlmostEqual(out["likelihood"],
+                                           expected[key]["likelihood"],
+                                           places=3)
+                    self.assertEqual(
+                        list(map(tuple, out["phone_alignment"].tolist())),
+                        expected[key]["phone_alignment"])
+                    self.assertEqual(
+                        list(map(tuple, out["word_alignment"].tolist())),
+                        expected[key]["word_alignment"])
+                with SequentialIntVectorReader(wspecifier) as reader:
+                    alignments = [(key, ali) for key, ali in reader]
+                self.assertEqual(alignments,
+                                 [(key, expected[key]["alignment"])
+                                  for key, _ in self.loglikes
+                                  if key in expected])
+
+    def test_without_extra_outputs(self):
+        outputs = dict(align_corpus(self.aligner, self.feats_rspecifier,
+                                    self.text, num_workers=1))
+        self.assertEqual(sorted(outputs["utt1"]), ["alignment", "likelihood"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+from kaldi.alignment import MappedAligner, NnetAligner
+from kaldi.matrix import Matrix, Vector
+from kaldi.nnet3 import NnetSimpleComputationOptions
+
+from .fixtures import *
+
+
+class TestAlignLong(unittest.TestCase):
+
+    def setUp(self):
+        trans_model, tree, lexicon = make_models()
+        self.trans_model = trans_model
+        self.aligner = MappedAligner(trans_model, tree, lexicon,
+                                     acoustic_scale=1.0)
+        self.info = make_word_boundary_info()
+        self.words = [1, 2, 2, 1] * 10
+
+    def align_long(self, phones, **kwargs):
+        loglikes = make_loglikes(self.trans_model, phones)
+        text = " ".join(map(str, self.words))
+        return self.aligner.align_long(loglikes, text, self.info, window=60,
+                                       margin=12, max_window=240, **kwargs)
+
+    def check_output(self, out, num_frames):
+        segments = out["segments"]
+        self.assertEqual(segments[0, 0], 0)
+        self.assertEqual(segments[-1, 1], num_frames)
+        self.assertTrue((segments[1:, 0] == segments[:-1, 1]).all())
+        self.assertTrue((segments[1:, 2] == segments[:-1, 3]).all())
+        self.assertEqual(segments[-1, 3], len(self.words))
+        self.assertEqual(len(out["alignment"]), num_frames)
+        labels, starts, durations = out["word_alignment"]
+        self.assertEqual([l for l in labels if l != 0], self.words)
+        self.assertTrue(((starts[1:] == starts[:-1] + durations[:-1])).all())
+
+    def test_align_long(self):
+        phones = phone_sequence(self.words)
+        out = self.align_long(phones)
+        self.assertTrue(len(out["segments"]) > 1)
+        self.check_output(out, len(phones))
+
+        parallel = self.align_long(phones, num_workers=2)
+        self.assertEqual(parallel["alignment"], out["alignment"])
+        self.assertTrue((parallel["segments"] == out["segments"]).all())
+
+    def test_trailing_frames_are_bounded(self):
+        phones = phone_sequence(self.words) + [SILENCE] * 500
+        out = self.align_long(phones)
+        self.check_output(out, len(phones))
+        segments = out["segments"]
+        trailing = segments[segments[:, 2] == len(self.words)]
+        self.assertTrue(len(trailing) > 1)
+        self.assertTrue((trailing[:, 1] - trailing[:, 0] <= 60).all())
+
+    def test_partial_word_at_window_end(self):
+        phones = phone_sequence(self.words)
+        loglikes = make_loglikes(self.trans_model, phones)
+        # The window ends in the middle of the third word.
+        window = 6 + 2 * 12 + 3
+        anchor = self.aligner._find_anchor(
+            self.aligner._slice_input(loglikes, 0, window), self.words,
+            self.info, window, 0)
+        self.assertIsNotNone(anchor)
+        split, num_words = anchor
+        self.assertEqual(num_words, 2)
+        self.assertTrue(6 + 18 <= split <= 6 + 24)
+
+    def test_split_granularity(self):
+        aligner = NnetAligner.__new__(NnetAligner)
+        aligner.decodable_opts = NnetSimpleComputationOptions()
+        aligner.decodable_opts.frame_subsampling_factor = 3
+        aligner.online_ivector_period = 10
+        feats = Matrix(300, 4)
+        self.assertEqual(aligner._split_granularity(feats), 1)
+        self.assertEqual(aligner._split_granularity((feats, Vector(2))), 1)
+        self.assertEqual(aligner._split_granularity((feats, Matrix(30, 2))),
+                         10)
+
+        aligner.online_ivector_period = 6
+        self.assertEqual(aligner._split_granularity((feats, Matrix(50, 2))),
+                         2)
+
+        # Segments starting on a multiple of the granularity start on an
+        # ivector period boundary.
+        online_ivectors = Matrix(50, 2)
+        for i in range(50):
+            online_ivectors[i, 0] = i
+        _, sliced = aligner._slice_input((feats, online_ivectors), 4, 20)
+        self.assertEqual(sliced[0, 0], 2)
+        self.assertEqual(sliced.num_rows, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
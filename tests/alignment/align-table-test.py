@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from kaldi.alignment import MappedAligner
+from kaldi.util.table import MatrixWriter
+
+from .fixtures import *
+
+
+class TestAlignTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        trans_model, tree, lexicon = make_models()
+        self.aligner = MappedAligner(trans_model, tree, lexicon,
+                                     acoustic_scale=1.0)
+        self.transcripts = {"utt1": [1, 2], "utt2": [2], "utt3": [1, 2],
+                            "utt5": [1, 2, 1]}
+        self.loglikes = [
+            ("utt1", make_loglikes(trans_model, phone_sequence([1, 2]))),
+            ("utt2", make_loglikes(trans_model, phone_sequence([2], 4))),
+            ("utt3", make_loglikes(trans_model, phone_sequence([1, 2], 3))),
+            # No transcript.
+            ("utt4", make_loglikes(trans_model, phone_sequence([1]))),
+            # Too short to align with the transcript.
+            ("utt5", make_loglikes(trans_model, [SILENCE] * 4)),
+        ]
+        self.input_rspecifier = "ark:" + self.path("loglikes.ark")
+        with MatrixWriter(self.input_rspecifier) as writer:
+            for key, loglikes in self.loglikes:
+                writer[key] = loglikes
+        self.transcript_rspecifier = "ark,t:" + self.path("text.int")
+        with open(self.path("text.int"), "w") as f:
+            for key, words in sorted(self.transcripts.items()):
+                f.write("{} {}\n".format(key, " ".join(map(str, words))))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def test_align_table(self):
+        expected = {}
+        for key, loglikes in self.loglikes:
+            if key in self.transcripts:
+                text = " ".join(map(str, self.transcripts[key]))
+                try:
+                    expected[key] = self.aligner.align(loglikes, text)
+                except RuntimeError:
+                    pass
+        self.assertEqual(sorted(expected), ["utt1", "utt2", "utt3"])
+
+        for batch_size in (1, 2, 100):
+            outputs = list(self.aligner.align_table(
+                self.input_rspecifier, self.transcript_rspecifier,
+                batch_size=batch_size))
+            self.assertEqual([key for key, _ in outputs],
+                             [key for key, _ in self.loglikes])
+            for key, out in outputs:
+                if key not in expected:
+                    self.assertIsNone(out)
+                    continue
+                self.assertEqual(out["alignment"], expected[key]["alignment"])
+                self.assertAlmostEqual(out["likelihood"],
+                                       expected[key]["likelihood"], places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
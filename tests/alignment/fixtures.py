@@ -0,0 +1,97 @@
+"""Tiny models and synthetic log-likelihoods shared by alignment tests.
+
+Phone 1 is silence, phones 2 and 3 are the pronunciations of words 1 and 2.
+"""
+
+import numpy as np
+
+from kaldi.base.io import istringstream
+from kaldi import fstext as fst
+from kaldi.hmm import HmmTopology, TransitionModel
+from kaldi.lat.align import WordBoundaryInfo, WordBoundaryInfoNewOpts
+from kaldi.matrix import Matrix
+from kaldi.tree import monophone_context_dependency
+
+TOPO = """<Topology>
+<TopologyEntry>
+<ForPhones> 1 2 3 </ForPhones>
+<State> 0 <PdfClass> 0
+<Transition> 0 0.5
+<Transition> 1 0.5
+</State>
+<State> 1 <PdfClass> 1
+<Transition> 1 0.5
+<Transition> 2 0.5
+</State>
+<State> 2 <PdfClass> 2
+<Transition> 2 0.5
+<Transition> 3 0.5
+</State>
+<State> 3 </State>
+</TopologyEntry>
+</Topology>
+"""
+
+WORD_BOUNDARY = "1 nonword\n2 singleton\n3 singleton\n"
+
+SILENCE = 1
+WORD_PHONES = {1: 2, 2: 3}
+
+
+def make_models(topology=TOPO):
+    """Returns the transition model, tree and lexicon of the test setup."""
+    topo = HmmTopology()
+    topo.read(istringstream.from_str(topology), False)
+    tree = monophone_context_dependency(
+        [1, 2, 3], topo.get_phone_to_num_pdf_classes())
+    trans_model = TransitionModel.from_topo(tree, topo)
+    lexicon = fst.StdVectorFst()
+    state = lexicon.add_state()
+    lexicon.set_start(state)
+    lexicon.set_final(state)
+    one = fst.TropicalWeight.one()
+    lexicon.add_arc(state, fst.StdArc(SILENCE, 0, one, state))
+    for word, phone in sorted(WORD_PHONES.items()):
+        lexicon.add_arc(state, fst.StdArc(phone, word, one, state))
+    return trans_model, tree, lexicon
+
+
+def make_word_boundary_info():
+    """Returns the word boundary information of the test setup."""
+    info = WordBoundaryInfo(WordBoundaryInfoNewOpts())
+    info.init(istringstream.from_str(WORD_BOUNDARY))
+    return info
+
+
+def phone_sequence(words, frames_per_phone=6):
+    """Returns the phones of words separated by silences, one per frame."""
+    phones = [SILENCE] * frames_per_phone
+    for word in words:
+        phones += [WORD_PHONES[word]] * frames_per_phone
+        phones += [SILENCE] * frames_per_phone
+    return phones
+
+
+def make_loglikes(trans_model, phones, floor=-20.0):
+    """Returns pdf log-likelihoods favouring the given frame phones.
+
+    Each run of identical phones is split evenly across the three HMM
+    states of the phone.
+    """
+    pdfs = {}
+    for tid in range(1, trans_model.num_transition_ids() + 1):
+        key = (trans_model.transition_id_to_phone(tid),
+               trans_model.transition_id_to_hmm_state(tid))
+        pdfs[key] = trans_model.transition_id_to_pdf(tid)
+    loglikes = np.full((len(phones), trans_model.num_pdfs()), floor,
+                       dtype=np.float32)
+    begin = 0
+    while begin < len(phones):
+        end = begin
+        while end < len(phones) and phones[end] == phones[begin]:
+            end += 1
+        for t in range(begin, end):
+            state = min(3 * (t - begin) // (end - begin), 2)
+            loglikes[t, pdfs[phones[begin], state]] = 0.0
+        begin = end
+    return Matrix(loglikes)
@@ -0,0 +1,53 @@
+import unittest
+
+from kaldi.alignment import MappedAligner
+
+from .fixtures import *
+
+
+class TestGraphCache(unittest.TestCase):
+
+    def setUp(self):
+        self.trans_model, self.tree, self.lexicon = make_models()
+        self.loglikes = make_loglikes(self.trans_model,
+                                      phone_sequence([1, 2]))
+
+    def make_aligner(self, **kwargs):
+        return MappedAligner(self.trans_model, self.tree, self.lexicon,
+                             acoustic_scale=1.0, **kwargs)
+
+    def assertSameOutput(self, out, expected):
+        self.assertEqual(out["alignment"], expected["alignment"])
+        self.assertAlmostEqual(out["likelihood"], expected["likelihood"],
+                               places=3)
+
+    def test_settings_change(self):
+        aligner = self.make_aligner()
+        aligner.align(self.loglikes, "1 2")
+
+        aligner.self_loop_scale = 0.1
+        aligner.transition_scale = 0.5
+        expected = self.make_aligner(
+            self_loop_scale=0.1, transition_scale=0.5,
+            graph_cache_size=0).align(self.loglikes, "1 2")
+        self.assertSameOutput(aligner.align(self.loglikes, "1 2"), expected)
+
+        # Decoders built with the old beam should not be reused.
+        aligner.decoder_opts.beam = 10.0
+        aligner.align(self.loglikes, "1 2")
+        self.assertEqual(len(aligner._graph_cache), 3)
+        self.assertEqual(len(set(key[0] for key in aligner._graph_cache)), 1)
+
+    def test_eviction(self):
+        aligner = self.make_aligner(graph_cache_size=2)
+        expected = self.make_aligner(graph_cache_size=0)
+        for text in ("1 2", "2", "1 2", "1", "2", "1 2"):
+            self.assertSameOutput(aligner.align(self.loglikes, text),
+                                  expected.align(self.loglikes, text))
+            self.assertLessEqual(len(aligner._graph_cache), 2)
+        self.assertEqual([key[0] for key in aligner._graph_cache],
+                         [(2,), (1, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
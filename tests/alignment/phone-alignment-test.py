@@ -0,0 +1,123 @@
+import random
+import unittest
+
+from kaldi.alignment import MappedAligner
+from kaldi.hmm import split_to_phones
+
+from .fixtures import TOPO, make_models
+
+# Single state phones with distinct forward and self-loop pdf classes.
+CHAIN_TOPO = """<Topology>
+<TopologyEntry>
+<ForPhones> 1 2 3 </ForPhones>
+<State> 0 <ForwardPdfClass> 0 <SelfLoopPdfClass> 1
+<Transition> 0 0.5
+<Transition> 1 0.5
+</State>
+<State> 1 </State>
+</TopologyEntry>
+</Topology>
+"""
+
+
+def reference_phone_alignment(trans_model, alignment):
+    """Returns the phone alignment computed with split_to_phones."""
+    try:
+        success, split_ali = split_to_phones(trans_model, alignment)
+    except RuntimeError:
+        # Some invalid alignments fail assertions.
+        return None
+    if not success:
+        return None
+    phone_start, phone_alignment = 0, []
+    for entry in split_ali:
+        phone = trans_model.transition_id_to_phone(entry[0])
+        phone_alignment.append((phone, phone_start, len(entry)))
+        phone_start += len(entry)
+    return phone_alignment
+
+
+class TestPhoneAlignment(unittest.TestCase):
+
+    def check_topology(self, topology):
+        trans_model, tree, lexicon = make_models(topology)
+        aligner = MappedAligner(trans_model, tree, lexicon)
+        rng = random.Random(0)
+
+        # Transition-ids of each (phone, hmm-state) pair.
+        loops, forwards = {}, {}
+        for tid in range(1, trans_model.num_transition_ids() + 1):
+            key = (trans_model.transition_id_to_phone(tid),
+                   trans_model.transition_id_to_hmm_state(tid))
+            if trans_model.is_self_loop(tid):
+                loops[key] = tid
+            else:
+                forwards[key] = tid
+        num_states = max(state for _, state in forwards) + 1
+
+        def random_alignment(reordered):
+            alignment = []
+            for _ in range(rng.randint(1, 5)):
+                phone = rng.randint(1, 3)
+                for state in range(num_states):
+                    self_loops = [loops[phone, state]] * rng.randint(0, 3)
+                    forward = [forwards[phone, state]]
+                    if reordered:
+                        alignment += forward + self_loops
+                    else:
+                        alignment += self_loops + forward
+            return alignment
+
+        def malformed(alignment):
+            alignment = list(alignment)
+            choice = rng.randint(0, 3)
+            if choice == 0:
+                del alignment[rng.randrange(len(alignment)):]
+            elif choice == 1:
+                del alignment[:rng.randrange(1, len(alignment) + 1)]
+            elif choice == 2:
+                del alignment[rng.randrange(len(alignment))]
+            else:
+                alignment[rng.randrange(len(alignment))] = rng.randint(
+                    1, trans_model.num_transition_ids())
+            return alignment
+
+        alignments = [[]]
+        for reordered in (False, True):
+            for _ in range(50):
+                alignment = random_alignment(reordered)
+                alignments += [alignment, malformed(alignment)]
+
+        num_failed = 0
+        for alignment in alignments:
+            expected = reference_phone_alignment(trans_model, alignment)
+            if expected is None:
+                num_failed += 1
+                with self.assertRaises(RuntimeError):
+                    aligner.to_phone_alignment(alignment)
+            else:
+                self.assertEqual(aligner.to_phone_alignment(alignment),
+                                 expected)
+        self.assertGreater(num_failed, 0)
+
+        outputs = aligner.to_phone_alignment_arrays_batch(alignments)
+        self.assertEqual(len(outputs), len(alignments))
+        for alignment, output in zip(alignments, outputs):
+            expected = reference_phone_alignment(trans_model, alignment)
+            if expected is None:
+                self.assertIsNone(output)
+            else:
+                labels, starts, durations = output
+                self.assertEqual(list(zip(labels.tolist(), starts.tolist(),
+                                          durations.tolist())),
+                                 expected)
+
+    def test_three_state_topology(self):
+        self.check_topology(TOPO)
+
+    def test_chain_topology(self):
+        self.check_topology(CHAIN_TOPO)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+
+import numpy as np
+
+from kaldi.asr import (MappedLatticeFasterRecognizer, NnetBatchRecognizer,
+                       NnetLatticeFasterRecognizer)
+from kaldi.base.io import istringstream
+from kaldi.decoder import (LatticeFasterDecoder, LatticeFasterDecoderOptions,
+                           TrainingGraphCompiler,
+                           TrainingGraphCompilerOptions)
+from kaldi import fstext as fst
+from kaldi.matrix import Matrix
+from kaldi.nnet3 import (AmNnetSimple, Nnet, NnetBatchComputerOptions,
+                         NnetSimpleComputationOptions)
+
+from ..alignment.fixtures import make_models
+
+CONFIG = """input-node name=input dim=4
+component name=affine type=AffineComponent input-dim=12 output-dim={0}
+component-node name=affine component=affine input=Append(Offset(input, -1), input, Offset(input, 1))
+component name=logsoftmax type=LogSoftmaxComponent dim={0}
+component-node name=logsoftmax component=logsoftmax input=affine
+output-node name=output input=logsoftmax
+"""
+
+
+def make_graph(trans_model, tree, lexicon):
+    """Returns a decoding graph accepting any sequence of words 1 and 2."""
+    grammar = fst.StdVectorFst()
+    state = grammar.add_state()
+    grammar.set_start(state)
+    grammar.set_final(state)
+    for word in (1, 2):
+        grammar.add_arc(state, fst.StdArc(word, word,
+                                          fst.TropicalWeight(1.0), state))
+    compiler = TrainingGraphCompiler(trans_model, tree, lexicon, [],
+                                     TrainingGraphCompilerOptions())
+    return compiler.compile_graph(grammar)
+
+
+class TestNnetBatchRecognizer(unittest.TestCase):
+
+    def setUp(self):
+        self.trans_model, tree, lexicon = make_models()
+        self.graph = make_graph(self.trans_model, tree, lexicon)
+        nnet = Nnet()
+        nnet.read_config(istringstream.from_str(
+            CONFIG.format(self.trans_model.num_pdfs())))
+        self.acoustic_model = AmNnetSimple.from_nnet(nnet)
+        rng = np.random.RandomState(0)
+        self.feats = [
+            ("utt{}".format(i), Matrix(rng.randn(n, 4).astype(np.float32)))
+            for i, n in enumerate((40, 3, 75, 20, 60))]
+        decodable_opts = NnetSimpleComputationOptions()
+        decodable_opts.acoustic_scale = 0.1
+        recognizer = NnetLatticeFasterRecognizer(
+            self.trans_model, AmNnetSimple.from_other(self.acoustic_model),
+            self.make_decoder(), decodable_opts=decodable_opts)
+        self.expected = [recognizer.decode(f) for _, f in self.feats]
+
+    def make_decoder(self):
+        return LatticeFasterDecoder(self.graph, LatticeFasterDecoderOptions())
+
+    def make_recognizer(self, num_threads=1, max_pending=None):
+        recognizers = [
+            MappedLatticeFasterRecognizer(self.trans_model,
+                                          self.make_decoder(),
+                                          acoustic_scale=0.1)
+            for _ in range(num_threads)]
+        compute_opts = NnetBatchComputerOptions()
+        compute_opts.acoustic_scale = 0.1
+        compute_opts.minibatch_size = 4
+        return NnetBatchRecognizer(
+            AmNnetSimple.from_other(self.acoustic_model), recognizers,
+            compute_opts, max_pending=max_pending)
+
+    def test_decode(self):
+        for num_threads in (1, 2):
+            for max_pending in (None, 1):
+                recognizer = self.make_recognizer(num_threads, max_pending)
+                outputs = list(recognizer.decode(iter(self.feats)))
+                self.assertEqual([out["key"] for out in outputs],
+                                 [key for key, _ in self.feats])
+                for out, expected in zip(outputs, self.expected):
+                    self.assertEqual(out["words"], expected["words"])
+                    self.assertEqual(out["text"], expected["text"])
+                    self.assertEqual(out["alignment"],
+                                     expected["alignment"])
+                    self.assertAlmostEqual(out["likelihood"],
+                                           expected["likelihood"],
+                                           places=2)
+                self.assertEqual(recognizer.num_done, len(self.feats))
+                self.assertEqual(recognizer.num_failed, 0)
+
+    def test_empty_input(self):
+        recognizer = self.make_recognizer()
+        feats = [self.feats[0], ("empty", Matrix(0, 4)), self.feats[1]]
+        outputs = list(recognizer.decode(feats))
+        self.assertEqual([out["key"] for out in outputs], ["utt0", "utt1"])
+        self.assertEqual(outputs[1]["words"], self.expected[1]["words"])
+        self.assertEqual(recognizer.num_done, 2)
+        self.assertEqual(recognizer.num_failed, 1)
+
+    def test_abandoned_decode(self):
+        recognizer = self.make_recognizer()
+        outputs = recognizer.decode(self.feats)
+        self.assertEqual(next(outputs)["key"], "utt0")
+        outputs.close()
+        outputs = list(recognizer.decode(self.feats[:2]))
+        self.assertEqual([out["words"] for out in outputs],
+                         [out["words"] for out in self.expected[:2]])
+
+    def test_interleaved_decode(self):
+        recognizer = self.make_recognizer(num_threads=2)
+        outputs = recognizer.decode(self.feats)
+        next(outputs)
+        with self.assertRaises(RuntimeError):
+            next(recognizer.decode(self.feats))
+        self.assertEqual(len(list(outputs)), len(self.feats) - 1)
+        self.assertEqual(len(list(recognizer.decode(self.feats))),
+                         len(self.feats))
+
+    def test_invalid_arguments(self):
+        recognizer = MappedLatticeFasterRecognizer(self.trans_model,
+                                                   self.make_decoder())
+        with self.assertRaises(TypeError):
+            NnetBatchRecognizer(Nnet(), [recognizer])
+        with self.assertRaises(ValueError):
+            NnetBatchRecognizer(self.acoustic_model, [])
+        nnet_recognizer = NnetLatticeFasterRecognizer(
+            self.trans_model, AmNnetSimple.from_other(self.acoustic_model),
+            self.make_decoder())
+        with self.assertRaises(TypeError):
+            NnetBatchRecognizer(self.acoustic_model, [nnet_recognizer])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import random
+import unittest
+
+import numpy as np
+
+from kaldi import fstext as fst
+
+
+def std_weight(rng):
+    return fst.TropicalWeight(rng.uniform(0.0, 5.0))
+
+
+def log_weight(rng):
+    return fst.LogWeight(rng.uniform(0.0, 5.0))
+
+
+def lattice_weight(rng):
+    return fst.LatticeWeight(rng.uniform(0.0, 5.0), rng.uniform(-5.0, 5.0))
+
+
+def compact_lattice_weight(rng):
+    string = [rng.randint(1, 9) for _ in range(rng.randint(0, 3))]
+    return fst.CompactLatticeWeight(lattice_weight(rng), string)
+
+
+TYPES = [
+    (fst.StdVectorFst, fst.StdArc, fst.TropicalWeight, std_weight),
+    (fst.LogVectorFst, fst.LogArc, fst.LogWeight, log_weight),
+    (fst.LatticeVectorFst, fst.LatticeArc, fst.LatticeWeight,
+     lattice_weight),
+    (fst.CompactLatticeVectorFst, fst.CompactLatticeArc,
+     fst.CompactLatticeWeight, compact_lattice_weight),
+]
+
+
+def random_fst(rng, fst_type, arc_type, weight, num_states):
+    ofst = fst_type()
+    for _ in range(num_states):
+        ofst.add_state()
+    if num_states:
+        ofst.set_start(rng.randrange(num_states))
+    for state in range(num_states):
+        for _ in range(rng.randint(0, 3)):
+            ofst.add_arc(state, arc_type(rng.randint(0, 9), rng.randint(0, 9),
+                                         weight(rng),
+                                         rng.randrange(num_states)))
+        if rng.random() < 0.5:
+            ofst.set_final(state, weight(rng))
+    return ofst
+
+
+def weight_values(w):
+    """Returns the costs and the string of a weight."""
+    if hasattr(w, "string"):
+        return (w.weight.value1, w.weight.value2), list(w.string)
+    if hasattr(w, "value1"):
+        return (w.value1, w.value2), []
+    return w.value, []
+
+
+def reference_arrays(ifst, zero):
+    """Returns arcs and final weights of an FST listed in Python."""
+    arcs, finals = [], []
+    for state in ifst.states():
+        for arc in ifst.arcs(state):
+            arcs.append((state, arc.nextstate, arc.ilabel, arc.olabel)
+                        + weight_values(arc.weight))
+        if ifst.final(state) != zero:
+            finals.append((state,) + weight_values(ifst.final(state)))
+    return arcs, finals
+
+
+class TestFstArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def check_arrays(self, ifst, zero, arrays):
+        arcs, finals = reference_arrays(ifst, zero)
+        self.assertEqual(arrays["start"], ifst.start())
+        self.assertEqual(arrays["num_states"], ifst.num_states())
+        self.assertEqual(arrays["src"].tolist(), [a[0] for a in arcs])
+        self.assertEqual(arrays["dst"].tolist(), [a[1] for a in arcs])
+        self.assertEqual(arrays["ilabel"].tolist(), [a[2] for a in arcs])
+        self.assertEqual(arrays["olabel"].tolist(), [a[3] for a in arcs])
+        self.assertTrue(np.allclose(arrays["weight"].reshape(len(arcs), -1),
+                                    np.reshape([a[4] for a in arcs],
+                                               (len(arcs), -1))))
+        self.assertEqual(arrays["final_state"].tolist(),
+                         [f[0] for f in finals])
+        self.assertTrue(np.allclose(
+            arrays["final_weight"].reshape(len(finals), -1),
+            np.reshape([f[1] for f in finals], (len(finals), -1))))
+        if isinstance(ifst, fst.CompactLatticeVectorFst):
+            for key, entries in (("string", arcs), ("final_string", finals)):
+                string = arrays[key]
+                offsets = arrays[key + "_offsets"]
+                self.assertEqual(len(offsets), len(entries) + 1)
+                self.assertEqual([string[b:e].tolist() for b, e
+                                  in zip(offsets[:-1], offsets[1:])],
+                                 [entry[-1] for entry in entries])
+
+    def test_round_trip(self):
+        for fst_type, arc_type, weight_type, weight in TYPES:
+            for num_states in (0, 1, 5, 20):
+                ifst = random_fst(self.rng, fst_type, arc_type, weight,
+                                  num_states)
+                arrays = ifst.to_arrays()
+                self.check_arrays(ifst, weight_type.zero(), arrays)
+                ofst = fst_type.from_arrays(**arrays)
+                self.assertIsInstance(ofst, fst_type)
+                self.assertEqual(ofst.text(), ifst.text())
+
+    def test_defaults(self):
+        ofst = fst.StdVectorFst.from_arrays([0, 1], [1, 2], [1, 2], [3, 4],
+                                            [0.5, 1.5], [2], [0.0])
+        self.assertEqual(ofst.start(), 0)
+        self.assertEqual(ofst.num_states(), 3)
+        self.assertEqual(ofst.final(2), fst.TropicalWeight.one())
+        empty = fst.StdVectorFst.from_arrays([], [], [], [], [], [], [])
+        self.assertEqual(empty.num_states(), 0)
+        self.assertEqual(empty.start(), fst.NO_STATE_ID)
+
+    def test_inconsistent_arrays(self):
+        with self.assertRaises(ValueError):
+            fst.StdVectorFst.from_arrays([0], [5], [1], [1], [0.0], [], [],
+                                         num_states=2)
+        with self.assertRaises(ValueError):
+            fst.StdVectorFst.from_arrays([0, 1], [1], [1], [1], [0.0], [], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
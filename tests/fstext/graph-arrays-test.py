@@ -0,0 +1,170 @@
+import collections
+import random
+import unittest
+
+import numpy as np
+
+from kaldi import fstext as fst
+
+
+def random_fst(rng, fst_type, arc_type, weight, num_states, acyclic=True):
+    """Returns a random FST. Arcs of acyclic FSTs go to higher states."""
+    ofst = fst_type()
+    for _ in range(num_states):
+        ofst.add_state()
+    if num_states:
+        ofst.set_start(0)
+    for state in range(num_states):
+        for _ in range(rng.randint(0, 3)):
+            low = state + 1 if acyclic else 0
+            if low < num_states:
+                ofst.add_arc(state, arc_type(1, 1, weight(rng),
+                                             rng.randrange(low, num_states)))
+        if rng.random() < 0.3:
+            ofst.set_final(state, weight(rng))
+    return ofst
+
+
+def std_weight(rng):
+    return fst.TropicalWeight(rng.uniform(0.0, 5.0))
+
+
+def log_weight(rng):
+    return fst.LogWeight(rng.uniform(0.0, 5.0))
+
+
+def lattice_weight(rng):
+    return fst.LatticeWeight(rng.uniform(0.0, 5.0), rng.uniform(0.0, 5.0))
+
+
+TYPES = [
+    (fst.StdVectorFst, fst.StdArc, std_weight),
+    (fst.LogVectorFst, fst.LogArc, log_weight),
+    (fst.LatticeVectorFst, fst.LatticeArc, lattice_weight),
+]
+
+
+def weight_values(w):
+    if hasattr(w, "value1"):
+        return [w.value1, w.value2]
+    return [w.value]
+
+
+def successors(ifst):
+    return [[arc.nextstate for arc in ifst.arcs(state)]
+            for state in ifst.states()]
+
+
+def reachable(adjacency, sources):
+    seen = set(sources)
+    queue = collections.deque(sources)
+    while queue:
+        state = queue.popleft()
+        for next_state in adjacency[state]:
+            if next_state not in seen:
+                seen.add(next_state)
+                queue.append(next_state)
+    return seen
+
+
+class TestGraphArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(0)
+
+    def random_fsts(self):
+        for fst_type, arc_type, weight in TYPES:
+            for num_states in (0, 1, 10, 30):
+                yield random_fst(self.rng, fst_type, arc_type, weight,
+                                 num_states)
+        for num_states in (1, 10, 30):
+            yield random_fst(self.rng, fst.StdVectorFst, fst.StdArc,
+                             std_weight, num_states, acyclic=False)
+
+    def test_shortestdistance_array(self):
+        for ifst in self.random_fsts():
+            n = ifst.num_states()
+            width = 2 if isinstance(ifst, fst.LatticeVectorFst) else 1
+            for reverse in (False, True):
+                distances = fst.shortestdistance_array(ifst, reverse)
+                expected = [weight_values(w) for w
+                            in fst.shortestdistance(ifst, reverse)]
+                # Missing distances are semiring zero.
+                expected += [[float("inf")] * width] * (n - len(expected))
+                self.assertEqual(len(distances), n)
+                self.assertTrue(np.allclose(
+                    distances.reshape(n, width),
+                    np.reshape(expected, (n, width)), atol=1e-4))
+
+    def test_statedepth_and_connectivity(self):
+        for ifst in self.random_fsts():
+            adjacency = successors(ifst)
+            n = len(adjacency)
+            depths = [-1] * n
+            if n:
+                depths[ifst.start()] = 0
+                queue = collections.deque([ifst.start()])
+                while queue:
+                    state = queue.popleft()
+                    for next_state in adjacency[state]:
+                        if depths[next_state] < 0:
+                            depths[next_state] = depths[state] + 1
+                            queue.append(next_state)
+            self.assertEqual(fst.statedepth_array(ifst).tolist(), depths)
+
+            predecessors = [[] for _ in range(n)]
+            for state, next_states in enumerate(adjacency):
+                for next_state in next_states:
+                    predecessors[next_state].append(state)
+            finals = [s for s in range(n)
+                      if ifst.final(s) != ifst.final(s).zero()]
+            accessible = reachable(adjacency, [ifst.start()] if n else [])
+            coaccessible = reachable(predecessors, finals)
+            access, coaccess = fst.connectivity_arrays(ifst)
+            self.assertEqual(access.tolist(),
+                             [s in accessible for s in range(n)])
+            self.assertEqual(coaccess.tolist(),
+                             [s in coaccessible for s in range(n)])
+
+    def test_toporder_array(self):
+        for fst_type, arc_type, weight in TYPES:
+            ifst = random_fst(self.rng, fst_type, arc_type, weight, 20)
+            order = fst.toporder_array(ifst)
+            self.assertEqual(sorted(order.tolist()), list(range(20)))
+            position = np.argsort(order)
+            for state, next_states in enumerate(successors(ifst)):
+                for next_state in next_states:
+                    self.assertLess(position[state], position[next_state])
+            # The input is not modified.
+            self.assertEqual(ifst.start(), 0)
+
+        cyclic = random_fst(self.rng, fst.StdVectorFst, fst.StdArc,
+                            std_weight, 3)
+        cyclic.add_arc(2, fst.StdArc(1, 1, fst.TropicalWeight.one(), 0))
+        with self.assertRaises(RuntimeError):
+            fst.toporder_array(cyclic)
+
+    def test_degrees(self):
+        for ifst in self.random_fsts():
+            adjacency = successors(ifst)
+            n = len(adjacency)
+            out_degrees = np.array([len(next_states)
+                                    for next_states in adjacency], dtype=int)
+            in_degrees = np.zeros(n, dtype=int)
+            for next_states in adjacency:
+                for next_state in next_states:
+                    in_degrees[next_state] += 1
+            out_array, in_array = fst.degree_arrays(ifst)
+            self.assertEqual(out_array.tolist(), out_degrees.tolist())
+            self.assertEqual(in_array.tolist(), in_degrees.tolist())
+            self.assertEqual(fst.num_arcs_array(ifst).tolist(),
+                             [ifst.num_arcs(s) for s in range(n)])
+            out_hist, in_hist = fst.degree_histograms(ifst)
+            self.assertEqual(out_hist.tolist(),
+                             np.bincount(out_degrees).tolist())
+            self.assertEqual(in_hist.tolist(),
+                             np.bincount(in_degrees).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
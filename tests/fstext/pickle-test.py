@@ -0,0 +1,78 @@
+import multiprocessing
+import pickle
+import sys
+import unittest
+
+from kaldi import fstext as fst
+
+
+def make_fst():
+    ofst = fst.StdVectorFst()
+    s0, s1 = ofst.add_state(), ofst.add_state()
+    ofst.set_start(s0)
+    ofst.add_arc(s0, fst.StdArc(1, 2, fst.TropicalWeight(0.5), s1))
+    ofst.add_arc(s1, fst.StdArc(3, 0, fst.TropicalWeight(1.5), s0))
+    ofst.set_final(s1, fst.TropicalWeight(2.0))
+    return ofst
+
+
+def make_lattice():
+    clat = fst.CompactLatticeVectorFst()
+    s0, s1 = clat.add_state(), clat.add_state()
+    clat.set_start(s0)
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        4, 4, fst.CompactLatticeWeight((1.0, 2.0), [1, 2, 3]), s1))
+    clat.set_final(s1, fst.CompactLatticeWeight((0.5, 0.0), [4]))
+    return clat
+
+
+def num_arcs(args):
+    shared, index = args
+    try:
+        return shared[index].num_arcs()
+    finally:
+        shared.close()
+
+
+class TestFstPickling(unittest.TestCase):
+
+    def test_pickle(self):
+        for ifst in (make_fst(), make_lattice()):
+            ofst = pickle.loads(pickle.dumps(ifst))
+            self.assertIs(type(ofst), type(ifst))
+            self.assertEqual(ofst.to_bytes(), ifst.to_bytes())
+
+    @unittest.skipIf(sys.version_info < (3, 8), "requires Python 3.8")
+    def test_shared_fst_list(self):
+        fsts = [make_fst(), make_lattice(), fst.StdVectorFst()]
+        shared = fst.SharedFstList(fsts)
+        try:
+            self.assertEqual(len(shared), 3)
+            for ifst, ofst in zip(fsts, shared):
+                self.assertIs(type(ofst), type(ifst))
+                self.assertEqual(ofst.to_bytes(), ifst.to_bytes())
+            self.assertEqual(shared[-1].num_states(), 0)
+            with self.assertRaises(IndexError):
+                shared[3]
+
+            copy = pickle.loads(pickle.dumps(shared))
+            self.assertEqual(copy[1].to_bytes(), fsts[1].to_bytes())
+            copy.close()
+
+            pool = multiprocessing.Pool(2)
+            try:
+                self.assertEqual(pool.map(num_arcs,
+                                          [(shared, i) for i in range(3)]),
+                                 [2, 1, 0])
+            finally:
+                pool.close()
+                pool.join()
+            # Workers exiting do not destroy the shared memory block.
+            self.assertEqual(shared[0].to_bytes(), fsts[0].to_bytes())
+        finally:
+            shared.close()
+            shared.unlink()
+
+
+if __name__ == '__main__':
+    unittest.main()
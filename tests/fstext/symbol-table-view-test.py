@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+
+from kaldi import fstext as fst
+
+
+def make_table(symbols):
+    table = fst.SymbolTable()
+    table.add_pair("<eps>", 0)
+    for symbol in symbols:
+        table.add_symbol(symbol)
+    return table
+
+
+class TestSymbolTableView(unittest.TestCase):
+
+    def test_indices_to_symbols(self):
+        table = make_table(["a", "b", "c"])
+        self.assertEqual(fst.indices_to_symbols(table, [3, 1, 0, 1]),
+                         ["c", "a", "<eps>", "a"])
+        self.assertEqual(fst.indices_to_symbols(table, []), [])
+        with self.assertRaises(KeyError):
+            fst.indices_to_symbols(table, [1, 4])
+        with self.assertRaises(KeyError):
+            fst.indices_to_symbols(table, [-1])
+
+    def test_symbols_to_indices(self):
+        table = make_table(["a", "b", "c"])
+        self.assertEqual(fst.symbols_to_indices(table, ["b", "c", "b"]),
+                         [2, 3, 2])
+        self.assertEqual(fst.symbols_to_indices(table, []), [])
+        with self.assertRaises(KeyError):
+            fst.symbols_to_indices(table, ["a", "d"])
+
+    def test_sparse_indices(self):
+        table = make_table([])
+        table.add_pair("x", 10)
+        table.add_pair("y", 3)
+        view = fst.symbol_table_view(table)
+        self.assertEqual(len(view), 3)
+        self.assertEqual(view.symbols_array(np.array([[10, 3], [0, 10]]))
+                         .tolist(), [["x", "y"], ["<eps>", "x"]])
+        self.assertEqual(view.indices_array(["y", "x"]).tolist(), [3, 10])
+        with self.assertRaises(KeyError):
+            view.indices_to_symbols([5])
+
+    def test_batch(self):
+        view = fst.symbol_table_view(make_table(["a", "b"]))
+        self.assertEqual(view.indices_to_symbols_batch([[1], [], [2, 1]]),
+                         [["a"], [], ["b", "a"]])
+        self.assertEqual(view.symbols_to_indices_batch([["b"], []]),
+                         [[2], []])
+        self.assertEqual(view.indices_to_text_batch([[1, 2], [2]]),
+                         ["a b", "b"])
+
+    def test_cached_view(self):
+        table = make_table(["a", "b"])
+        view = fst.symbol_table_view(table)
+        self.assertIs(fst.symbol_table_view(table), view)
+        self.assertIs(fst.symbol_table_view(view), view)
+
+        # Views are recompiled after symbols are added or removed.
+        table.add_symbol("c")
+        self.assertEqual(fst.indices_to_symbols(table, [3]), ["c"])
+        table.remove_symbol(1)
+        with self.assertRaises(KeyError):
+            fst.indices_to_symbols(table, [1])
+        with self.assertRaises(KeyError):
+            fst.symbols_to_indices(table, ["a"])
+
+    def test_cache_is_bounded(self):
+        tables = [make_table(["a"]) for _ in range(100)]
+        for table in tables:
+            self.assertEqual(fst.indices_to_symbols(table, [1]), ["a"])
+        self.assertTrue(len(fst._api._symbol_table_views)
+                        <= fst._api._SYMBOL_TABLE_VIEW_CACHE_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
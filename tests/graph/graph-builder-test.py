@@ -0,0 +1,92 @@
+import shutil
+import tempfile
+import unittest
+
+from kaldi.base.io import istringstream
+from kaldi import fstext as fst
+from kaldi.fstext import properties
+from kaldi.graph import GraphBuilder
+from kaldi.hmm import HmmTopology, TransitionModel
+from kaldi.tree import monophone_context_dependency
+
+TOPO = """<Topology>
+<TopologyEntry>
+<ForPhones> 1 2 </ForPhones>
+<State> 0 <PdfClass> 0
+<Transition> 0 0.5
+<Transition> 1 0.5
+</State>
+<State> 1 <PdfClass> 1
+<Transition> 1 0.5
+<Transition> 2 0.5
+</State>
+<State> 2 <PdfClass> 2
+<Transition> 2 0.5
+<Transition> 3 0.5
+</State>
+<State> 3 </State>
+</TopologyEntry>
+</Topology>
+"""
+
+
+def make_fst(num_states, arcs, finals):
+    ofst = fst.StdVectorFst()
+    for _ in range(num_states):
+        ofst.add_state()
+    ofst.set_start(0)
+    for state, ilabel, olabel, weight, nextstate in arcs:
+        ofst.add_arc(state, fst.StdArc(ilabel, olabel,
+                                       fst.TropicalWeight(weight), nextstate))
+    for state in finals:
+        ofst.set_final(state)
+    return ofst
+
+
+class TestGraphBuilder(unittest.TestCase):
+
+    def setUp(self):
+        topo = HmmTopology()
+        topo.read(istringstream.from_str(TOPO), False)
+        self.tree = monophone_context_dependency(
+            [1, 2], topo.get_phone_to_num_pdf_classes())
+        self.trans_model = TransitionModel.from_topo(self.tree, topo)
+        # Word 1 is pronounced "1", word 2 is pronounced "2 1".
+        self.lexicon = make_fst(2, [(0, 1, 1, 0.0, 0), (0, 2, 2, 0.0, 1),
+                                    (1, 1, 0, 0.0, 0)], [0])
+        # Arcs are deliberately not sorted on input labels.
+        self.grammar = make_fst(1, [(0, 2, 2, 1.0, 0), (0, 1, 1, 0.5, 0)],
+                                [0])
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def builder(self, cache_dir=None):
+        return GraphBuilder(self.trans_model, self.tree, self.lexicon, [3],
+                            cache_dir=cache_dir, const=False)
+
+    def test_clg_is_ilabel_sorted(self):
+        clg, ilabels = self.builder().make_clg(self.grammar)
+        self.assertTrue(clg.properties(properties.I_LABEL_SORTED, True))
+        self.assertTrue(len(ilabels) > 0)
+
+    def test_make_hclg(self):
+        hclg = self.builder().make_hclg(self.grammar)
+        self.assertTrue(hclg.num_states() > 0)
+        olabels = set(arc.olabel for state in hclg.states()
+                      for arc in hclg.arcs(state))
+        self.assertEqual(olabels - {0}, {1, 2})
+
+        sorted_grammar = self.grammar.copy().arcsort("ilabel")
+        expected = self.builder().make_hclg(sorted_grammar)
+        self.assertTrue(fst.equal(hclg, expected))
+
+    def test_cached_hclg(self):
+        hclg = self.builder(self.cache_dir).make_hclg(self.grammar)
+        cached = self.builder(self.cache_dir).make_hclg(self.grammar)
+        self.assertTrue(fst.equal(hclg, cached))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+
+import numpy as np
+
+from kaldi.gmm import DiagGmm, FullGmm
+from kaldi.hmm import Posterior
+from kaldi.ivector import (IvectorExtractor, IvectorExtractorOptions,
+                           IvectorExtractorUtteranceStats)
+from kaldi.ivector.extraction import BatchIvectorExtractor, gmm_posteriors
+from kaldi.matrix import DoubleVector, Matrix, Vector
+from kaldi.matrix.packed import DoubleSpMatrix
+
+DIM, NUM_GAUSS, IVECTOR_DIM = 3, 6, 4
+
+
+def make_models(rng):
+    """Returns a random diagonal UBM, full UBM and i-vector extractor."""
+    dgmm = DiagGmm(NUM_GAUSS, DIM)
+    weights = rng.uniform(0.5, 1.0, NUM_GAUSS)
+    dgmm.set_weights(Vector(weights / weights.sum()))
+    means = rng.randn(NUM_GAUSS, DIM).astype(np.float32)
+    inv_vars = np.exp(rng.randn(NUM_GAUSS, DIM)).astype(np.float32)
+    dgmm.set_inv_vars_and_means(Matrix(inv_vars), Matrix(means))
+    dgmm.compute_gconsts()
+    fgmm = FullGmm().copy(dgmm)
+    opts = IvectorExtractorOptions()
+    opts.ivector_dim = IVECTOR_DIM
+    opts.use_weights = False
+    return dgmm, fgmm, IvectorExtractor(opts, fgmm)
+
+
+def reference_posteriors(feats, dgmm, fgmm, num_gselect, min_post):
+    """Computes posteriors as gmm-gselect and fgmm-global-gselect-to-post."""
+    post = []
+    for t in range(feats.num_rows):
+        _, gselect = dgmm.gaussian_selection(feats[t], num_gselect)
+        loglikes = fgmm.log_likelihoods_preselect(feats[t], gselect).numpy()
+        probs = np.exp(loglikes - loglikes.max())
+        probs /= probs.sum()
+        pruned = np.where(probs < min_post, 0.0, probs)
+        if pruned.sum() == 0.0:
+            pruned[np.argmax(probs)] = 1.0
+        pruned /= pruned.sum()
+        post.append([(g, p) for g, p in zip(gselect, pruned) if p != 0.0])
+    return post
+
+
+def reference_ivector(extractor, feats, post):
+    """Extracts an i-vector as ivector-extract."""
+    stats = IvectorExtractorUtteranceStats(extractor.num_gauss(),
+                                           extractor.feat_dim(), False)
+    stats.acc_stats(feats, post)
+    mean = DoubleVector(extractor.ivector_dim())
+    mean[0] = extractor.prior_offset()
+    var = DoubleSpMatrix(extractor.ivector_dim())
+    extractor.get_ivector_distribution(stats, mean, var)
+    mean[0] -= extractor.prior_offset()
+    return mean.numpy()
+
+
+def as_dicts(post):
+    return [dict(frame) for frame in post]
+
+
+class TestBatchIvectorExtractor(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.dgmm, self.fgmm, self.extractor = make_models(rng)
+        self.feats = [Matrix(rng.randn(n, DIM).astype(np.float32))
+                      for n in (1, 20, 50)]
+
+    def assertPosteriorsClose(self, post, expected):
+        self.assertEqual(len(post), len(expected))
+        for frame, expected_frame in zip(as_dicts(post), as_dicts(expected)):
+            self.assertEqual(sorted(frame), sorted(expected_frame))
+            for g, p in frame.items():
+                self.assertAlmostEqual(p, expected_frame[g], places=4)
+
+    def test_gmm_posteriors(self):
+        for feats in self.feats:
+            for num_gselect, min_post in ((3, 0.025), (NUM_GAUSS, 0.0),
+                                          (2, 0.9)):
+                post, _ = gmm_posteriors(feats, self.dgmm, self.fgmm,
+                                         num_gselect, min_post)
+                self.assertPosteriorsClose(
+                    post.get_posteriors(),
+                    reference_posteriors(feats, self.dgmm, self.fgmm,
+                                         num_gselect, min_post))
+                post, _ = gmm_posteriors(feats.numpy(), self.dgmm, None,
+                                         num_gselect, min_post)
+                self.assertPosteriorsClose(
+                    post.get_posteriors(),
+                    reference_posteriors(feats, self.dgmm, self.dgmm,
+                                         num_gselect, min_post))
+
+    def test_extract_batch(self):
+        posts = [reference_posteriors(feats, self.dgmm, self.fgmm, 3, 0.025)
+                 for feats in self.feats]
+        expected = [reference_ivector(self.extractor, feats, post)
+                    for feats, post in zip(self.feats, posts)]
+        for num_threads in (1, 3):
+            extractor = BatchIvectorExtractor(
+                self.extractor, self.dgmm, self.fgmm, num_gselect=3,
+                compute_objf_change=True, num_threads=num_threads,
+                max_pending=1)
+            utterances = [("utt{}".format(i), feats)
+                          for i, feats in enumerate(self.feats)]
+            outputs = list(extractor.extract_batch(utterances))
+            self.assertEqual([key for key, _ in outputs],
+                             [key for key, _ in utterances])
+            for (_, ivector), ref in zip(outputs, expected):
+                self.assertEqual(ivector.dtype, np.float32)
+                self.assertTrue(np.allclose(ivector, ref, atol=1e-3))
+            self.assertEqual(extractor.num_done, len(self.feats))
+            self.assertAlmostEqual(extractor.tot_frames,
+                                   sum(f.num_rows for f in self.feats),
+                                   places=3)
+            self.assertGreaterEqual(extractor.tot_objf_change, 0.0)
+
+            # Given posteriors are used instead of the UBMs.
+            utterances = [("utt{}".format(i), feats, Posterior(post))
+                          for i, (feats, post)
+                          in enumerate(zip(self.feats, posts))]
+            for (_, ivector), ref in zip(
+                    extractor.extract_batch(utterances), expected):
+                self.assertTrue(np.allclose(ivector, ref, atol=1e-3))
+
+    def test_failures(self):
+        # Posteriors are required without UBMs.
+        extractor = BatchIvectorExtractor(self.extractor, num_threads=1)
+        with self.assertRaises(RuntimeError):
+            extractor.extract(self.feats[0])
+        post = Posterior([[(0, 1.0)]] * self.feats[0].num_rows)
+        self.assertEqual(extractor.extract(self.feats[0], post).shape,
+                         (IVECTOR_DIM,))
+        outputs = list(extractor.extract_batch([("bad", self.feats[1])]))
+        self.assertEqual(outputs, [("bad", None)])
+        self.assertEqual(extractor.num_failed, 1)
+        self.assertEqual(extractor.num_done, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import math
+import unittest
+
+import numpy as np
+
+from kaldi.ivector import agglomerative_cluster
+from kaldi.ivector.clustering import (DenseCosts, nn_chain_cluster,
+                                      scalable_agglomerative_cluster)
+from kaldi.matrix import Matrix
+
+
+def random_costs(rng, n):
+    """Returns a random symmetric cost matrix."""
+    costs = rng.randn(n, n).astype(np.float32)
+    costs += costs.T
+    np.fill_diagonal(costs, 0.0)
+    return costs
+
+
+def reference_cluster(sums, sizes, thresh, min_clust):
+    """Clusters inputs with greedy average-linkage merges.
+
+    Output clusters are numbered like those of `agglomerative_cluster`.
+    """
+    n = len(sizes)
+    members = {i: [i] for i in range(n)}
+    size = {i: float(sizes[i]) for i in range(n)}
+    cost_sums = {frozenset((i, j)): float(sums[min(i, j), max(i, j)])
+                 for i in range(n) for j in range(n) if i != j}
+    next_id = n
+    while len(members) > min_clust:
+        pair = min(cost_sums, key=lambda p: (
+            cost_sums[p] / np.prod([size[i] for i in p]), sorted(p)))
+        i, j = sorted(pair)
+        if cost_sums[pair] / (size[i] * size[j]) > thresh:
+            break
+        del cost_sums[pair]
+        members[next_id] = members.pop(i) + members.pop(j)
+        size[next_id] = size.pop(i) + size.pop(j)
+        for k in members:
+            if k != next_id:
+                cost_sums[frozenset((next_id, k))] = (
+                    cost_sums.pop(frozenset((i, k)))
+                    + cost_sums.pop(frozenset((j, k))))
+        next_id += 1
+    labels = [0] * n
+    for label, cluster in enumerate(sorted(members)):
+        for i in members[cluster]:
+            labels[i] = label
+    return labels
+
+
+def reference_two_pass(costs, thresh, min_clust, first_pass_max_points):
+    """Clusters points in two passes, as in `agglomerative-cluster`."""
+    n = len(costs)
+    num_subsets = int(math.ceil(n / float(first_pass_max_points)))
+    subset_size = int(math.ceil(n / float(num_subsets)))
+    assignments, num_clusters = [], 0
+    for begin in range(0, n, subset_size):
+        end = min(begin + subset_size, n)
+        labels = agglomerative_cluster(Matrix(costs[begin:end, begin:end]),
+                                       thresh, 10 * min_clust)
+        assignments += [label + num_clusters for label in labels]
+        num_clusters += max(labels) + 1
+    assignments = np.array(assignments)
+    onehot = np.eye(num_clusters)[assignments]
+    sums = onehot.T.dot(costs.astype(np.float64)).dot(onehot)
+    sizes = np.bincount(assignments)
+    labels = np.array(reference_cluster(sums, sizes, thresh, min_clust))
+    return labels[assignments].tolist()
+
+
+class TestClustering(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+
+    def test_nn_chain_cluster(self):
+        for n in (1, 2, 5, 30):
+            costs = random_costs(self.rng, n)
+            for thresh in (-1.0, 0.0, 0.5, 1.0, 100.0):
+                for min_clust in (1, 2, 5):
+                    expected = agglomerative_cluster(Matrix(costs), thresh,
+                                                     min_clust)
+                    self.assertEqual(nn_chain_cluster(costs, thresh,
+                                                      min_clust),
+                                     expected)
+                    self.assertEqual(scalable_agglomerative_cluster(
+                        costs, thresh, min_clust), expected)
+        self.assertEqual(nn_chain_cluster(np.zeros((0, 0)), 0.0), [])
+
+    def test_nn_chain_cluster_sizes(self):
+        for n in (3, 20):
+            sums = random_costs(self.rng, n)
+            sizes = self.rng.randint(1, 5, n)
+            for thresh in (-1.0, 0.0, 1.0, 100.0):
+                for min_clust in (1, 3):
+                    self.assertEqual(
+                        nn_chain_cluster(sums, thresh, min_clust, sizes),
+                        reference_cluster(sums, sizes, thresh, min_clust))
+
+    def test_two_pass(self):
+        costs = random_costs(self.rng, 60)
+        for first_pass_max_points in (7, 25):
+            for thresh in (-0.5, 0.0, 0.5, 100.0):
+                for min_clust in (1, 2):
+                    expected = reference_two_pass(costs, thresh, min_clust,
+                                                  first_pass_max_points)
+                    for chunk_size in (4, 4096):
+                        self.assertEqual(scalable_agglomerative_cluster(
+                            DenseCosts(costs), thresh, min_clust,
+                            first_pass_max_points, chunk_size), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+import numpy as np
+
+from kaldi.base.io import istringstream
+from kaldi.ivector import Plda, PldaConfig
+from kaldi.ivector.scoring import PldaScorer
+from kaldi.matrix import DoubleVector
+
+
+def make_plda(rng, dim):
+    """Returns a random PLDA model."""
+    def vector(v):
+        return "[ " + " ".join(repr(float(x)) for x in v) + " ]"
+
+    mean = rng.randn(dim)
+    transform = rng.randn(dim, dim) + 3.0 * np.eye(dim)
+    psi = np.sort(rng.uniform(0.1, 5.0, dim))[::-1]
+    text = "<Plda> {} [\n{} ]\n{} </Plda>".format(
+        vector(mean), "\n".join(" ".join(repr(float(x)) for x in row)
+                                for row in transform), vector(psi))
+    plda = Plda()
+    plda.read(istringstream.from_str(text), False)
+    return plda
+
+
+class TestPldaScorer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.plda = make_plda(rng, 5)
+        self.ivectors = rng.randn(7, 5)
+        self.counts = np.array([1, 2, 3, 1, 4, 1, 1])
+
+    def reference_transform(self, config, ivector, num_examples):
+        transformed = DoubleVector(len(ivector))
+        self.plda.transform_ivector(config, DoubleVector(ivector),
+                                    num_examples, transformed)
+        return transformed.numpy()
+
+    def test_transform_ivectors(self):
+        for normalize_length in (True, False):
+            for simple_length_norm in (True, False):
+                config = PldaConfig()
+                config.normalize_length = normalize_length
+                config.simple_length_norm = simple_length_norm
+                scorer = PldaScorer(self.plda, config)
+                transformed = scorer.transform_ivectors(self.ivectors,
+                                                        self.counts)
+                for ivector, count, row in zip(self.ivectors, self.counts,
+                                               transformed):
+                    expected = self.reference_transform(config, ivector,
+                                                        int(count))
+                    self.assertTrue(np.allclose(row, expected))
+
+    def test_scores(self):
+        scorer = PldaScorer(self.plda)
+        enroll = scorer.transform_ivectors(self.ivectors[:3],
+                                           self.counts[:3])
+        test = scorer.transform_ivectors(self.ivectors[3:])
+        expected = np.array([[self.plda.log_likelihood_ratio(
+            DoubleVector(e), int(n), DoubleVector(t)) for t in test]
+            for e, n in zip(enroll, self.counts[:3])])
+
+        scores = scorer.score_matrix(enroll, test, self.counts[:3],
+                                     chunk_size=2, dtype=np.float64)
+        self.assertEqual(scores.shape, (3, 4))
+        self.assertTrue(np.allclose(scores, expected))
+
+        enroll_indices = np.array([0, 2, 1, 2, 0])
+        test_indices = np.array([3, 0, 1, 1, 2])
+        trials = scorer.score_trials(enroll, test, enroll_indices,
+                                     test_indices, self.counts[:3],
+                                     chunk_size=2, dtype=np.float64)
+        self.assertTrue(np.allclose(trials,
+                                    expected[enroll_indices, test_indices]))
+
+        with self.assertRaises(ValueError):
+            scorer.score_trials(enroll, test, [0, 1], [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from kaldi import fstext as fst
+from kaldi import kws
+from kaldi.kws.index import ShardedKwsIndex
+from kaldi.util.table import CompactLatticeWriter
+
+# Word sequences of lattice paths with their acoustic costs.
+UTTERANCES = [
+    ("utt1", [([1, 2], 1.0), ([1, 3], 2.0)]),
+    ("utt2", [([2, 3], 0.5)]),
+    ("utt3", [([3, 1, 2], 1.0), ([2, 1, 2], 1.5)]),
+    ("utt4", [([4], 0.0)]),
+    ("utt5", [([1], 0.0), ([2], 0.2)]),
+]
+
+KEYWORDS = [("kw1", [1]), ("kw2", [2]), ("kw3", [1, 2]), ("kw4", [3, 1]),
+            ("kw5", [5])]
+
+
+def make_lattice(paths):
+    """Returns a word-aligned lattice with a path for each word sequence.
+
+    Each word lasts three frames.
+    """
+    clat = fst.CompactLatticeVectorFst()
+    start = clat.add_state()
+    clat.set_start(start)
+    for words, cost in paths:
+        state = start
+        for i, word in enumerate(words):
+            next_state = clat.add_state()
+            clat.add_arc(state, fst.CompactLatticeArc(
+                word, word, fst.CompactLatticeWeight(
+                    (0.0, cost if i == 0 else 0.0), [word] * 3),
+                next_state))
+            state = next_state
+        clat.set_final(state, fst.CompactLatticeWeight((0.0, 0.0), []))
+    return clat
+
+
+def make_keyword(words):
+    keyword = fst.StdVectorFst()
+    state = keyword.add_state()
+    keyword.set_start(state)
+    for word in words:
+        next_state = keyword.add_state()
+        keyword.add_arc(state, fst.StdArc(word, word,
+                                          fst.TropicalWeight.one(),
+                                          next_state))
+        state = next_state
+    keyword.set_final(state)
+    return keyword
+
+
+def reference_search(utterances):
+    """Searches keywords in a single index built one lattice at a time."""
+    index = fst.KwsIndexVectorFst()
+    keys = {}
+    for i, (key, paths) in enumerate(utterances):
+        keys[i + 1] = key
+        clat = make_lattice(paths)
+        index.union(kws.lattice_to_kws_index(clat, i + 1))
+    kws.optimize_kws_index(index)
+    encode_table = fst.KwsIndexEncodeTable(fst.ENCODE_LABELS)
+    kws.encode_kws_disambiguation_symbols(index, encode_table)
+    return {kwid: normalize_hits(
+                [(keys[utt], begin, end, score) for utt, begin, end, score
+                 in kws.search_kws_index(index, make_keyword(words),
+                                         encode_table)])
+            for kwid, words in KEYWORDS}
+
+
+def normalize_hits(hits):
+    return sorted((key, begin, end, round(score, 3))
+                  for key, begin, end, score in hits)
+
+
+class TestShardedKwsIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.rspecifier = "ark:" + self.path("lat.ark")
+        with CompactLatticeWriter(self.rspecifier) as writer:
+            for key, paths in UTTERANCES:
+                writer[key] = make_lattice(paths)
+        self.keywords = [(kwid, make_keyword(words))
+                         for kwid, words in KEYWORDS]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def check_search(self, index, expected, num_workers):
+        for batch_size in (1, 2, 100):
+            results = list(index.search(self.keywords, batch_size=batch_size,
+                                        num_workers=num_workers))
+            self.assertEqual([kwid for kwid, _ in results],
+                             [kwid for kwid, _ in KEYWORDS])
+            for kwid, hits in results:
+                scores = [score for _, _, _, score in hits]
+                self.assertEqual(scores, sorted(scores))
+                self.assertEqual(normalize_hits(hits), expected[kwid])
+
+    def test_build_and_search(self):
+        expected = reference_search(UTTERANCES)
+        self.assertTrue(expected["kw3"])
+        self.assertFalse(expected["kw5"])
+        for num_shards in (1, 2, 4):
+            for num_workers in (1, 2):
+                index = ShardedKwsIndex.build(
+                    self.rspecifier, num_shards=num_shards, chunk_size=2,
+                    num_workers=num_workers)
+                self.assertEqual(len(index.shards), num_shards)
+                self.assertEqual(index.utterance_ids,
+                                 {key: i + 1 for i, (key, _)
+                                  in enumerate(UTTERANCES)})
+                self.check_search(index, expected, num_workers)
+
+    def test_n_best(self):
+        index = ShardedKwsIndex.build(self.rspecifier, num_shards=2,
+                                      chunk_size=1, num_workers=1)
+        expected = reference_search(UTTERANCES)
+        for kwid, hits in index.search(self.keywords, n_best=1,
+                                       num_workers=1):
+            self.assertEqual(len(hits), min(len(expected[kwid]), 1))
+            if hits:
+                self.assertEqual(round(hits[0][3], 3),
+                                 min(hit[3] for hit in expected[kwid]))
+
+    def test_utterance_ids(self):
+        utterance_ids = {"utt1": 10, "utt3": 30}
+        index = ShardedKwsIndex.build(self.rspecifier, num_shards=2,
+                                      utterance_ids=utterance_ids,
+                                      num_workers=1)
+        self.assertEqual(index.utterance_ids, utterance_ids)
+        for kwid, hits in index.search(self.keywords, num_workers=1):
+            self.assertTrue(set(key for key, _, _, _ in hits)
+                            <= set(utterance_ids))
+
+    def test_write_and_read(self):
+        index = ShardedKwsIndex.build(self.rspecifier, num_shards=3,
+                                      chunk_size=1, num_workers=1)
+        index.write("ark:" + self.path("index.ark"), self.path("utt.map"))
+        index = ShardedKwsIndex.read("ark:" + self.path("index.ark"),
+                                     self.path("utt.map"))
+        self.assertEqual(len(index.shards), 3)
+        self.check_search(index, reference_search(UTTERANCES), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from kaldi import fstext as fst
+from kaldi.lat.columnar import ColumnarLatticeReader, ColumnarLatticeWriter
+
+
+def make_lattice(costs):
+    """Returns a compact lattice with two word arcs and a word-final state.
+
+    State times are 0, 2 and 5.
+    """
+    clat = fst.CompactLatticeVectorFst()
+    s0, s1, s2 = clat.add_state(), clat.add_state(), clat.add_state()
+    clat.set_start(s0)
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        1, 1, fst.CompactLatticeWeight(costs[0], [1, 2]), s1))
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        2, 2, fst.CompactLatticeWeight(costs[1], [3, 3]), s1))
+    clat.add_arc(s1, fst.CompactLatticeArc(
+        3, 3, fst.CompactLatticeWeight(costs[2], [1, 2, 3]), s2))
+    clat.set_final(s2, fst.CompactLatticeWeight(costs[3], []))
+    return clat
+
+
+class TestColumnarLattices(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.costs = [(0.5, 1.0), (1.5, 2.0), (0.0, 3.5), (1.0, 0.0)]
+        self.lattices = [("a", make_lattice(self.costs)),
+                         ("empty", fst.CompactLatticeVectorFst()),
+                         ("b", make_lattice(self.costs[::-1]))]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, quantization=None):
+        with ColumnarLatticeWriter(self.path, quantization) as writer:
+            for key, clat in self.lattices:
+                writer[key] = clat
+        return ColumnarLatticeReader(self.path)
+
+    def assertArraysEqual(self, expected, actual):
+        self.assertEqual(sorted(expected), sorted(actual))
+        for name, value in expected.items():
+            self.assertTrue(np.array_equal(value, actual[name]), name)
+
+    def test_round_trip(self):
+        reader = self.write()
+        self.assertEqual(reader.keys(), ["a", "empty", "b"])
+        for key, clat in self.lattices:
+            self.assertArraysEqual(clat.to_arrays(),
+                                   reader.read(key).to_arrays())
+        self.assertEqual(reader.state_times("a")[0], 5)
+        self.assertEqual(reader.state_times("a")[1].tolist(), [0, 2, 5])
+        arrays = reader.arrays("a")
+        self.assertEqual(arrays["num_frames"], 5)
+        self.assertEqual(arrays["state_times"].tolist(), [0, 2, 5])
+
+    def test_quantization(self):
+        reader = self.write(quantization=0.5)
+        for key, clat in self.lattices:
+            self.assertArraysEqual(clat.to_arrays(),
+                                   reader.read(key).to_arrays())
+
+        reader = self.write(quantization=2.0)
+        weight = reader.arrays("a")["weight"]
+        expected = 2.0 * np.rint(np.array(self.costs[:3]) / 2.0)
+        self.assertTrue(np.allclose(weight, expected))
+
+    def test_without_strings(self):
+        reader = self.write()
+        arrays = reader.arrays("a", strings=False)
+        self.assertNotIn("string", arrays)
+        self.assertNotIn("final_string_offsets", arrays)
+        expected = self.lattices[0][1].to_arrays()
+        for name in ("src", "dst", "ilabel", "olabel", "weight",
+                     "final_state", "final_weight"):
+            self.assertTrue(np.array_equal(arrays[name], expected[name]))
+        clat = reader.read("a", strings=False)
+        for state in clat.states():
+            for arc in clat.arcs(state):
+                self.assertEqual(arc.weight.string, [])
+
+    def test_empty_lattice(self):
+        reader = self.write()
+        clat = reader.read("empty")
+        self.assertEqual(clat.num_states(), 0)
+        self.assertEqual(clat.start(), fst.NO_STATE_ID)
+        self.assertEqual(reader.state_times("empty")[0], 0)
+        self.assertEqual(len(reader.arrays("empty")["src"]), 0)
+        # Lattices after the empty one are not affected.
+        self.assertArraysEqual(self.lattices[2][1].to_arrays(),
+                               reader.read("b").to_arrays())
+
+    def test_string_table(self):
+        self.write().close()
+        string_ends = np.fromfile(os.path.join(self.path, "string_ends.bin"),
+                                  dtype=np.int64)
+        # Empty string and three distinct strings shared by both lattices.
+        self.assertEqual(string_ends.tolist(), [0, 2, 4, 7])
+
+    def test_close(self):
+        with self.write() as reader:
+            clat = reader.read("a")
+        self.assertArraysEqual(self.lattices[0][1].to_arrays(),
+                               clat.to_arrays())
+        with self.assertRaises(ValueError):
+            reader.read("a")
+        with self.assertRaises(ValueError):
+            reader.state_times("a")
+
+
+if __name__ == '__main__':
+    unittest.main()
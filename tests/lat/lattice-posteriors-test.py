@@ -0,0 +1,62 @@
+import math
+import unittest
+
+import numpy as np
+
+from kaldi import fstext as fst
+from kaldi.lat.functions import (compact_lattice_nbest,
+                                 lattice_posterior_arrays,
+                                 word_frame_posteriors)
+
+
+def make_lattice():
+    """Returns a two-word compact lattice where word 1 has lower cost."""
+    clat = fst.CompactLatticeVectorFst()
+    s0, s1 = clat.add_state(), clat.add_state()
+    clat.set_start(s0)
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        1, 1, fst.CompactLatticeWeight((0.0, 0.5), [1, 1]), s1))
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        2, 2, fst.CompactLatticeWeight((1.0, 0.5), [2, 2]), s1))
+    clat.set_final(s1, fst.CompactLatticeWeight((0.0, 0.0), []))
+    return clat
+
+
+class TestLatticePosteriors(unittest.TestCase):
+
+    def test_posterior_arrays(self):
+        out = lattice_posterior_arrays(make_lattice())
+        p1 = 1.0 / (1.0 + math.exp(-1.0))
+        self.assertEqual(out["num_frames"], 2)
+        self.assertEqual(out["state_times"].tolist(), [0, 2])
+        self.assertTrue(np.allclose(out["arc_posteriors"], [p1, 1.0 - p1]))
+        self.assertTrue(np.allclose(out["final_posteriors"], [0.0, 1.0]))
+        self.assertAlmostEqual(out["total_prob"],
+                               math.log(math.exp(-0.5) + math.exp(-1.5)))
+
+    def test_word_frame_posteriors(self):
+        frames, labels, posteriors = word_frame_posteriors(make_lattice())
+        p1 = 1.0 / (1.0 + math.exp(-1.0))
+        self.assertEqual(frames.tolist(), [0, 0, 1, 1])
+        self.assertEqual(labels.tolist(), [1, 2, 1, 2])
+        self.assertTrue(np.allclose(posteriors, [p1, 1 - p1, p1, 1 - p1]))
+
+    def test_empty_lattice(self):
+        clat = fst.CompactLatticeVectorFst()
+        out = lattice_posterior_arrays(clat)
+        self.assertEqual(out["num_frames"], 0)
+        self.assertEqual(out["total_prob"], -float("inf"))
+        for key in ("state_times", "alphas", "betas", "arc_posteriors",
+                    "final_posteriors"):
+            self.assertEqual(len(out[key]), 0)
+
+        frames, labels, posteriors = word_frame_posteriors(clat)
+        self.assertEqual(len(frames), 0)
+        self.assertEqual(len(posteriors), 0)
+
+        nbest = compact_lattice_nbest(clat, 2)
+        self.assertEqual(len(nbest["word_posteriors"]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from kaldi import fstext as fst
+from kaldi.fstext.utils import lattice_scale, scale_compact_lattice
+from kaldi.lat.functions import add_word_ins_pen_to_compact_lattice
+from kaldi.lat.sausages import (MinimumBayesRisk, MinimumBayesRiskOptions,
+                                mbr_decode_table)
+from kaldi.util.table import CompactLatticeWriter
+
+
+def make_lattice(costs):
+    """Returns a two-word compact lattice with competing first words."""
+    clat = fst.CompactLatticeVectorFst()
+    s0, s1, s2 = clat.add_state(), clat.add_state(), clat.add_state()
+    clat.set_start(s0)
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        1, 1, fst.CompactLatticeWeight(costs[0], [1, 1, 1]), s1))
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        2, 2, fst.CompactLatticeWeight(costs[1], [2, 2]), s1))
+    clat.add_arc(s1, fst.CompactLatticeArc(
+        3, 3, fst.CompactLatticeWeight((0.5, 1.0), [3, 3, 3, 3]), s2))
+    clat.set_final(s2, fst.CompactLatticeWeight((0.0, 0.0), [4]))
+    return clat
+
+
+class TestMbrDecodeTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.lattices = [
+            ("utt1", make_lattice([(0.0, 1.0), (1.0, 2.0)])),
+            ("utt2", make_lattice([(2.0, 1.0), (0.5, 0.5)])),
+            ("utt3", make_lattice([(1.0, 1.0), (1.0, 1.5)])),
+        ]
+        self.rspecifier = "ark:" + os.path.join(self.tmpdir, "lat.ark")
+        with CompactLatticeWriter(self.rspecifier) as writer:
+            for key, clat in self.lattices:
+                writer[key] = clat
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def expected_output(self, clat, acoustic_scale, word_ins_penalty):
+        clat = fst.CompactLatticeVectorFst(clat)
+        scale_compact_lattice(lattice_scale(1.0, acoustic_scale), clat)
+        add_word_ins_pen_to_compact_lattice(word_ins_penalty, clat)
+        mbr = MinimumBayesRisk(clat, MinimumBayesRiskOptions())
+        return {
+            "words": mbr.get_one_best(),
+            "times": mbr.get_one_best_times(),
+            "confidences": mbr.get_one_best_confidences(),
+            "bayes_risk": mbr.get_bayes_risk(),
+        }
+
+    def test_mbr_decode_table(self):
+        for acoustic_scale, word_ins_penalty in ((1.0, 0.0), (0.5, 1.0)):
+            expected = [
+                (key, self.expected_output(clat, acoustic_scale,
+                                           word_ins_penalty))
+                for key, clat in self.lattices]
+            for num_workers in (1, 2):
+                for max_pending in (None, 1):
+                    outputs = list(mbr_decode_table(
+                        self.rspecifier, acoustic_scale=acoustic_scale,
+                        word_ins_penalty=word_ins_penalty, prune_beam=10.0,
+                        num_workers=num_workers, max_pending=max_pending))
+                    self.assertEqual([key for key, _ in outputs],
+                                     [key for key, _ in expected])
+                    for (_, out), (_, ref) in zip(outputs, expected):
+                        self.assertEqual(out["words"].tolist(), ref["words"])
+                        self.assertTrue(np.allclose(
+                            out["times"], np.reshape(ref["times"], (-1, 2))))
+                        self.assertTrue(np.allclose(out["confidences"],
+                                                    ref["confidences"]))
+                        self.assertAlmostEqual(out["bayes_risk"],
+                                               ref["bayes_risk"], places=5)
+
+    def test_ctm_output(self):
+        ctm = os.path.join(self.tmpdir, "ctm")
+        symbols = fst.SymbolTable()
+        symbols.add_symbol("<eps>")
+        for word in ("one", "two", "three"):
+            symbols.add_symbol(word)
+        outputs = dict(mbr_decode_table(self.rspecifier, ctm_wxfilename=ctm,
+                                        symbols=symbols, frame_shift=0.1,
+                                        num_workers=1))
+        with open(ctm) as f:
+            lines = [line.split() for line in f]
+        expected = []
+        for key, _ in self.lattices:
+            out = outputs[key]
+            for word, (begin, end), conf in zip(out["words"], out["times"],
+                                                out["confidences"]):
+                expected.append([key, "1", "{:.2f}".format(begin * 0.1),
+                                 "{:.2f}".format((end - begin) * 0.1),
+                                 symbols.find_symbol(int(word)),
+                                 "{:.2f}".format(conf)])
+        self.assertEqual(lines, expected)
+        self.assertEqual(len(lines), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import math
+import unittest
+
+import numpy as np
+
+from kaldi import fstext as fst
+from kaldi.lat.functions import (compact_lattice_nbest,
+                                 compact_lattice_nbest_batch)
+
+
+def make_lattice():
+    """Returns a one-word compact lattice with two competing words."""
+    clat = fst.CompactLatticeVectorFst()
+    s0, s1 = clat.add_state(), clat.add_state()
+    clat.set_start(s0)
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        1, 1, fst.CompactLatticeWeight((0.0, 0.5), [1, 1]), s1))
+    clat.add_arc(s0, fst.CompactLatticeArc(
+        2, 2, fst.CompactLatticeWeight((1.0, 0.5), [2, 2]), s1))
+    clat.set_final(s1, fst.CompactLatticeWeight((0.0, 0.0), []))
+    return clat
+
+
+class TestNbest(unittest.TestCase):
+
+    def test_nbest(self):
+        out = compact_lattice_nbest(make_lattice(), 3)
+        p1 = 1.0 / (1.0 + math.exp(-1.0))
+        self.assertEqual(out["offsets"].tolist(), [0, 1, 2])
+        self.assertEqual(out["words"].tolist(), [1, 2])
+        self.assertTrue(np.allclose(out["costs"], [[0.0, 0.5], [1.0, 0.5]]))
+        self.assertEqual(out["begin_frames"].tolist(), [0, 0])
+        self.assertEqual(out["end_frames"].tolist(), [2, 2])
+        self.assertTrue(np.allclose(out["word_posteriors"], [p1, 1 - p1]))
+
+        out = compact_lattice_nbest(make_lattice(), 1, word_posteriors=False)
+        self.assertNotIn("word_posteriors", out)
+        self.assertEqual(out["words"].tolist(), [1])
+
+    def test_batch_does_not_modify_inputs(self):
+        lats = [make_lattice(), {"lattice": make_lattice()}]
+        before = [lats[0].to_arrays(), lats[1]["lattice"].to_arrays()]
+        out = compact_lattice_nbest_batch(lats, 2, acoustic_scale=2.0,
+                                          lm_scale=0.5)
+        after = [lats[0].to_arrays(), lats[1]["lattice"].to_arrays()]
+        for x, y in zip(before, after):
+            self.assertTrue(np.array_equal(x["weight"], y["weight"]))
+        self.assertEqual(out["lattice_offsets"].tolist(), [0, 2, 4])
+        self.assertEqual(out["offsets"].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(out["words"].tolist(), [1, 2, 1, 2])
+        self.assertTrue(np.allclose(out["costs"][:2],
+                                    [[0.0, 1.0], [0.5, 1.0]]))
+
+    def test_empty_batch(self):
+        out = compact_lattice_nbest_batch([])
+        self.assertEqual(out["lattice_offsets"].tolist(), [0])
+        self.assertEqual(len(out["words"]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
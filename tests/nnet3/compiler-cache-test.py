@@ -0,0 +1,96 @@
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+
+from kaldi.base.io import istringstream, ostringstream
+from kaldi.matrix import Matrix, Vector
+from kaldi.nnet3 import *
+from kaldi.nnet3 import compiler_cache
+
+CONFIG = """input-node name=input dim=4
+component name=affine type=AffineComponent input-dim=12 output-dim=5
+component-node name=affine component=affine input=Append(Offset(input, -1), input, Offset(input, 1))
+component name=logsoftmax type=LogSoftmaxComponent dim=5
+component-node name=logsoftmax component=logsoftmax input=affine
+output-node name=output input=logsoftmax
+"""
+
+
+def make_nnet():
+    nnet = Nnet()
+    nnet.read_config(istringstream.from_str(CONFIG))
+    return nnet
+
+
+def compile_computations(nnet, compiler):
+    """Compiles the computations of a short utterance."""
+    feats = Matrix(20, 4)
+    feats.set_randn_()
+    opts = NnetSimpleComputationOptions()
+    opts.frames_per_chunk = 8
+    decodable = DecodableNnetSimple(opts, nnet, Vector(), feats, compiler)
+    decodable.get_output_for_frame(0, Vector(5))
+
+
+def cache_bytes(compiler):
+    ostrm = ostringstream()
+    compiler.write_cache(ostrm, True)
+    return ostrm.to_bytes()
+
+
+class TestPersistentCompilerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.nnet = make_nnet()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_cache_key(self):
+        key = compiler_cache.compiler_cache_key(self.nnet)
+        self.assertEqual(key, compiler_cache.compiler_cache_key(make_nnet()))
+        self.assertNotEqual(key, compiler_cache.compiler_cache_key(
+            self.nnet, NnetOptimizeOptions()))
+
+    def test_save_and_load(self):
+        compiler = CachingOptimizingCompiler(self.nnet)
+        cache = compiler_cache.PersistentCompilerCache.for_nnet(
+            compiler, self.nnet, None, self.cache_dir, save_at_exit=False)
+        compile_computations(self.nnet, compiler)
+        self.assertTrue(cache.save())
+        self.assertFalse(cache.save())
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        compiler2 = CachingOptimizingCompiler(self.nnet)
+        cache2 = compiler_cache.PersistentCompilerCache.for_nnet(
+            compiler2, self.nnet, None, self.cache_dir, save_at_exit=False)
+        self.assertEqual(cache_bytes(compiler2), cache_bytes(compiler))
+        self.assertFalse(cache2.save())
+
+    def test_save_on_collection(self):
+        compiler = CachingOptimizingCompiler(self.nnet)
+        cache = compiler_cache.PersistentCompilerCache.for_nnet(
+            compiler, self.nnet, None, self.cache_dir)
+        self.assertIn(cache, compiler_cache._exit_caches)
+        compile_computations(self.nnet, compiler)
+        filename = cache.filename
+        del cache
+        gc.collect()
+        self.assertTrue(os.path.exists(filename))
+        self.assertEqual(len(compiler_cache._exit_caches), 0)
+
+    def test_unreadable_cache(self):
+        filename = os.path.join(self.cache_dir, "cache")
+        with open(filename, "wb") as f:
+            f.write(b"garbage")
+        compiler = CachingOptimizingCompiler(self.nnet)
+        cache = compiler_cache.PersistentCompilerCache(compiler, filename,
+                                                       save_at_exit=False)
+        self.assertFalse(cache.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
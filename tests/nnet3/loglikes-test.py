@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from kaldi.base.io import istringstream
+from kaldi.matrix import Matrix, Vector
+from kaldi.nnet3 import *
+from kaldi.util.table import SequentialMatrixReader
+
+CONFIG = """input-node name=input dim=4
+component name=affine type=AffineComponent input-dim=12 output-dim=5
+component-node name=affine component=affine input=Append(Offset(input, -1), input, Offset(input, 1))
+component name=logsoftmax type=LogSoftmaxComponent dim=5
+component-node name=logsoftmax component=logsoftmax input=affine
+output-node name=output input=logsoftmax
+"""
+
+
+def make_nnet():
+    nnet = Nnet()
+    nnet.read_config(istringstream.from_str(CONFIG))
+    return nnet
+
+
+def decodable_output(nnet, feats):
+    """Computes network outputs one frame at a time."""
+    opts = NnetSimpleComputationOptions()
+    opts.acoustic_scale = 1.0
+    compiler = CachingOptimizingCompiler(nnet)
+    decodable = DecodableNnetSimple(opts, nnet, Vector(), Matrix(feats),
+                                    compiler)
+    output = Matrix(decodable.num_frames(), decodable.output_dim())
+    for t in range(decodable.num_frames()):
+        decodable.get_output_for_frame(t, output[t])
+    return output.numpy()
+
+
+class TestComputeLoglikes(unittest.TestCase):
+
+    def setUp(self):
+        self.nnet = make_nnet()
+        rng = np.random.RandomState(0)
+        self.feats = [rng.randn(n, 4).astype(np.float32)
+                      for n in (7, 300, 1)]
+        self.expected = [decodable_output(self.nnet, f) for f in self.feats]
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_list_input(self):
+        outputs = compute_loglikes(make_nnet(), self.feats)
+        self.assertEqual(len(outputs), len(self.feats))
+        for output, expected in zip(outputs, self.expected):
+            self.assertTrue(np.allclose(output, expected, atol=1e-4))
+
+        posteriors = compute_loglikes(make_nnet(), self.feats[:1],
+                                      posteriors=True)
+        self.assertTrue(np.allclose(posteriors[0].sum(axis=1), 1.0,
+                                    atol=1e-4))
+
+    def test_table_input(self):
+        pairs = [("utt{}".format(i), f) for i, f in enumerate(self.feats)]
+        outputs = compute_loglikes(make_nnet(), pairs)
+        self.assertEqual(sorted(outputs), ["utt0", "utt1", "utt2"])
+        for i, expected in enumerate(self.expected):
+            self.assertTrue(np.allclose(outputs["utt{}".format(i)], expected,
+                                        atol=1e-4))
+
+        wspecifier = "ark:" + os.path.join(self.tmpdir, "loglikes.ark")
+        self.assertEqual(compute_loglikes(make_nnet(), pairs,
+                                          wspecifier=wspecifier), 3)
+        rspecifier = u"ark:" + os.path.join(self.tmpdir, "loglikes.ark")
+        with SequentialMatrixReader(rspecifier) as reader:
+            for (key, output), expected in zip(reader, self.expected):
+                self.assertTrue(np.allclose(output.numpy(), expected,
+                                            atol=1e-4))
+
+        with self.assertRaises(ValueError):
+            compute_loglikes(make_nnet(), self.feats, wspecifier=wspecifier)
+
+    def test_compiler_cache(self):
+        computer = NnetLoglikeComputer(make_nnet(),
+                                       compiler_cache_dir=self.tmpdir)
+        computer.compute(self.feats[1])
+        self.assertTrue(computer.compiler_cache.save())
+        computer = NnetLoglikeComputer(make_nnet(),
+                                       compiler_cache_dir=self.tmpdir)
+        self.assertFalse(computer.compiler_cache.save())
+
+
+if __name__ == '__main__':
+    unittest.main()
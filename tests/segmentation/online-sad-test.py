@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+
+from kaldi.base.io import istringstream
+from kaldi.matrix import Matrix, Vector
+from kaldi.nnet3 import Nnet
+from kaldi.segmentation import (NnetOnlineSAD, NnetSAD,
+                                SegmentationProcessor)
+
+CONFIG = """input-node name=input dim=3
+component name=logsoftmax type=LogSoftmaxComponent dim=3
+component-node name=logsoftmax component=logsoftmax input=input
+output-node name=output input=logsoftmax
+"""
+
+
+def make_model():
+    nnet = Nnet()
+    nnet.read_config(istringstream.from_str(CONFIG))
+    return nnet
+
+
+def make_features(labels):
+    """Returns logits strongly favouring the given SAD labels."""
+    feats = np.zeros((len(labels), 3), dtype=np.float32)
+    feats[np.arange(len(labels)), labels] = 10.0
+    return feats
+
+
+class TestNnetOnlineSAD(unittest.TestCase):
+
+    def setUp(self):
+        self.transform = NnetSAD.make_sad_transform(Vector([1.0, 1.0, 1.0]))
+        self.graph = NnetSAD.make_sad_graph(min_speech_duration=0.05)
+        # 0 is silence and 1 is speech.
+        self.feats = make_features([0] * 12 + [1] * 20 + [0] * 15 + [1] * 8
+                                   + [0] * 6)
+
+    def offline_segments(self):
+        sad = NnetSAD(make_model(), self.transform, self.graph)
+        out = sad.segment(Matrix(self.feats))
+        processor = SegmentationProcessor([2], segment_padding=0.0)
+        return processor.process(out["alignment"])[0]
+
+    def online_segments(self, chunk_size, lookahead):
+        sad = NnetOnlineSAD(make_model(), self.transform, self.graph,
+                            lookahead=lookahead)
+        segments = []
+        for begin in range(0, len(self.feats), chunk_size):
+            segments += sad.accept_features(
+                self.feats[begin:begin + chunk_size])
+        segments += sad.finalize_segmentation()
+        return segments
+
+    def test_online_matches_offline(self):
+        expected = self.offline_segments()
+        self.assertEqual(len(expected), 2)
+        for chunk_size in (1, 7, 100):
+            for lookahead in (0, 3, 50):
+                self.assertEqual(self.online_segments(chunk_size, lookahead),
+                                 expected)
+
+    def test_restart_at_end_of_stream(self):
+        # Without lookahead and model context every frame is finalized as
+        # soon as it is decoded, hence decoding is restarted in the trailing
+        # silence and no frames are left to decode at the end of the stream.
+        sad = NnetOnlineSAD(make_model(), self.transform, self.graph,
+                            lookahead=0)
+        segments = sad.accept_features(self.feats)
+        segments += sad.finalize_segmentation()
+        self.assertEqual(segments, self.offline_segments())
+
+    def test_default_target_labels(self):
+        sad1 = NnetOnlineSAD(make_model(), self.transform, self.graph)
+        sad2 = NnetOnlineSAD(make_model(), self.transform, self.graph)
+        self.assertEqual(sad1.target_labels, [2])
+        self.assertIsNot(sad1.target_labels, sad2.target_labels)
+
+
+if __name__ == '__main__':
+    unittest.main()
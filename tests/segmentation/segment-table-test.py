@@ -0,0 +1,99 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from kaldi.base.io import istringstream
+from kaldi.matrix import Matrix, Vector
+from kaldi.nnet3 import Nnet
+from kaldi.segmentation import NnetSAD, SegmentationProcessor, segment_table
+from kaldi.util.table import MatrixWriter
+
+CONFIG = """input-node name=input dim=3
+component name=logsoftmax type=LogSoftmaxComponent dim=3
+component-node name=logsoftmax component=logsoftmax input=input
+output-node name=output input=logsoftmax
+"""
+
+
+def make_sad():
+    nnet = Nnet()
+    nnet.read_config(istringstream.from_str(CONFIG))
+    transform = NnetSAD.make_sad_transform(Vector([1.0, 1.0, 1.0]))
+    graph = NnetSAD.make_sad_graph(min_speech_duration=0.05)
+    return NnetSAD(nnet, transform, graph)
+
+
+def make_features(labels):
+    """Returns logits strongly favouring the given SAD labels."""
+    feats = np.zeros((len(labels), 3), dtype=np.float32)
+    feats[np.arange(len(labels)), labels] = 10.0
+    return feats
+
+
+class TestSegmentTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # 0 is silence and 1 is speech.
+        self.feats = [
+            ("rec1", make_features([0] * 12 + [1] * 20 + [0] * 15)),
+            ("rec2", make_features([1] * 30 + [0] * 10 + [1] * 8 + [0] * 6)),
+            ("rec3", make_features([0] * 25)),
+            ("rec4", make_features([0] * 10 + [1] * 40)),
+        ]
+        self.rspecifier = "ark:" + os.path.join(self.tmpdir, "feats.ark")
+        with MatrixWriter(self.rspecifier) as writer:
+            for key, feats in self.feats:
+                writer[key] = Matrix(feats)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def expected_output(self):
+        sad = make_sad()
+        processor = SegmentationProcessor([2])
+        output = io.StringIO()
+        for key, feats in self.feats:
+            out = sad.segment(Matrix(feats))
+            segments, _ = processor.process(out["alignment"])
+            processor.write(key, segments, output)
+        return output.getvalue(), processor.stats
+
+    def test_segment_table(self):
+        expected, expected_stats = self.expected_output()
+        self.assertTrue(expected)
+        segments = os.path.join(self.tmpdir, "segments")
+        for num_workers in (1, 2):
+            for max_pending in (None, 1):
+                processor = SegmentationProcessor([2])
+                result = segment_table(make_sad(), processor, self.rspecifier,
+                                       segments, num_workers=num_workers,
+                                       max_pending=max_pending)
+                self.assertEqual(result, (4, 0))
+                with open(segments) as f:
+                    self.assertEqual(f.read(), expected)
+                self.assertEqual(str(processor.stats), str(expected_stats))
+
+    def test_errors(self):
+        # Features of the wrong dimension cannot be segmented.
+        with MatrixWriter(self.rspecifier) as writer:
+            writer["bad"] = Matrix(np.zeros((10, 4), dtype=np.float32))
+            for key, feats in self.feats[:2]:
+                writer[key] = Matrix(feats)
+        segments = os.path.join(self.tmpdir, "segments")
+        for num_workers in (1, 2):
+            result = segment_table(make_sad(), SegmentationProcessor([2]),
+                                   self.rspecifier, segments,
+                                   num_workers=num_workers)
+            self.assertEqual(result, (2, 1))
+            with open(segments) as f:
+                keys = [line.split()[1] for line in f]
+            self.assertEqual(sorted(set(keys)), ["rec1", "rec2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import random
+import unittest
+
+import numpy as np
+
+from kaldi.segmentation import SegmentationProcessor
+
+
+def reference_process(proc, alignment):
+    """Loop-based segmentation post-processing, as in earlier releases."""
+    segments = []
+    seg_begin = 0
+    for i in range(1, len(alignment) + 1):
+        if i == len(alignment) or alignment[i] != alignment[seg_begin]:
+            if alignment[seg_begin] in proc.target_labels:
+                segments.append((seg_begin, i, alignment[seg_begin]))
+            seg_begin = i
+
+    if proc.min_segment_dur > 0:
+        segments = [seg for seg in segments
+                    if seg[1] - seg[0] >= proc.min_segment_dur]
+
+    padded_segments = []
+    for i, (seg_beg, seg_end, label) in enumerate(segments):
+        seg_beg = max(seg_beg - proc.segment_padding, 0)
+        if padded_segments:
+            seg_beg = max(seg_beg, padded_segments[-1][1])
+        seg_end = min(seg_end + proc.segment_padding, len(alignment))
+        if i + 1 < len(segments):
+            seg_end = min(seg_end, segments[i + 1][0])
+        padded_segments.append((seg_beg, seg_end, label))
+    segments = padded_segments
+
+    if proc.max_merged_segment_dur <= 0 or not segments:
+        return segments
+    merged_segments = [segments[0]]
+    for seg_beg, seg_end, label in segments[1:]:
+        prev_seg_beg, prev_seg_end, prev_label = merged_segments[-1]
+        if (seg_beg == prev_seg_end and label == prev_label and
+                seg_end - prev_seg_beg <= proc.max_merged_segment_dur):
+            merged_segments[-1] = (prev_seg_beg, seg_end, label)
+        else:
+            merged_segments.append((seg_beg, seg_end, label))
+    return merged_segments
+
+
+class TestSegmentationProcessor(unittest.TestCase):
+
+    def test_process(self):
+        proc = SegmentationProcessor([1, 2], segment_padding=0.02,
+                                     min_segment_dur=0.02,
+                                     max_merged_segment_dur=0.1)
+        alignment = [0, 1, 1, 0, 0, 0, 0, 1, 1, 1, 0, 1, 2, 2, 0]
+        segments, stats = proc.process(alignment)
+        self.assertEqual(segments, [(0, 5, 1), (5, 12, 1), (12, 15, 2)])
+        self.assertEqual(stats.num_segments_initial, 4)
+        self.assertEqual(stats.num_short_segments_filtered, 1)
+        self.assertEqual(stats.num_merges, 0)
+        self.assertEqual(stats.num_segments_final, 3)
+        self.assertTrue(all(isinstance(seg, tuple) for seg in segments))
+        self.assertTrue(all(isinstance(x, int) for seg in segments
+                            for x in seg))
+
+    def test_public_steps_return_lists(self):
+        proc = SegmentationProcessor([1], segment_padding=0.01,
+                                     max_merged_segment_dur=float("inf"))
+        stats = proc.Stats()
+        segments = proc.initialize_segments([1, 1, 0, 1, 0, 0, 1], stats)
+        self.assertEqual(segments, [(0, 2, 1), (3, 4, 1), (6, 7, 1)])
+        segments = proc.filter_short_segments(segments, stats)
+        self.assertEqual(segments, [(0, 2, 1), (3, 4, 1), (6, 7, 1)])
+        segments = proc.pad_segments(segments, stats, 7)
+        self.assertEqual(segments, [(0, 3, 1), (3, 5, 1), (5, 7, 1)])
+        segments = proc.merge_consecutive_segments(segments, stats)
+        self.assertEqual(segments, [(0, 7, 1)])
+        self.assertEqual(stats.num_merges, 2)
+        self.assertEqual(proc.initialize_segments([], stats), [])
+        self.assertEqual(proc.merge_consecutive_segments([], stats), [])
+
+    def test_matches_reference(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            proc = SegmentationProcessor(
+                [1, 2], segment_padding=0.01 * rng.randint(0, 5),
+                min_segment_dur=0.01 * rng.randint(0, 4),
+                max_merged_segment_dur=rng.choice([0, 0.05, 0.2,
+                                                   float("inf")]))
+            alignment = [rng.choice([0, 0, 1, 1, 2])
+                         for _ in range(rng.randint(0, 60))]
+            expected = reference_process(proc, alignment)
+            self.assertEqual(proc.process(alignment)[0], expected)
+            self.assertEqual(proc.process(np.array(alignment))[0], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from kaldi.matrix import Matrix, Vector
+from kaldi.transform import cmvn
+from kaldi.transform.cmvn import compute_cmvn_stats
+from kaldi.util.table import (MatrixWriter, SequentialDoubleMatrixReader,
+                              VectorWriter)
+
+
+def reference_stats(feats, weights=None):
+    """Returns the CMVN stats of a list of feature matrices."""
+    dim = feats[0].shape[1]
+    stats = np.zeros((2, dim + 1))
+    for i, f in enumerate(feats):
+        w = np.ones(len(f)) if weights is None else weights[i]
+        f = f.astype(np.float64)
+        stats[0, :-1] += w.dot(f)
+        stats[1, :-1] += w.dot(f ** 2)
+        stats[0, -1] += w.sum()
+    return stats
+
+
+class TestComputeCmvnStats(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.feats = {"utt{}".format(i): rng.randn(n, 3).astype(np.float32)
+                      for i, n in enumerate((5, 8, 1, 12))}
+        self.weights = {utt: rng.uniform(0.0, 1.0, len(f)).astype(np.float32)
+                        for utt, f in self.feats.items()}
+        self.weights["utt3"] = self.weights["utt3"][:-1]
+        self.feats_rspecifier = "scp:" + self.path("feats.scp")
+        self.weights_rspecifier = "ark:" + self.path("weights.ark")
+        self.spk2utt = self.path("spk2utt")
+        wspecifier = "ark,scp:{},{}".format(self.path("feats.ark"),
+                                            self.path("feats.scp"))
+        with MatrixWriter(wspecifier) as writer:
+            for utt, f in sorted(self.feats.items()):
+                writer[utt] = Matrix(f)
+        with VectorWriter(self.weights_rspecifier) as writer:
+            for utt, w in sorted(self.weights.items()):
+                writer[utt] = Vector(w)
+        with open(self.spk2utt, "w") as f:
+            f.write("spk2 utt2 utt0 utt1\n"
+                    "spk1 utt3 missing\n"
+                    "spk3 missing\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def read_stats(self, wspecifier):
+        with SequentialDoubleMatrixReader(wspecifier) as reader:
+            return [(key, stats.numpy().copy()) for key, stats in reader]
+
+    def test_compute_cmvn_stats(self):
+        f = self.feats
+        expected = [("spk2", reference_stats([f["utt2"], f["utt0"],
+                                              f["utt1"]])),
+                    ("spk1", reference_stats([f["utt3"]]))]
+        for num_workers in (1, 2):
+            for max_utts_per_task in (1, 2, 100):
+                wspecifier = "ark:" + self.path("cmvn.ark")
+                result = compute_cmvn_stats(
+                    self.feats_rspecifier, wspecifier, self.spk2utt,
+                    num_workers=num_workers,
+                    max_utts_per_task=max_utts_per_task)
+                self.assertEqual(result, (4, 2))
+                stats = self.read_stats(wspecifier)
+                self.assertEqual([key for key, _ in stats],
+                                 [key for key, _ in expected])
+                for (_, s), (_, e) in zip(stats, expected):
+                    self.assertTrue(np.allclose(s, e, atol=1e-4))
+
+    def test_weights(self):
+        f, w = self.feats, self.weights
+        wspecifier = "ark:" + self.path("cmvn.ark")
+        result = compute_cmvn_stats(self.feats_rspecifier, wspecifier,
+                                    self.spk2utt, self.weights_rspecifier,
+                                    num_workers=2, max_utts_per_task=2)
+        # Weights of utt3 have the wrong size.
+        self.assertEqual(result, (3, 3))
+        stats = self.read_stats(wspecifier)
+        self.assertEqual([key for key, _ in stats], ["spk2"])
+        expected = reference_stats([f["utt2"], f["utt0"], f["utt1"]],
+                                   [w["utt2"], w["utt0"], w["utt1"]])
+        self.assertTrue(np.allclose(stats[0][1], expected, atol=1e-4))
+
+    def test_readers_closed(self):
+        wspecifier = "ark:" + self.path("cmvn.ark")
+        compute_cmvn_stats(self.feats_rspecifier, wspecifier, self.spk2utt,
+                           self.weights_rspecifier, num_workers=1)
+        self.assertIsNone(cmvn._worker_feats_reader)
+        self.assertIsNone(cmvn._worker_weights_reader)
+
+
+if __name__ == '__main__':
+    unittest.main()
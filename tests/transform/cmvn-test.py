@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from kaldi.feat.functions import SlidingWindowCmnOptions, sliding_window_cmn
+from kaldi.matrix import Matrix
+from kaldi.transform.cmvn import SlidingWindowCmvn
+
+
+class TestSlidingWindowCmvn(unittest.TestCase):
+
+    def check(self, num_frames, center, normalize_variance):
+        opts = SlidingWindowCmnOptions()
+        opts.cmn_window = 50
+        opts.min_window = 10
+        opts.center = center
+        opts.normalize_variance = normalize_variance
+
+        feats = Matrix(num_frames, 13).set_randn_()
+        expected = Matrix(num_frames, 13)
+        sliding_window_cmn(opts, feats, expected)
+
+        swcmvn = SlidingWindowCmvn(opts)
+        output = feats.clone()
+        swcmvn.apply(output)
+        self.assertTrue(np.allclose(output.numpy(), expected.numpy(),
+                                    atol=1e-4))
+
+        chunks = []
+        for start in range(0, num_frames, 7):
+            chunks.append(swcmvn.accept_chunk(feats[start:start + 7]))
+        chunks.append(swcmvn.finalize())
+        output = np.concatenate([chunk.numpy() for chunk in chunks
+                                 if chunk.num_rows > 0])
+        self.assertTrue(np.allclose(output, expected.numpy(), atol=1e-4))
+
+    def test_sliding_window_cmvn(self):
+        for num_frames in [1, 9, 40, 200]:
+            for center in [False, True]:
+                for normalize_variance in [False, True]:
+                    self.check(num_frames, center, normalize_variance)
+
+
+if __name__ == '__main__':
+    unittest.main()